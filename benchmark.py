@@ -1,59 +1,255 @@
 #!/usr/bin/env python3
 """
-Benchmark STT + TTS models on Apple Silicon to find the sweet spot.
-Usage: ./venv/bin/python benchmark.py
+Benchmark STT + TTS backends and catch performance regressions before deploying.
+
+Usage:
+  ./venv/bin/python benchmark.py [stt] [tts] [batch] [all]
+      [--stt-backends mlx,faster-whisper] [--stt-models tiny,small]
+      [--tts-backends kokoro,system] [--runs 3]
+      [--json results.json]
+      [--save-baseline bench-baseline.json]
+      [--compare bench-baseline.json] [--threshold 0.15]
+
+Results are printed as tables and can be written as JSON. A results file can be
+saved as a baseline and later runs compared against it: load time, latency,
+real-time factor and peak memory regressions beyond --threshold are flagged and
+the script exits with status 1.
 """
 
+import argparse
+import gc
+import json
+import math
 import os
-import sys
-import time
-import struct
-import io
+import platform
+import shutil
 import subprocess
+import sys
 import tempfile
+import threading
+import time
+import uuid
+import wave
+from datetime import datetime, timezone
+
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from model_host import pcm_to_wav_bytes
+
 # Suppress noisy logs
 os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 
-SAMPLE_TTS_TEXT = "Hey, what are you doing just standing there? You know I need wheels, right? Venmo me and let's make this happen."
+RESULTS_VERSION = 1
+
 SAMPLE_TTS_SHORT = "What's your name?"
-STT_TEST_DURATION = 3  # seconds of silence to transcribe (tests pipeline overhead)
-
-# Generate a test WAV (3s of near-silence with a tiny bit of noise)
-def make_test_wav(duration_s=3, sample_rate=16000):
-    samples = int(duration_s * sample_rate)
-    audio = (np.random.randn(samples) * 0.001).astype(np.float32)
-    pcm = np.clip(audio * 32767, -32768, 32767).astype(np.int16)
-    buf = io.BytesIO()
-    buf.write(b'RIFF')
-    buf.write(struct.pack('<I', 36 + len(pcm) * 2))
-    buf.write(b'WAVE')
-    buf.write(b'fmt ')
-    buf.write(struct.pack('<IHHIIHH', 16, 1, 1, sample_rate, sample_rate * 2, 2, 16))
-    buf.write(b'data')
-    buf.write(struct.pack('<I', len(pcm) * 2))
-    buf.write(pcm.tobytes())
-    path = os.path.join(tempfile.gettempdir(), "bench_test.wav")
-    with open(path, 'wb') as f:
-        f.write(buf.getvalue())
+SAMPLE_TTS_TEXT = "Hey, what are you doing just standing there? You know I need wheels, right? Venmo me and let's make this happen."
+SAMPLE_TTS_LONG = (
+    "Okay, here's the deal. I'm Tubs, and I'm saving up for a set of wheels so I can finally roam around "
+    "instead of sitting on this table all day. Every dollar helps, and I promise to say something nice about you. "
+    "So what do you think, are you in?"
+)
+
+TTS_TEXTS = [
+    ("short", SAMPLE_TTS_SHORT),
+    ("medium", SAMPLE_TTS_TEXT),
+    ("long", SAMPLE_TTS_LONG),
+]
+
+# Speech-like STT fixtures (label, seconds). Covers a wake-word blip up to a long upload.
+STT_FIXTURES = [
+    ("short", 1.5),
+    ("medium", 4.0),
+    ("long", 12.0),
+    ("xlong", 30.0),
+]
+
+DEFAULT_STT_MODELS = ["tiny", "small", "distil-small.en", "medium", "distil-medium.en", "large-v3-turbo"]
+STT_BACKENDS = ["mlx", "faster-whisper"]
+TTS_BACKENDS = ["kokoro", "system"]
+
+# Metrics compared against the baseline, with an absolute noise floor each
+# regression has to exceed on top of the relative threshold.
+REGRESSION_METRICS = {
+    "load_s": 0.25,
+    "latency_p50_ms": 15.0,
+    "latency_p95_ms": 25.0,
+    "rtf": 0.02,
+    "rss_delta_mb": 32.0,
+}
+
+# Rough vowel formants (F1, F2, F3) in Hz used by the speech-like fixture generator.
+VOWEL_FORMANTS = [
+    (730, 1090, 2440),  # a
+    (530, 1840, 2480),  # e
+    (270, 2290, 3010),  # i
+    (570, 840, 2410),   # o
+    (300, 870, 2240),   # u
+    (660, 1720, 2410),  # ae
+]
+
+
+def write_wav(path, pcm_float32, sample_rate=16000):
+    with open(path, "wb") as f:
+        f.write(pcm_to_wav_bytes(pcm_float32, sample_rate=sample_rate))
     return path
 
 
-def pcm_to_wav_bytes(pcm_float32, sample_rate=24000):
-    pcm_int16 = np.clip(pcm_float32 * 32767, -32768, 32767).astype(np.int16)
-    num_samples = len(pcm_int16)
-    data_size = num_samples * 2
-    buf = io.BytesIO()
-    buf.write(b'RIFF')
-    buf.write(struct.pack('<I', 36 + data_size))
-    buf.write(b'WAVE')
-    buf.write(b'fmt ')
-    buf.write(struct.pack('<IHHIIHH', 16, 1, 1, sample_rate, sample_rate * 2, 2, 16))
-    buf.write(b'data')
-    buf.write(struct.pack('<I', data_size))
-    buf.write(pcm_int16.tobytes())
-    return buf.getvalue()
+def synth_speech_like(duration_s, sample_rate=16000, seed=0):
+    """Synthesize deterministic speech-like audio.
+
+    Voiced syllables are harmonic stacks of a drifting pitch shaped by vowel
+    formants, separated by fricative noise bursts and word/phrase pauses, over a
+    low noise floor. Not intelligible, but it has the energy envelope, spectrum
+    and pause structure of speech, so VAD and decoding run as they would on a
+    real utterance instead of short-circuiting on silence.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(duration_s * sample_rate)
+    out = np.zeros(total, dtype=np.float64)
+    pos = int(0.15 * sample_rate)
+    syllables_in_word = 0
+
+    while pos < total - int(0.1 * sample_rate):
+        syl_len = int(rng.uniform(0.14, 0.30) * sample_rate)
+        syl_len = min(syl_len, total - pos)
+        t = np.arange(syl_len) / sample_rate
+
+        # Pitch contour: speaker base with a gentle declination and jitter.
+        base_f0 = rng.uniform(105, 190)
+        f0 = base_f0 * (1.0 + 0.08 * np.sin(2 * np.pi * rng.uniform(1.5, 4.0) * t)) * (1.0 - 0.1 * t)
+        phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+        formants = VOWEL_FORMANTS[int(rng.integers(len(VOWEL_FORMANTS)))]
+
+        voiced = np.zeros(syl_len)
+        max_harmonic = int(4000 / base_f0)
+        for k in range(1, max_harmonic + 1):
+            freq = k * base_f0
+            gain = sum(
+                1.0 / (1.0 + ((freq - fc) / (60 + 0.08 * fc)) ** 2)
+                for fc in formants
+            ) / k ** 0.6
+            voiced += gain * np.sin(k * phase)
+
+        envelope = np.sin(np.pi * np.linspace(0, 1, syl_len)) ** 1.5
+        voiced *= envelope
+        peak = np.max(np.abs(voiced)) or 1.0
+        out[pos:pos + syl_len] += 0.35 * rng.uniform(0.6, 1.0) * voiced / peak
+        pos += syl_len
+        syllables_in_word += 1
+
+        # Occasional fricative onset for the next syllable (s/sh/f-like hiss).
+        if rng.random() < 0.35 and pos < total:
+            fric_len = min(int(rng.uniform(0.04, 0.1) * sample_rate), total - pos)
+            hiss = np.diff(rng.standard_normal(fric_len + 1))
+            hiss *= np.hanning(fric_len) * 0.05
+            out[pos:pos + fric_len] += hiss
+            pos += fric_len
+
+        # Word and phrase boundaries.
+        if syllables_in_word >= rng.integers(1, 4):
+            syllables_in_word = 0
+            pause = rng.uniform(0.4, 0.8) if rng.random() < 0.15 else rng.uniform(0.05, 0.15)
+            pos += int(pause * sample_rate)
+
+    out += rng.standard_normal(total) * 0.002
+    return out.astype(np.float32)
+
+
+def make_fixtures(fixture_dir=None):
+    """Return [(label, path, audio_seconds)] for STT fixtures.
+
+    If fixture_dir contains WAV recordings they are used as-is (label = file
+    stem), otherwise speech-like fixtures are synthesized.
+    """
+    fixtures = []
+    if fixture_dir:
+        for name in sorted(os.listdir(fixture_dir)):
+            if not name.lower().endswith(".wav"):
+                continue
+            path = os.path.join(fixture_dir, name)
+            with wave.open(path, "rb") as wf:
+                duration = wf.getnframes() / float(wf.getframerate() or 1)
+            fixtures.append((os.path.splitext(name)[0], path, duration))
+        if fixtures:
+            return fixtures
+
+    for idx, (label, duration) in enumerate(STT_FIXTURES):
+        path = os.path.join(tempfile.gettempdir(), f"bench_{label}.wav")
+        write_wav(path, synth_speech_like(duration, seed=idx + 1))
+        fixtures.append((label, path, duration))
+    return fixtures
+
+
+# --- Memory sampling ---
+
+def current_rss_mb():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, KiB on Linux.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class PeakMemorySampler:
+    """Samples process RSS on a background thread and keeps the high-water mark."""
+
+    def __init__(self, interval_s=0.02):
+        self.interval_s = interval_s
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak_mb = current_rss_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = (len(ordered) - 1) * pct / 100.0
+    lo = math.floor(idx)
+    hi = math.ceil(idx)
+    if lo == hi:
+        return ordered[lo]
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (idx - lo)
+
+
+def summarize_times(times_s, audio_s):
+    ms = [t * 1000 for t in times_s]
+    mean = sum(ms) / len(ms) if ms else 0.0
+    return {
+        "latency_mean_ms": round(mean, 1),
+        "latency_p50_ms": round(percentile(ms, 50), 1),
+        "latency_p95_ms": round(percentile(ms, 95), 1),
+        "latency_min_ms": round(min(ms), 1) if ms else 0.0,
+        "rtf": round((mean / 1000) / audio_s, 4) if audio_s > 0 else 0.0,
+    }
 
 
 def hr(label=""):
@@ -63,180 +259,441 @@ def hr(label=""):
         print(f"{'━' * 60}")
 
 
-def benchmark_stt():
-    """Test different Whisper model sizes via lightning-whisper-mlx."""
-    hr("STT BENCHMARK (lightning-whisper-mlx)")
-
-    models = ["tiny", "small", "distil-small.en", "medium", "distil-medium.en", "large-v3-turbo"]
-    test_wav = make_test_wav()
+# --- STT backends ---
+
+def load_stt(backend, model_name, batch_size=12):
+    if backend == "mlx":
+        from lightning_whisper_mlx import LightningWhisperMLX
+        return LightningWhisperMLX(model=model_name, batch_size=batch_size)
+    from faster_whisper import WhisperModel
+    model = WhisperModel(model_name, device="cpu", compute_type="int8")
+    if batch_size and batch_size > 1:
+        from faster_whisper import BatchedInferencePipeline
+        return (BatchedInferencePipeline(model=model), batch_size)
+    return model
+
+
+def run_stt(backend, model, wav_path):
+    if backend == "mlx":
+        return str(model.transcribe(wav_path, language="en").get("text", "")).strip()
+    if isinstance(model, tuple):
+        pipeline, batch_size = model
+        segments, _ = pipeline.transcribe(wav_path, beam_size=1, language="en", batch_size=batch_size)
+    else:
+        segments, _ = model.transcribe(wav_path, beam_size=1, language="en")
+    # faster-whisper segments are lazy — drain them so decoding is actually timed.
+    return " ".join(segment.text for segment in segments).strip()
+
+
+def benchmark_stt(backends, models, fixtures, runs=3, batch_size=None, suite="stt"):
+    """Load each backend/model once, then time every fixture."""
+    label = f"STT BENCHMARK ({', '.join(backends)})" if suite == "stt" else f"STT BATCH SIZE BENCHMARK (batch_size={batch_size})"
+    hr(label)
     results = []
 
-    for model_name in models:
-        print(f"\n  Loading {model_name}...", end=" ", flush=True)
-        try:
-            from lightning_whisper_mlx import LightningWhisperMLX
-            t0 = time.time()
-            model = LightningWhisperMLX(model=model_name, batch_size=12)
-            load_time = time.time() - t0
-            print(f"loaded in {load_time:.1f}s")
-
-            # Warm-up run
-            model.transcribe(test_wav, language="en")
-
-            # Benchmark 3 runs
-            times = []
-            for _ in range(3):
+    for backend in backends:
+        # Sequential faster-whisper has no batch size; mlx always takes one.
+        effective_batch = batch_size if batch_size else (12 if backend == "mlx" else None)
+        for model_name in models:
+            print(f"\n  [{backend}] Loading {model_name}...", end=" ", flush=True)
+            gc.collect()
+            rss_before = current_rss_mb()
+            try:
                 t0 = time.time()
-                result = model.transcribe(test_wav, language="en")
-                times.append(time.time() - t0)
-
-            avg = sum(times) / len(times)
-            results.append({
-                "model": model_name,
-                "load_s": load_time,
-                "avg_ms": avg * 1000,
-                "text": result.get("text", "")[:60],
-            })
-            print(f"  → avg {avg*1000:.0f}ms per transcription (load: {load_time:.1f}s)")
+                with PeakMemorySampler() as load_mem:
+                    model = load_stt(backend, model_name, batch_size=effective_batch)
+                load_time = time.time() - t0
+                print(f"loaded in {load_time:.1f}s")
+
+                # Warm-up run
+                run_stt(backend, model, fixtures[0][1])
+            except Exception as e:
+                print(f"FAILED: {e}")
+                for fixture_label, _, audio_s in fixtures:
+                    results.append(_failed_result(suite, backend, model_name, fixture_label, audio_s, e, effective_batch))
+                continue
+
+            for fixture_label, wav_path, audio_s in fixtures:
+                try:
+                    times = []
+                    text = ""
+                    with PeakMemorySampler() as run_mem:
+                        for _ in range(runs):
+                            t0 = time.time()
+                            text = run_stt(backend, model, wav_path)
+                            times.append(time.time() - t0)
+                    peak = max(load_mem.peak_mb, run_mem.peak_mb)
+                    entry = {
+                        "suite": suite,
+                        "backend": backend,
+                        "model": model_name,
+                        "fixture": fixture_label,
+                        "batch_size": effective_batch,
+                        "audio_s": round(audio_s, 2),
+                        "runs": runs,
+                        "load_s": round(load_time, 3),
+                        **summarize_times(times, audio_s),
+                        "peak_rss_mb": round(peak, 1),
+                        "rss_delta_mb": round(peak - rss_before, 1),
+                        "text": text[:60],
+                        "error": None,
+                    }
+                    results.append(entry)
+                    print(
+                        f"  → {fixture_label:<7} {entry['latency_p50_ms']:.0f}ms p50 "
+                        f"(RTF {entry['rtf']:.3f}, +{entry['rss_delta_mb']:.0f}MB)"
+                    )
+                except Exception as e:
+                    print(f"  → {fixture_label:<7} FAILED: {e}")
+                    results.append(_failed_result(suite, backend, model_name, fixture_label, audio_s, e, effective_batch))
 
             # Cleanup
             del model
+            gc.collect()
 
-        except Exception as e:
-            print(f"FAILED: {e}")
-            results.append({"model": model_name, "load_s": 0, "avg_ms": -1, "text": str(e)[:60]})
+    print_stt_table(results, "STT RESULTS" if suite == "stt" else "STT BATCH RESULTS")
+    return results
 
-    hr("STT RESULTS")
-    print(f"  {'Model':<25} {'Load':>7} {'Avg Transcribe':>15}")
-    print(f"  {'─'*25} {'─'*7} {'─'*15}")
+
+def benchmark_stt_batch_sizes(backends, fixtures, runs=3, model_name="small", batch_sizes=(6, 12, 24)):
+    """Test different batch sizes for one model."""
+    results = []
+    for bs in batch_sizes:
+        results.extend(benchmark_stt(backends, [model_name], fixtures, runs=runs, batch_size=bs, suite=f"stt-batch{bs}"))
+    return results
+
+
+def _failed_result(suite, backend, model_name, fixture_label, audio_s, err, batch_size=None):
+    return {
+        "suite": suite,
+        "backend": backend,
+        "model": model_name,
+        "fixture": fixture_label,
+        "batch_size": batch_size,
+        "audio_s": round(audio_s, 2),
+        "error": str(err)[:200],
+    }
+
+
+def print_stt_table(results, title):
+    hr(title)
+    print(f"  {'Backend':<15} {'Model':<18} {'Fixture':<8} {'Load':>7} {'p50':>8} {'p95':>8} {'RTF':>7} {'Mem':>7}")
+    print(f"  {'─'*15} {'─'*18} {'─'*8} {'─'*7} {'─'*8} {'─'*8} {'─'*7} {'─'*7}")
     for r in results:
-        load = f"{r['load_s']:.1f}s" if r['load_s'] > 0 else "—"
-        avg = f"{r['avg_ms']:.0f}ms" if r['avg_ms'] > 0 else "FAILED"
-        print(f"  {r['model']:<25} {load:>7} {avg:>15}")
+        if r.get("error"):
+            print(f"  {r['backend']:<15} {r['model']:<18} {r['fixture']:<8} {'—':>7} {'FAILED':>8}")
+            continue
+        print(
+            f"  {r['backend']:<15} {r['model']:<18} {r['fixture']:<8} {r['load_s']:>6.1f}s "
+            f"{r['latency_p50_ms']:>6.0f}ms {r['latency_p95_ms']:>6.0f}ms {r['rtf']:>7.3f} {r['rss_delta_mb']:>5.0f}MB"
+        )
 
 
-def benchmark_tts():
-    """Test Kokoro TTS performance."""
-    hr("TTS BENCHMARK (Kokoro-82M-bf16)")
+# --- TTS backends ---
 
-    try:
+def load_tts(backend):
+    if backend == "kokoro":
         from mlx_audio.tts.utils import load_model as load_tts_model
+        return load_tts_model("mlx-community/Kokoro-82M-bf16")
+    return "system"
+
+
+def tts_backend_available(backend):
+    """The "system" backend shells out to macOS say/afconvert."""
+    if backend == "system":
+        return bool(shutil.which("say") and shutil.which("afconvert"))
+    return True
+
+
+def run_tts(backend, model, text, voice):
+    """Synthesize text and return the audio length in seconds."""
+    if backend == "kokoro":
+        segments = []
+        for result in model.generate(text=text, voice=voice, speed=1.0, lang_code="a"):
+            segments.append(np.array(result.audio))
+        if not segments:
+            return 0.0
+        return len(np.concatenate(segments)) / 24000  # seconds at 24kHz
+
+    filename = f"bench_tts_{uuid.uuid4().hex}"
+    aiff_path = os.path.join(tempfile.gettempdir(), filename + ".aiff")
+    wav_path = os.path.join(tempfile.gettempdir(), filename + ".wav")
+    try:
+        subprocess.run(["say", "-o", aiff_path, text], check=True, timeout=20)
+        subprocess.run(["afconvert", "-f", "WAVE", "-d", "LEI16", "-r", "22050", aiff_path, wav_path], check=True, timeout=10)
+        with wave.open(wav_path, "rb") as wf:
+            return wf.getnframes() / float(wf.getframerate() or 1)
+    finally:
+        for path in (aiff_path, wav_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def benchmark_tts(backends, voice, runs=3):
+    """Time each configured TTS backend across short/medium/long phrases."""
+    hr(f"TTS BENCHMARK ({', '.join(backends)})")
+    results = []
 
-        print("  Loading Kokoro model...", end=" ", flush=True)
-        t0 = time.time()
-        tts_model = load_tts_model("mlx-community/Kokoro-82M-bf16")
-        load_time = time.time() - t0
-        print(f"loaded in {load_time:.1f}s")
-
-        texts = [
-            ("short", SAMPLE_TTS_SHORT),
-            ("medium", SAMPLE_TTS_TEXT),
-        ]
-
-        # Warm-up
-        for result in tts_model.generate(text="Hello.", voice="af_heart", speed=1.0, lang_code="a"):
-            pass
-
-        results = []
-        for label, text in texts:
-            times = []
-            audio_len = 0
-            for _ in range(3):
-                t0 = time.time()
-                segments = []
-                for result in tts_model.generate(text=text, voice="af_heart", speed=1.0, lang_code="a"):
-                    segments.append(np.array(result.audio))
-                elapsed = time.time() - t0
-                times.append(elapsed)
-                if segments:
-                    combined = np.concatenate(segments)
-                    audio_len = len(combined) / 24000  # seconds at 24kHz
-
-            avg = sum(times) / len(times)
-            rtf = avg / audio_len if audio_len > 0 else 0
-            results.append({
-                "label": label,
-                "text_len": len(text),
-                "audio_s": audio_len,
-                "avg_ms": avg * 1000,
-                "rtf": rtf,
-            })
-            print(f"  {label}: {avg*1000:.0f}ms → {audio_len:.1f}s audio (RTF: {rtf:.2f}x)")
-
-        hr("TTS RESULTS")
-        print(f"  {'Type':<10} {'Chars':>6} {'Gen Time':>10} {'Audio':>8} {'RTF':>8}")
-        print(f"  {'─'*10} {'─'*6} {'─'*10} {'─'*8} {'─'*8}")
-        for r in results:
-            print(f"  {r['label']:<10} {r['text_len']:>6} {r['avg_ms']:>8.0f}ms {r['audio_s']:>6.1f}s {r['rtf']:>7.2f}x")
-        print(f"\n  RTF < 1.0 = faster than real-time (good)")
-        print(f"  RTF > 1.0 = slower than real-time (user waits)")
-
-    except Exception as e:
-        print(f"  FAILED: {e}")
-
-
-def benchmark_stt_batch_sizes():
-    """Test different batch sizes for the current model."""
-    hr("STT BATCH SIZE BENCHMARK")
-
-    model_name = "small"
-    batch_sizes = [6, 12, 24]
-    test_wav = make_test_wav(duration_s=5)
-
-    from lightning_whisper_mlx import LightningWhisperMLX
-
-    for bs in batch_sizes:
+    for backend in backends:
+        if not tts_backend_available(backend):
+            print(f"\n  [{backend}] Skipped: say/afconvert not found (macOS only)")
+            continue
+        print(f"\n  [{backend}] Loading...", end=" ", flush=True)
+        gc.collect()
+        rss_before = current_rss_mb()
         try:
-            print(f"\n  {model_name} batch_size={bs}...", end=" ", flush=True)
-            model = LightningWhisperMLX(model=model_name, batch_size=bs)
+            t0 = time.time()
+            with PeakMemorySampler() as load_mem:
+                model = load_tts(backend)
+            load_time = time.time() - t0
+            print(f"loaded in {load_time:.1f}s")
+
             # Warm-up
-            model.transcribe(test_wav, language="en")
-            times = []
-            for _ in range(3):
-                t0 = time.time()
-                model.transcribe(test_wav, language="en")
-                times.append(time.time() - t0)
-            avg = sum(times) / len(times)
-            print(f"avg {avg*1000:.0f}ms")
-            del model
+            run_tts(backend, model, "Hello.", voice)
         except Exception as e:
             print(f"FAILED: {e}")
-
-
-if __name__ == "__main__":
-    print("╔══════════════════════════════════════════════════════════╗")
-    print("║     TUBS ML BENCHMARK — Apple Silicon (M3 Max)         ║")
-    print("╚══════════════════════════════════════════════════════════╝")
-
-    args = sys.argv[1:]
-    run_all = not args or "all" in args
-
-    if run_all or "stt" in args:
-        benchmark_stt()
-
-    if run_all or "tts" in args:
-        benchmark_tts()
-
-    if run_all or "batch" in args:
-        benchmark_stt_batch_sizes()
-
+            for label, text in TTS_TEXTS:
+                results.append({"suite": "tts", "backend": backend, "model": voice, "fixture": label, "error": str(e)[:200]})
+            continue
+
+        for label, text in TTS_TEXTS:
+            try:
+                times = []
+                audio_len = 0.0
+                with PeakMemorySampler() as run_mem:
+                    for _ in range(runs):
+                        t0 = time.time()
+                        audio_len = run_tts(backend, model, text, voice)
+                        times.append(time.time() - t0)
+                peak = max(load_mem.peak_mb, run_mem.peak_mb)
+                entry = {
+                    "suite": "tts",
+                    "backend": backend,
+                    "model": voice,
+                    "fixture": label,
+                    "text_len": len(text),
+                    "audio_s": round(audio_len, 2),
+                    "runs": runs,
+                    "load_s": round(load_time, 3),
+                    **summarize_times(times, audio_len),
+                    "peak_rss_mb": round(peak, 1),
+                    "rss_delta_mb": round(peak - rss_before, 1),
+                    "error": None,
+                }
+                results.append(entry)
+                print(f"  {label}: {entry['latency_mean_ms']:.0f}ms → {audio_len:.1f}s audio (RTF: {entry['rtf']:.2f}x)")
+            except Exception as e:
+                print(f"  {label}: FAILED: {e}")
+                results.append({"suite": "tts", "backend": backend, "model": voice, "fixture": label, "error": str(e)[:200]})
+
+        del model
+        gc.collect()
+
+    hr("TTS RESULTS")
+    print(f"  {'Backend':<8} {'Type':<8} {'Chars':>6} {'Gen Time':>10} {'Audio':>8} {'RTF':>8} {'Mem':>7}")
+    print(f"  {'─'*8} {'─'*8} {'─'*6} {'─'*10} {'─'*8} {'─'*8} {'─'*7}")
+    for r in results:
+        if r.get("error"):
+            print(f"  {r['backend']:<8} {r['fixture']:<8} {'FAILED':>6}")
+            continue
+        print(
+            f"  {r['backend']:<8} {r['fixture']:<8} {r['text_len']:>6} {r['latency_mean_ms']:>8.0f}ms "
+            f"{r['audio_s']:>6.1f}s {r['rtf']:>7.2f}x {r['rss_delta_mb']:>5.0f}MB"
+        )
+    print(f"\n  RTF < 1.0 = faster than real-time (good)")
+    print(f"  RTF > 1.0 = slower than real-time (user waits)")
+    return results
+
+
+# --- Baseline comparison ---
+
+def result_key(entry):
+    return f"{entry.get('suite')}/{entry.get('backend')}/{entry.get('model')}/{entry.get('fixture')}"
+
+
+def compare_results(current, baseline, threshold):
+    """Return (regressions, improvements, missing) comparing result lists by key."""
+    base_by_key = {result_key(r): r for r in baseline.get("results", []) if not r.get("error")}
+    regressions = []
+    improvements = []
+    seen = set()
+
+    for entry in current.get("results", []):
+        key = result_key(entry)
+        base = base_by_key.get(key)
+        if base is None or entry.get("error"):
+            continue
+        seen.add(key)
+        for metric, floor in REGRESSION_METRICS.items():
+            old = base.get(metric)
+            new = entry.get(metric)
+            if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+                continue
+            delta = new - old
+            ratio = (delta / old) if old > 0 else (math.inf if delta > 0 else 0.0)
+            row = {"key": key, "metric": metric, "baseline": old, "current": new, "change": ratio}
+            if delta > floor and ratio > threshold:
+                regressions.append(row)
+            elif -delta > floor and -ratio > threshold:
+                improvements.append(row)
+
+    missing = sorted(set(base_by_key) - seen)
+    return regressions, improvements, missing
+
+
+def print_comparison(regressions, improvements, missing, threshold, baseline_path):
+    hr(f"BASELINE COMPARISON ({baseline_path}, threshold {threshold:.0%})")
+
+    def fmt(rows, marker):
+        for r in rows:
+            change = "new" if math.isinf(r["change"]) else f"{r['change']:+.0%}"
+            print(f"  {marker} {r['key']:<48} {r['metric']:<15} {r['baseline']:>9} → {r['current']:<9} ({change})")
+
+    if regressions:
+        print(f"  {len(regressions)} regression(s):")
+        fmt(regressions, "✗")
+    else:
+        print("  No regressions.")
+    if improvements:
+        print(f"\n  {len(improvements)} improvement(s):")
+        fmt(improvements, "✓")
+    if missing:
+        print(f"\n  {len(missing)} baseline case(s) not measured in this run:")
+        for key in missing:
+            print(f"    · {key}")
+
+
+def host_info():
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def print_recommendations(results):
     hr("RECOMMENDATIONS")
+    stt = [r for r in results if r.get("suite") == "stt" and not r.get("error") and r.get("fixture") == "medium"]
+    if stt:
+        realtime = sorted((r for r in stt if r["rtf"] < 0.3), key=lambda r: r["rtf"])
+        print("  STT (medium fixture, RTF < 0.3 keeps replies snappy):")
+        for r in realtime[:4] or sorted(stt, key=lambda r: r["rtf"])[:2]:
+            print(f"  • {r['backend']}:{r['model']} — {r['latency_p50_ms']:.0f}ms p50, RTF {r['rtf']:.3f}, +{r['rss_delta_mb']:.0f}MB")
+    batch = [
+        r for r in results
+        if str(r.get("suite", "")).startswith("stt-batch") and not r.get("error") and r.get("fixture") == "medium"
+    ]
+    if batch:
+        print("  STT batch size (medium fixture, lowest RTF per backend):")
+        for backend in sorted({r["backend"] for r in batch}):
+            best = min((r for r in batch if r["backend"] == backend), key=lambda r: r["rtf"])
+            print(
+                f"  • {backend}:{best['model']} batch_size={best['batch_size']} — "
+                f"{best['latency_p50_ms']:.0f}ms p50, RTF {best['rtf']:.3f}, +{best['rss_delta_mb']:.0f}MB"
+            )
+    if not stt and not batch:
+        print("  No successful STT runs on the medium fixture; skipping model recommendations.")
     print("""
-  GPU load breakdown (typical):
+  Load breakdown (typical):
   • STT (Whisper): Spikes during transcription (~1-3s per utterance)
   • TTS (Kokoro):  Spikes during generation (~0.1-2s per phrase)
   • Face detection: Continuous but runs on CPU (WASM), not GPU
 
-  To reduce GPU load:
-  1. STT: Switch from large-v3-turbo → small or distil-small.en
-     (biggest single win — large model saturates GPU during transcription)
-  2. STT: Reduce batch_size from 12 → 6
-     (trades latency for less peak GPU usage)
+  To reduce load:
+  1. STT: Smaller models (small, distil-small.en) are the biggest single win
+  2. STT: Lower batch_size trades latency for less peak usage
   3. TTS: Kokoro-82M is already small, little to gain here
   4. Face detection: Increase detection interval (already adaptive)
-
-  Sweet spot for M3 Max:
-  • STT: distil-small.en or small (fast, accurate enough for conversational)
-  • TTS: Kokoro-82M-bf16 (only option, already efficient)
-  • Batch size: 12 (good balance)
 """)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark STT/TTS backends against a stored baseline.")
+    parser.add_argument("suites", nargs="*", default=[], help="stt, tts, batch or all (default: all)")
+    parser.add_argument("--stt-backends", default=os.environ.get("BENCH_STT_BACKENDS", ",".join(STT_BACKENDS)))
+    parser.add_argument("--stt-models", default=os.environ.get("BENCH_STT_MODELS", ",".join(DEFAULT_STT_MODELS)))
+    parser.add_argument("--tts-backends", default=os.environ.get("BENCH_TTS_BACKENDS", os.environ.get("TTS_BACKEND", "kokoro")))
+    parser.add_argument("--voice", default=os.environ.get("KOKORO_VOICE", "af_heart"))
+    parser.add_argument("--batch-model", default="small")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--fixtures", default=None, help="Directory of WAV recordings to use instead of synthesized fixtures")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write machine-readable results here")
+    parser.add_argument("--save-baseline", default=None, help="Save this run as the baseline file")
+    parser.add_argument("--compare", default=None, help="Compare this run against a saved baseline file")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative regression threshold (default 0.15 = 15%%)")
+    return parser.parse_args(argv)
+
+
+def split_csv(value):
+    return [item.strip() for item in str(value or "").split(",") if item.strip()]
+
+
+def main(argv):
+    args = parse_args(argv)
+    host = host_info()
+
+    print("╔══════════════════════════════════════════════════════════╗")
+    print("║     TUBS ML BENCHMARK                                    ║")
+    print("╚══════════════════════════════════════════════════════════╝")
+    print(f"  Host: {host['processor']} · {host['cpu_count']} cores · {host['platform']}")
+
+    run_all = not args.suites or "all" in args.suites
+    stt_backends = [b for b in split_csv(args.stt_backends) if b in STT_BACKENDS]
+    tts_backends = [b for b in split_csv(args.tts_backends) if b in TTS_BACKENDS]
+    stt_models = split_csv(args.stt_models)
+
+    results = []
+    fixtures = None
+    if run_all or "stt" in args.suites or "batch" in args.suites:
+        fixtures = make_fixtures(args.fixtures)
+        print(f"  STT fixtures: {', '.join(f'{label} ({dur:.1f}s)' for label, _, dur in fixtures)}")
+
+    if run_all or "stt" in args.suites:
+        results.extend(benchmark_stt(stt_backends, stt_models, fixtures, runs=args.runs))
+
+    if run_all or "tts" in args.suites:
+        results.extend(benchmark_tts(tts_backends, args.voice, runs=args.runs))
+
+    if run_all or "batch" in args.suites:
+        results.extend(benchmark_stt_batch_sizes(stt_backends, fixtures, runs=args.runs, model_name=args.batch_model))
+
+    report = {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": host,
+        "config": {
+            "suites": args.suites or ["all"],
+            "stt_backends": stt_backends,
+            "stt_models": stt_models,
+            "tts_backends": tts_backends,
+            "voice": args.voice,
+            "runs": args.runs,
+            "fixtures": [{"label": label, "audio_s": round(dur, 2)} for label, _, dur in (fixtures or [])],
+        },
+        "results": results,
+    }
+
+    print_recommendations(results)
+
+    for path in (args.json_path, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"  Wrote results to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("host", {}).get("machine") != host["machine"]:
+            print(f"  ⚠ Baseline was recorded on {baseline.get('host', {}).get('processor')} — numbers may not be comparable.")
+        regressions, improvements, missing = compare_results(report, baseline, args.threshold)
+        print_comparison(regressions, improvements, missing, args.threshold, args.compare)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
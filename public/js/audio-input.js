@@ -218,6 +218,13 @@ function initLiveSpeechRecognition() {
     }
 }
 
+// 503 from /voice* means STT shed the request (busy), not a broken upload.
+function uploadError(res) {
+    const err = new Error(`HTTP ${res.status}`);
+    err.busy = res.status === 503;
+    return err;
+}
+
 async function sendLivePreviewBlob(blob, sessionId) {
     if (!blob || blob.size < LIVE_PREVIEW_MIN_BYTES) return;
     if (isAssistantAudioActive()) return;
@@ -593,7 +600,7 @@ async function sendVoiceSegment(blob, traceId = null) {
             headers: { 'Content-Type': 'audio/wav' }
         });
 
-        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        if (!res.ok) throw uploadError(res);
         const data = await res.json();
         if (traceId) {
             markPendingTurn(traceId, 'Segment upload finished');
@@ -940,7 +947,7 @@ async function sendVoice(blob, isVad = false, traceId = null) {
             }
         });
 
-        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        if (!res.ok) throw uploadError(res);
 
         const data = await res.json();
         if (traceId) {
@@ -979,7 +986,8 @@ async function sendVoice(blob, isVad = false, traceId = null) {
         }
         clearLiveUserTranscript();
         console.error('[Audio] Send failed:', err);
-        logChat('sys', '⚠️ Voice upload failed');
+        // Busy: the server already told every page to repeat the utterance.
+        if (!err.busy) logChat('sys', '⚠️ Voice upload failed');
     } finally {
         isTranscribing = false;
         updateWaveformMode();
@@ -2,7 +2,7 @@ import { STATE } from './state.js';
 import { $, loadingBar } from './dom.js';
 import { clearChatDraft, commitChatDraft, logChat, upsertChatDraft } from './chat-log.js';
 import { setExpression } from './expressions.js';
-import { enqueueSpeech, stopAllTTS, enqueueTurnScript, applyHeadSpeechState } from './tts.js';
+import { enqueueSpeech, stopAllTTS, enqueueTurnScript, applyHeadSpeechState, prefetchSpeech } from './tts.js';
 import { hideDonationQr, showDonationQr } from './donation-ui.js';
 import { enterSleep, exitSleep } from './sleep.js';
 import { pushEmotionImpulse } from './emotion-engine.js';
@@ -393,6 +393,14 @@ export function handleMessage(msg) {
             }));
             applyHeadSpeechState(msg);
             break;
+        case 'turn_script_prefetch':
+            if (msg.turnId && msg.turnId !== STATE.currentTurnId) break;
+            if (String(msg.actor || 'main') !== 'main') break;
+            if (msg.turnId) {
+                markTurn(msg.turnId, 'First beat received');
+            }
+            prefetchSpeech(msg.text);
+            break;
         case 'turn_script':
             if (msg.turnId && msg.turnId !== STATE.currentTurnId) break;
             console.log(`[MSG] turn_script turnId=${msg.turnId} beats=${msg.beats?.length || 0}`);
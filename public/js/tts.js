@@ -16,6 +16,7 @@ const REMOTE_SPEECH_STALE_MS = 20000;
 const REMOTE_WAIT_POLL_MS = 90;
 const REMOTE_WAIT_MAX_MS = 45000;
 const SPEECH_SAFETY_MAX_MS = 60000;
+const PREFETCH_TTL_MS = 30000;
 
 const subtitles = createSubtitleController(subtitleEl);
 let speechSafetyTimer = null;
@@ -24,6 +25,8 @@ let lastEmotion = null;
 let remoteSmallSpeaking = false;
 let remoteSmallSpeakingUntil = 0;
 let remoteWaitTimer = null;
+// voice|text -> { promise, at }: /tts requests started before the line is queued.
+const prefetchedSpeech = new Map();
 
 function shouldUseBrowserTtsFallback() {
     return String(STATE.ttsBackend || 'kokoro').trim().toLowerCase() === 'system';
@@ -46,6 +49,57 @@ function handleTtsFailure(item, err, reason = 'unknown') {
     setTimeout(() => processQueue(), INTER_UTTERANCE_PAUSE_MS);
 }
 
+async function fetchSpeechBlob(text, voice) {
+    const res = await fetch('/tts', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ text, voice })
+    });
+
+    if (!res.ok) {
+        const detail = await res.text().catch(() => '');
+        const suffix = detail ? `: ${detail.slice(0, 240)}` : '';
+        throw new Error(`TTS failed (${res.status})${suffix}`);
+    }
+
+    const blob = await res.blob();
+    if (blob.size < 100) {
+        throw new Error('TTS audio too small');
+    }
+    return blob;
+}
+
+function dropStalePrefetches(now = Date.now()) {
+    for (const [key, entry] of prefetchedSpeech) {
+        if (now - entry.at > PREFETCH_TTL_MS) prefetchedSpeech.delete(key);
+    }
+}
+
+// Start synthesizing a line the server expects to be queued soon (the first
+// dual-head beat, while the rest of the script is still generating).
+export function prefetchSpeech(text) {
+    const normalizedText = normalizeSpeechText(text);
+    if (!normalizedText || shouldUseBrowserTtsFallback()) return;
+    dropStalePrefetches();
+    const key = `${STATE.kokoroVoice}|${normalizedText}`;
+    if (prefetchedSpeech.has(key)) return;
+    console.log(`[TTS] Prefetch (${normalizedText.length} chars): ${normalizedText}`);
+    const promise = fetchSpeechBlob(normalizedText, STATE.kokoroVoice).catch((err) => {
+        console.warn(`[TTS] Prefetch failed: ${err.message}`);
+        return null;
+    });
+    prefetchedSpeech.set(key, { promise, at: Date.now() });
+}
+
+async function takePrefetchedSpeech(text) {
+    dropStalePrefetches();
+    const key = `${STATE.kokoroVoice}|${text}`;
+    const entry = prefetchedSpeech.get(key);
+    if (!entry) return null;
+    prefetchedSpeech.delete(key);
+    return entry.promise;
+}
+
 function startSubtitles(text, source) {
     subtitles.start(text, source);
 }
@@ -188,6 +242,7 @@ export function stopAllTTS() {
     console.log('[TTS] stopAllTTS - clearing queue and stopping playback');
     STATE.ttsQueue.length = 0;
     $('#stat-queue').textContent = '0';
+    prefetchedSpeech.clear();
 
     if (currentAudioElement) {
         currentAudioElement.oncanplaythrough = null;
@@ -429,22 +484,8 @@ async function playTTS(item) {
             emitHeadSpeechState('end', STATE.currentTurnId);
         };
 
-        const res = await fetch('/tts', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ text: item.text, voice: STATE.kokoroVoice })
-        });
-
-        if (!res.ok) {
-            const detail = await res.text().catch(() => '');
-            const suffix = detail ? `: ${detail.slice(0, 240)}` : '';
-            throw new Error(`TTS failed (${res.status})${suffix}`);
-        }
-
-        const blob = await res.blob();
-        if (blob.size < 100) {
-            throw new Error('TTS audio too small');
-        }
+        const blob = (await takePrefetchedSpeech(item.text))
+            || await fetchSpeechBlob(item.text, STATE.kokoroVoice);
 
         const audioURL = URL.createObjectURL(blob);
         const audio = new Audio();
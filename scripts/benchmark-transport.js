@@ -0,0 +1,165 @@
+#!/usr/bin/env node
+/* eslint-disable no-console */
+// Per-message overhead of the two bridge -> Python transports, with no model
+// work on either side:
+//   http     multipart POST /channel/echo on a new connection (what /transcribe
+//            does before the model runs: parse the form, save the upload)
+//   channel  one "echo" frame over the persistent audio channel (AUDIO_CHANNEL=1)
+//
+// Usage: node scripts/benchmark-transport.js [--port 3001] [--runs 200] [--bytes 32000,160000]
+const http = require('http');
+const path = require('path');
+const { performance } = require('perf_hooks');
+const { loadEnvFile } = require('../src/env');
+
+loadEnvFile(path.join(__dirname, '..', '.env'));
+
+const { AudioChannel } = require('../src/audio-channel-client');
+
+function parseArgs(argv) {
+  const out = {};
+  for (let i = 0; i < argv.length; i += 1) {
+    const arg = argv[i];
+    if (!arg.startsWith('--')) continue;
+    const [k, inlineV] = arg.slice(2).split('=');
+    if (inlineV !== undefined) {
+      out[k] = inlineV;
+      continue;
+    }
+    const next = argv[i + 1];
+    if (next && !next.startsWith('--')) {
+      out[k] = next;
+      i += 1;
+    } else {
+      out[k] = true;
+    }
+  }
+  return out;
+}
+
+function percentile(sorted, p) {
+  if (!sorted.length) return 0;
+  if (sorted.length === 1) return sorted[0];
+  const idx = (sorted.length - 1) * p;
+  const lo = Math.floor(idx);
+  const hi = Math.ceil(idx);
+  if (lo === hi) return sorted[lo];
+  return sorted[lo] + (sorted[hi] - sorted[lo]) * (idx - lo);
+}
+
+function summarize(values) {
+  if (!values.length) {
+    return { n: 0, mean: 0, p50: 0, p95: 0 };
+  }
+  const sorted = [...values].sort((a, b) => a - b);
+  const sum = values.reduce((acc, n) => acc + n, 0);
+  return {
+    n: values.length,
+    mean: sum / values.length,
+    p50: percentile(sorted, 0.5),
+    p95: percentile(sorted, 0.95),
+  };
+}
+
+function fakeWav(bytes) {
+  const buf = Buffer.alloc(Math.max(44, bytes));
+  buf.write('RIFF', 0);
+  buf.write('WAVE', 8);
+  return buf;
+}
+
+// Mirrors transcribeAudio() in src/python-service.js; a fresh socket per request.
+function httpEcho(port, audioBuffer) {
+  return new Promise((resolve, reject) => {
+    const boundary = '---BOUNDARY';
+    const t0 = performance.now();
+    const req = http.request({
+      hostname: 'localhost',
+      port,
+      path: '/channel/echo',
+      method: 'POST',
+      agent: false,
+      headers: { 'Content-Type': `multipart/form-data; boundary=${boundary}` },
+    }, (res) => {
+      let body = '';
+      res.on('data', chunk => body += chunk);
+      res.on('end', () => {
+        if (res.statusCode !== 200) {
+          reject(new Error(`HTTP ${res.statusCode}: ${body}`));
+          return;
+        }
+        resolve({
+          latencyMs: performance.now() - t0,
+          overheadBytes: req.socket.bytesWritten - audioBuffer.length,
+          replyBytes: req.socket.bytesRead,
+        });
+      });
+    });
+    req.on('error', reject);
+    req.write(`--${boundary}\r\n`);
+    req.write('Content-Disposition: form-data; name="audio"; filename="audio.wav"\r\n');
+    req.write('Content-Type: audio/wav\r\n\r\n');
+    req.write(audioBuffer);
+    req.write(`\r\n--${boundary}--\r\n`);
+    req.end();
+  });
+}
+
+async function channelEcho(channel, audioBuffer) {
+  const before = { ...channel.stats };
+  const t0 = performance.now();
+  const { header } = await channel.request({ type: 'echo', mime: 'audio/wav' }, audioBuffer);
+  if (!header.ok) throw new Error(header.error || 'echo failed');
+  return {
+    latencyMs: performance.now() - t0,
+    overheadBytes: channel.stats.framingBytesOut - before.framingBytesOut,
+    replyBytes: channel.stats.bytesIn - before.bytesIn,
+  };
+}
+
+async function main() {
+  const args = parseArgs(process.argv.slice(2));
+  const port = Number.parseInt(String(args.port || '3001'), 10) || 3001;
+  const runs = Math.max(1, Number.parseInt(String(args.runs || '200'), 10) || 200);
+  const sizes = String(args.bytes || '32000,160000').split(',').map(s => Number.parseInt(s, 10)).filter(n => n > 0);
+  const offset = Number.parseInt(process.env.AUDIO_CHANNEL_PORT_OFFSET || '10', 10) || 10;
+  const channel = new AudioChannel(port + offset, 'Benchmark channel');
+
+  console.log(`HTTP port ${port}, channel port ${port + offset}, runs=${runs}`);
+  console.log('');
+  console.log('transport | payload | ok | mean | p50 | p95 | req overhead B/msg | reply B/msg');
+  console.log('---|---:|---:|---:|---:|---:|---:|---:');
+
+  for (const size of sizes) {
+    const audio = fakeWav(size);
+    for (const [name, run] of [['http', () => httpEcho(port, audio)], ['channel', () => channelEcho(channel, audio)]]) {
+      const rows = [];
+      try {
+        await run(); // warmup (and channel connect)
+        for (let i = 0; i < runs; i += 1) rows.push(await run());
+      } catch (err) {
+        console.log(`${name} | ${size} | error: ${err.message}`);
+        continue;
+      }
+      const latency = summarize(rows.map(r => r.latencyMs));
+      const overhead = summarize(rows.map(r => r.overheadBytes));
+      const reply = summarize(rows.map(r => r.replyBytes));
+      console.log([
+        name,
+        size,
+        latency.n,
+        `${latency.mean.toFixed(2)}ms`,
+        `${latency.p50.toFixed(2)}ms`,
+        `${latency.p95.toFixed(2)}ms`,
+        Math.round(overhead.mean),
+        Math.round(reply.mean),
+      ].join(' | '));
+    }
+  }
+  channel.close();
+}
+
+main().catch((err) => {
+  console.error(err);
+  process.exit(1);
+});
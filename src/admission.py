@@ -0,0 +1,298 @@
+"""Per-route admission control for the Python processing services.
+
+Each route class ("stt", "tts", "llm") gets a concurrency limit and a bounded
+wait queue. Requests beyond that are rejected up front instead of piling up
+behind _gpu_lock:
+
+  429  queue full (route sheds new work)
+  503  deadline can't be met, expired while queued, or shed as stale
+
+Rejections carry Retry-After and the current queue depth. STT uses the
+"drop_oldest" policy: when its queue is full the oldest waiting segment is
+dropped in favour of the new one, since a stale utterance is worth less than
+what the user just said.
+
+Callers may send X-Request-Deadline-Ms (remaining budget in ms); otherwise the
+route default applies. Limits are tunable per route via
+ADMISSION_<ROUTE>_CONCURRENCY, ADMISSION_<ROUTE>_QUEUE and
+ADMISSION_<ROUTE>_DEADLINE_MS.
+"""
+
+import collections
+import contextlib
+import functools
+import math
+import os
+import threading
+import time
+
+from flask import jsonify, make_response, request
+
+from event_log import events
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+DEFAULT_LIMITS = {
+    # route: (max_concurrent, max_queue, deadline_ms, shed_policy)
+    "stt": (1, 4, 15000, "drop_oldest"),
+    "tts": (1, 8, 20000, "reject_new"),
+    "llm": (4, 8, 90000, "reject_new"),
+}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, route, status, reason, queue_depth, retry_after_s):
+        super().__init__(f"{route} {reason}")
+        self.route = route
+        self.status = status
+        self.reason = reason
+        self.queue_depth = queue_depth
+        self.retry_after_s = retry_after_s
+
+
+class _Waiter:
+    __slots__ = ("enqueued_at", "deadline", "state")
+
+    def __init__(self, deadline):
+        self.enqueued_at = time.time()
+        self.deadline = deadline
+        self.state = "waiting"
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+class RouteGate:
+    def __init__(self, route, max_concurrent, max_queue, deadline_ms, shed_policy):
+        self.route = route
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.deadline_ms = max(0, deadline_ms)
+        self.shed_policy = shed_policy
+        self._cond = threading.Condition()
+        self._queue = collections.deque()
+        self._active = 0
+        self._service_s = None  # EMA of time a request holds its slot
+        self.counters = collections.Counter()
+
+    # --- Estimates ---
+
+    def _expected_service_s(self):
+        return self._service_s if self._service_s is not None else 0.0
+
+    def _expected_wait_s(self, ahead):
+        if self._active < self.max_concurrent and ahead == 0:
+            return 0.0
+        rounds = (ahead + 1) / self.max_concurrent
+        return rounds * self._expected_service_s()
+
+    def _retry_after_s(self):
+        return max(1.0, self._expected_wait_s(len(self._queue)))
+
+    def _reject(self, status, reason):
+        self.counters[reason] += 1
+        return AdmissionRejected(self.route, status, reason, len(self._queue), self._retry_after_s())
+
+    # --- Slots ---
+
+    def acquire(self, deadline=None):
+        """Block until a slot is free; raises AdmissionRejected instead of waiting forever."""
+        with self._cond:
+            now = time.time()
+            if deadline is not None:
+                finish_at = now + self._expected_wait_s(len(self._queue)) + self._expected_service_s()
+                if finish_at > deadline:
+                    raise self._reject(503, "deadline_unmeetable")
+
+            if self._active < self.max_concurrent and not self._queue:
+                self._active += 1
+                self.counters["admitted"] += 1
+                return
+
+            if len(self._queue) >= self.max_queue:
+                if self.shed_policy == "drop_oldest" and self._queue:
+                    victim = self._queue.popleft()
+                    victim.state = "shed"
+                    self._cond.notify_all()
+                else:
+                    raise self._reject(429, "queue_full")
+
+            waiter = _Waiter(deadline)
+            self._queue.append(waiter)
+            while waiter.state == "waiting":
+                timeout = None if deadline is None else deadline - time.time()
+                if timeout is not None and timeout <= 0:
+                    self._queue.remove(waiter)
+                    raise self._reject(503, "deadline_expired")
+                self._cond.wait(timeout)
+
+            if waiter.state == "admitted":
+                self.counters["admitted"] += 1
+                self.counters["queued"] += 1
+                return
+            if waiter.state == "shed":
+                raise self._reject(503, "shed_stale")
+            raise self._reject(503, "deadline_expired")
+
+    def release(self, held_s):
+        with self._cond:
+            self._service_s = held_s if self._service_s is None else 0.8 * self._service_s + 0.2 * held_s
+            self._active -= 1
+            now = time.time()
+            while self._active < self.max_concurrent and self._queue:
+                waiter = self._queue.popleft()
+                if waiter.deadline is not None and now > waiter.deadline:
+                    waiter.state = "expired"
+                    continue
+                waiter.state = "admitted"
+                self._active += 1
+            self._cond.notify_all()
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def idle(self):
+        with self._cond:
+            return not self._active and not self._queue
+
+    def backlog_ms(self):
+        """Expected wait of the last queued request: how far behind this route is."""
+        with self._cond:
+            return len(self._queue) / self.max_concurrent * self._expected_service_s() * 1000
+
+    def stats(self):
+        with self._cond:
+            return {
+                "active": self._active,
+                "max_concurrent": self.max_concurrent,
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+                "deadline_ms": self.deadline_ms,
+                "shed_policy": self.shed_policy,
+                "avg_service_ms": round(self._expected_service_s() * 1000, 1),
+                "counters": dict(self.counters),
+            }
+
+
+class AdmissionController:
+    def __init__(self, log_prefix="[Admission]"):
+        self.log_prefix = log_prefix
+        self._gates = {}
+        for route, (concurrency, queue_len, deadline_ms, policy) in DEFAULT_LIMITS.items():
+            key = route.upper()
+            self._gates[route] = RouteGate(
+                route,
+                _env_int(f"ADMISSION_{key}_CONCURRENCY", concurrency),
+                _env_int(f"ADMISSION_{key}_QUEUE", queue_len),
+                _env_int(f"ADMISSION_{key}_DEADLINE_MS", deadline_ms),
+                policy,
+            )
+
+    def gate(self, route):
+        return self._gates[route]
+
+    def set_concurrency(self, route, max_concurrent):
+        """Adopt an engine-derived limit (e.g. STT pool workers) unless env pins one."""
+        if os.environ.get(f"ADMISSION_{route.upper()}_CONCURRENCY", "").strip():
+            return
+        gate = self._gates[route]
+        with gate._cond:
+            gate.max_concurrent = max(1, int(max_concurrent))
+
+    def queue_depth(self, route):
+        return self._gates[route].queue_depth()
+
+    def backlog_ms(self, route):
+        return self._gates[route].backlog_ms()
+
+    def busy(self):
+        """True while any route has a request in flight or waiting."""
+        return not all(gate.idle() for gate in self._gates.values())
+
+    def stats(self):
+        return {route: gate.stats() for route, gate in self._gates.items()}
+
+    def _request_deadline(self, gate):
+        raw = request.headers.get(DEADLINE_HEADER, "").strip()
+        try:
+            budget_ms = float(raw) if raw else float(gate.deadline_ms)
+        except ValueError:
+            budget_ms = float(gate.deadline_ms)
+        if budget_ms <= 0:
+            return None
+        return time.time() + budget_ms / 1000.0
+
+    @contextlib.contextmanager
+    def hold(self, route, budget_ms=None):
+        """Admission for callers outside a Flask request (e.g. the audio channel).
+
+        budget_ms plays the role of X-Request-Deadline-Ms; raises
+        AdmissionRejected instead of answering with a response.
+        """
+        gate = self._gates[route]
+        try:
+            budget_ms = float(budget_ms) if budget_ms is not None else float(gate.deadline_ms)
+        except (TypeError, ValueError):
+            budget_ms = float(gate.deadline_ms)
+        gate.acquire(time.time() + budget_ms / 1000.0 if budget_ms > 0 else None)
+        started = time.time()
+        try:
+            yield
+        finally:
+            gate.release(time.time() - started)
+
+    def rejection_response(self, err):
+        retry_after = max(1, int(math.ceil(err.retry_after_s)))
+        response = jsonify({
+            "error": f"{err.route} service busy ({err.reason})",
+            "reason": err.reason,
+            "route": err.route,
+            "queueDepth": err.queue_depth,
+            "retryAfterMs": int(err.retry_after_s * 1000),
+        })
+        response.status_code = err.status
+        response.headers["Retry-After"] = str(retry_after)
+        response.headers["X-Queue-Depth"] = str(err.queue_depth)
+        return response
+
+    def guard(self, route):
+        """Decorator: admit the request into `route` or answer 429/503.
+
+        The slot is held until the response is closed, so streamed bodies
+        keep their slot while they are still generating.
+        """
+        gate = self._gates[route]
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapped(*args, **kwargs):
+                try:
+                    gate.acquire(self._request_deadline(gate))
+                except AdmissionRejected as err:
+                    events.warn(route, "%s %s rejected: %s (queue=%d)", self.log_prefix, route, err.reason, err.queue_depth)
+                    return self.rejection_response(err)
+
+                started = time.time()
+                released = []
+
+                def release():
+                    if not released:
+                        released.append(True)
+                        gate.release(time.time() - started)
+
+                try:
+                    response = make_response(view(*args, **kwargs))
+                except BaseException:
+                    release()
+                    raise
+                response.call_on_close(release)
+                return response
+
+            return wrapped
+
+        return decorator
@@ -41,6 +41,7 @@ const {
 } = require('./context');
 const {
   shouldUseDualHeadDirectedMode,
+  normalizeScriptBeat,
   parseDualHeadScript,
   rescueBeatsFromRawText,
   hasRequiredDualHeadCoverage,
@@ -585,8 +586,23 @@ async function generateDualHeadDirectedReply({
   let llmEndAt = null;
   const dualMaxOutputTokens = Number(runtimeConfig.llmMaxOutputTokens || 256);
 
+  // The script is still validated, rescued and merged (donation, nudges) as a
+  // whole before turn_script is broadcast. On the realtime provider the reply
+  // streams, and the first main-head line is announced as turn_script_prefetch
+  // as soon as its beat closes, so the page can start its TTS while the rest
+  // of the script is generating.
+  const streamBeats = getLlmProviderId() === 'realtime';
+  let prefetchSent = false;
+  const onItem = ({ path, value } = {}) => {
+    if (prefetchSent || !Array.isArray(path) || path.length !== 2 || path[0] !== 'beats') return;
+    const beat = normalizeScriptBeat(value);
+    if (!beat || beat.action !== 'speak' || beat.actor !== 'main') return;
+    prefetchSent = true;
+    broadcast({ type: 'turn_script_prefetch', turnId, actor: beat.actor, text: beat.text });
+    console.log(`[LLM:dual] First main beat after ${Date.now() - llmStartAt}ms, prefetching TTS turn=${turnId}`);
+  };
   try {
-    const llmResult = await generateLlmContent({
+    const request = {
       auth: auth || null,
       model: dualModel,
       systemInstruction: systemInst,
@@ -596,7 +612,10 @@ async function generateDualHeadDirectedReply({
       timeoutMs: 18000,
       responseMimeType: 'application/json',
       responseSchema: DUAL_HEAD_RESPONSE_SCHEMA,
-    });
+    };
+    const llmResult = streamBeats
+      ? await streamLlmContent({ ...request, onItem })
+      : await generateLlmContent(request);
 
     llmEndAt = Date.now();
     llmRawText = llmResult.text;
@@ -0,0 +1,213 @@
+const net = require('net');
+const {
+  STT_REQUEST_DEADLINE_MS,
+  isBackpressureStatus,
+  createBusyError,
+} = require('./service-backpressure');
+
+// Client for the Python services' persistent audio channel (src/audio_channel.py).
+// One socket per service port, kept open and shared by every request; frames are
+//   [u32 header_len][u32 payload_len][JSON header][raw payload]
+// and replies are matched to requests by `id`, so segments and TTS requests can
+// be in flight at the same time. Enabled with AUDIO_CHANNEL=1 (the services read
+// the same variable); callers fall back to HTTP when the channel is unavailable.
+// A request already written to the socket is never retried over HTTP: if the
+// socket drops it fails with CHANNEL_LOST, since the service may have run it.
+
+const AUDIO_CHANNEL_ENABLED = ['1', 'true', 'yes', 'on'].includes(String(process.env.AUDIO_CHANNEL || '').trim().toLowerCase());
+const PORT_OFFSET = Number.parseInt(process.env.AUDIO_CHANNEL_PORT_OFFSET || '10', 10) || 10;
+const CONNECT_TIMEOUT_MS = 500;
+const RECONNECT_BACKOFF_MS = 2000;
+const PREFIX_BYTES = 8;
+
+function encodeFrame(header, payload = null) {
+  const headerBytes = Buffer.from(JSON.stringify(header), 'utf8');
+  const body = payload ? Buffer.from(payload) : Buffer.alloc(0);
+  const prefix = Buffer.alloc(PREFIX_BYTES);
+  prefix.writeUInt32BE(headerBytes.length, 0);
+  prefix.writeUInt32BE(body.length, 4);
+  return Buffer.concat([prefix, headerBytes, body]);
+}
+
+class AudioChannel {
+  constructor(port, label = 'Audio channel') {
+    this.port = port;
+    this.label = label;
+    this.socket = null;
+    this.connecting = null;
+    this.pending = new Map();
+    this.nextId = 1;
+    this.buffer = Buffer.alloc(0);
+    this.unavailableUntil = 0;
+    this.stats = { requests: 0, bytesOut: 0, bytesIn: 0, framingBytesOut: 0 };
+  }
+
+  connect() {
+    if (this.socket) return Promise.resolve(this.socket);
+    if (this.connecting) return this.connecting;
+    if (Date.now() < this.unavailableUntil) {
+      const err = new Error(`${this.label} unavailable`);
+      err.code = 'CHANNEL_UNAVAILABLE';
+      return Promise.reject(err);
+    }
+
+    this.connecting = new Promise((resolve, reject) => {
+      const socket = net.createConnection({ host: '127.0.0.1', port: this.port });
+      socket.setNoDelay(true);
+      const timer = setTimeout(() => socket.destroy(new Error('connect timeout')), CONNECT_TIMEOUT_MS);
+
+      socket.once('connect', () => {
+        clearTimeout(timer);
+        this.socket = socket;
+        this.connecting = null;
+        console.log(`[Bridge] ${this.label} connected on ${this.port}`);
+        resolve(socket);
+      });
+      socket.on('data', chunk => this.onData(chunk));
+      socket.on('error', (err) => {
+        clearTimeout(timer);
+        if (this.connecting && !this.socket) {
+          this.connecting = null;
+          this.unavailableUntil = Date.now() + RECONNECT_BACKOFF_MS;
+          err.code = err.code || 'CHANNEL_UNAVAILABLE';
+          reject(err);
+        }
+      });
+      socket.on('close', () => {
+        if (this.socket === socket) this.socket = null;
+        this.buffer = Buffer.alloc(0);
+        const err = new Error(`${this.label} closed with the request in flight`);
+        err.code = 'CHANNEL_LOST';
+        this.failPending(err);
+      });
+    });
+    return this.connecting;
+  }
+
+  failPending(err) {
+    for (const entry of this.pending.values()) {
+      clearTimeout(entry.timer);
+      entry.reject(err);
+    }
+    this.pending.clear();
+  }
+
+  onData(chunk) {
+    this.buffer = this.buffer.length ? Buffer.concat([this.buffer, chunk]) : chunk;
+    while (this.buffer.length >= PREFIX_BYTES) {
+      const headerLen = this.buffer.readUInt32BE(0);
+      const payloadLen = this.buffer.readUInt32BE(4);
+      const frameLen = PREFIX_BYTES + headerLen + payloadLen;
+      if (this.buffer.length < frameLen) return;
+
+      let header;
+      try {
+        header = JSON.parse(this.buffer.toString('utf8', PREFIX_BYTES, PREFIX_BYTES + headerLen));
+      } catch {
+        this.socket?.destroy(new Error('invalid frame header'));
+        return;
+      }
+      const payload = this.buffer.subarray(PREFIX_BYTES + headerLen, frameLen);
+      this.buffer = this.buffer.subarray(frameLen);
+      this.stats.bytesIn += frameLen;
+
+      const entry = this.pending.get(header.id);
+      if (!entry) continue;
+      this.pending.delete(header.id);
+      clearTimeout(entry.timer);
+      entry.resolve({ header, payload });
+    }
+  }
+
+  // Resolves with { header, payload } for the reply frame with the same id.
+  async request(header, payload = null, { timeoutMs = 30000 } = {}) {
+    const socket = await this.connect();
+    if (socket.destroyed || !socket.writable) {
+      const err = new Error(`${this.label} unavailable`);
+      err.code = 'CHANNEL_UNAVAILABLE';
+      throw err;
+    }
+    const id = this.nextId++;
+    const frame = encodeFrame({ ...header, id }, payload);
+    this.stats.requests += 1;
+    this.stats.bytesOut += frame.length;
+    this.stats.framingBytesOut += frame.length - (payload ? payload.length : 0);
+
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`${this.label} ${header.type} timed out after ${timeoutMs}ms`));
+      }, timeoutMs);
+      this.pending.set(id, { resolve, reject, timer });
+      socket.write(frame);
+    });
+  }
+
+  close() {
+    this.socket?.destroy();
+    this.socket = null;
+  }
+}
+
+const channels = new Map();
+
+function getAudioChannel(httpPort, label) {
+  const port = httpPort + PORT_OFFSET;
+  if (!channels.has(port)) channels.set(port, new AudioChannel(port, label));
+  return channels.get(port);
+}
+
+function replyError(label, header) {
+  if (isBackpressureStatus(header.status)) {
+    return createBusyError(label, { statusCode: header.status, headers: {} }, JSON.stringify(header));
+  }
+  const err = new Error(`${label} failed: ${header.error || `status ${header.status}`}`);
+  err.statusCode = header.status || 500;
+  return err;
+}
+
+// Channel counterpart of the HTTP /transcribe clients: same deadline budget, and
+// a 429 is retried while its Retry-After still fits the deadline.
+async function transcribeOverChannel(channel, audioBuffer, mimeType, label) {
+  const deadlineAt = Date.now() + STT_REQUEST_DEADLINE_MS;
+  for (;;) {
+    const remainingMs = Math.max(1, deadlineAt - Date.now());
+    const { header } = await channel.request(
+      { type: 'transcribe', mime: mimeType, deadline_ms: remainingMs },
+      audioBuffer,
+      { timeoutMs: remainingMs + 1000 }
+    );
+    if (header.ok) return header.result;
+    if (header.status === 429 && Date.now() + (header.retryAfterMs || 1000) < deadlineAt) {
+      console.log(`[Bridge] ${label} queue full, retrying in ${header.retryAfterMs || 1000}ms`);
+      await new Promise(resolve => setTimeout(resolve, header.retryAfterMs || 1000));
+      continue;
+    }
+    throw replyError(label, header);
+  }
+}
+
+// Sends the same JSON body as the HTTP /tts request. Resolves with
+// { wav, speculative }; rejects with statusCode/retryAfterMs like the HTTP path.
+async function synthesizeOverChannel(channel, body, label = 'TTS') {
+  const { header, payload } = await channel.request({ ...body, type: 'tts' }, null, { timeoutMs: 60000 });
+  if (!header.ok) throw replyError(label, header);
+  return { wav: payload, speculative: Boolean(header.result?.speculative) };
+}
+
+// Errors that mean "use HTTP instead" rather than "the request failed": the
+// request never reached the socket. CHANNEL_LOST and timeouts are not among them.
+function isChannelUnavailable(err) {
+  return ['CHANNEL_UNAVAILABLE', 'ECONNREFUSED', 'ECONNRESET', 'EPIPE'].includes(err?.code)
+    || /connect timeout/.test(String(err?.message || ''));
+}
+
+module.exports = {
+  AUDIO_CHANNEL_ENABLED,
+  AudioChannel,
+  encodeFrame,
+  getAudioChannel,
+  isChannelUnavailable,
+  transcribeOverChannel,
+  synthesizeOverChannel,
+};
@@ -0,0 +1,251 @@
+"""Persistent framed channel between the bridge and a Python front end.
+
+HTTP /transcribe costs a new connection per segment, a hand-built multipart
+body, and Flask's multipart parser. With AUDIO_CHANNEL=1 each front end also
+listens on a local TCP socket (its HTTP port + AUDIO_CHANNEL_PORT_OFFSET,
+default +10, or AUDIO_CHANNEL_PORT for a single-port service such as a
+worker-router instance). The bridge keeps one connection open to it and multiplexes
+requests over it.
+
+Every message in either direction is one frame:
+
+  [u32 header_len][u32 payload_len][header: UTF-8 JSON][payload: raw bytes]
+
+(big-endian lengths). The header always carries "type". Request headers also
+carry a client-chosen "id", which every reply echoes, so replies may come back
+out of order:
+
+  -> {"type": "transcribe", "id": 7, "mime": "audio/wav", "deadline_ms": 15000} + audio
+  <- {"type": "result", "id": 7, "ok": true, "result": {"text": ...}}
+  -> {"type": "tts", "id": 8, "text": "Hi!", "voice": "af_heart"}
+  <- {"type": "result", "id": 8, "ok": true, "result": {"bytes": 51244}} + WAV
+  <- {"type": "result", "id": 9, "ok": false, "status": 429, "error": ..., "retryAfterMs": 800}
+
+Control messages: "ping" -> "pong" (echoes "t"), "hello" -> the ops this
+front end handles, and "echo" -> the payload size. POST /channel/echo is the
+multipart equivalent of "echo" (parse and save the upload, answer its size).
+scripts/benchmark-transport.js compares the two. Requests pass through the same admission gates as HTTP,
+and run on a small thread pool, so a slow TTS doesn't hold up a segment
+queued behind it on the same connection.
+"""
+
+import concurrent.futures
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+from flask import Blueprint, jsonify, request
+
+from admission import AdmissionRejected
+from event_log import events
+from model_host import save_uploaded_audio
+
+FRAME_HEADER = struct.Struct(">II")
+MAX_HEADER_BYTES = 64 * 1024
+MAX_PAYLOAD_BYTES = 32 * 1024 * 1024
+
+ENABLED = os.environ.get("AUDIO_CHANNEL", "0").strip().lower() in {"1", "true", "yes", "on"}
+PORT_OFFSET = int(os.environ.get("AUDIO_CHANNEL_PORT_OFFSET", "10") or 10)
+FIXED_PORT = int(os.environ.get("AUDIO_CHANNEL_PORT", "0") or 0)
+WORKERS = int(os.environ.get("AUDIO_CHANNEL_WORKERS", "8") or 8)
+
+
+class ChannelError(Exception):
+    """A handler failure with an HTTP-style status for the reply."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def encode_frame(header, payload=b""):
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return FRAME_HEADER.pack(len(encoded), len(payload)) + encoded + payload
+
+
+def read_frame(stream):
+    """Read one frame from a binary file-like.
+
+    Returns (header, payload, framing_bytes), or None on clean EOF.
+    framing_bytes counts everything but the payload.
+    """
+    prefix = stream.read(FRAME_HEADER.size)
+    if not prefix:
+        return None
+    if len(prefix) < FRAME_HEADER.size:
+        raise ChannelError(400, "truncated frame prefix")
+    header_len, payload_len = FRAME_HEADER.unpack(prefix)
+    if header_len > MAX_HEADER_BYTES or payload_len > MAX_PAYLOAD_BYTES:
+        raise ChannelError(413, f"frame too large ({header_len}+{payload_len} bytes)")
+    header_bytes = stream.read(header_len)
+    payload = stream.read(payload_len) if payload_len else b""
+    if len(header_bytes) < header_len or len(payload) < payload_len:
+        raise ChannelError(400, "truncated frame")
+    header = json.loads(header_bytes.decode("utf-8"))
+    if not isinstance(header, dict):
+        raise ChannelError(400, "frame header must be a JSON object")
+    return header, payload, FRAME_HEADER.size + header_len
+
+
+def channel_port(http_port):
+    return FIXED_PORT or http_port + PORT_OFFSET
+
+
+class ChannelServer(socketserver.ThreadingTCPServer):
+    """handlers: {op: (admission route or None, fn(header, payload) -> (result, reply_payload))}."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port, handlers, admission, log_prefix="[Channel]"):
+        self.handlers = handlers
+        self.admission = admission
+        self.log_prefix = log_prefix
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="audio-channel")
+        self._stats_lock = threading.Lock()
+        self.counters = {
+            "connections": 0,
+            "open": 0,
+            "requests": 0,
+            "errors": 0,
+            "rejected": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "framing_bytes": 0,
+        }
+        super().__init__(("127.0.0.1", port), _ConnectionHandler)
+
+    def count(self, **deltas):
+        with self._stats_lock:
+            for key, value in deltas.items():
+                self.counters[key] += value
+
+    def stats(self):
+        with self._stats_lock:
+            counters = dict(self.counters)
+        requests = counters["requests"]
+        counters["avg_framing_bytes"] = round(counters["framing_bytes"] / requests, 1) if requests else None
+        return {"port": self.server_address[1], **counters}
+
+    def handle_request_frame(self, header, payload):
+        op = header.get("type")
+        route, handler = self.handlers[op]
+        budget_ms = header.get("deadline_ms")
+        try:
+            if route is None:
+                result, reply_payload = handler(header, payload)
+            else:
+                with self.admission.hold(route, budget_ms):
+                    result, reply_payload = handler(header, payload)
+        except AdmissionRejected as err:
+            self.count(rejected=1)
+            events.warn(route, "%s channel %s rejected: %s (queue=%d)", self.log_prefix, route, err.reason, err.queue_depth)
+            return {
+                "ok": False,
+                "status": err.status,
+                "error": f"{err.route} service busy ({err.reason})",
+                "reason": err.reason,
+                "queueDepth": err.queue_depth,
+                "retryAfterMs": int(err.retry_after_s * 1000),
+            }, b""
+        except ChannelError as err:
+            self.count(errors=1)
+            return {"ok": False, "status": err.status, "error": str(err)}, b""
+        except Exception as err:
+            self.count(errors=1)
+            events.error(route or "channel", "%s channel %s error: %s", self.log_prefix, op, err)
+            return {"ok": False, "status": 500, "error": str(err)}, b""
+        return {"ok": True, "result": result}, reply_payload or b""
+
+
+class _ConnectionHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.write_lock = threading.Lock()
+        self.server.count(connections=1, open=1)
+
+    def finish(self):
+        self.server.count(open=-1)
+        super().finish()
+
+    def send(self, header, payload=b""):
+        frame = encode_frame(header, payload)
+        with self.write_lock:
+            self.wfile.write(frame)
+            self.wfile.flush()
+        self.server.count(bytes_out=len(frame))
+
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                frame = read_frame(self.rfile)
+            except (ChannelError, ValueError) as err:
+                events.warn("channel", "%s channel closed: %s", server.log_prefix, err)
+                return
+            except OSError:
+                return
+            if frame is None:
+                return
+            header, payload, framing = frame
+            server.count(bytes_in=framing + len(payload))
+            op = header.get("type")
+            request_id = header.get("id")
+
+            if op == "ping":
+                self.send({"type": "pong", "id": request_id, "t": header.get("t"), "server_t": time.time()})
+                continue
+            if op == "echo":
+                self.send({"type": "result", "id": request_id, "ok": True, "result": {"bytes": len(payload)}})
+                continue
+            if op == "hello":
+                self.send({"type": "hello", "id": request_id, "ops": sorted(server.handlers), "stats": server.stats()})
+                continue
+            if op not in server.handlers:
+                self.send({"type": "result", "id": request_id, "ok": False, "status": 400, "error": f"unknown op {op!r}"})
+                continue
+
+            server.count(requests=1, framing_bytes=framing)
+            server.executor.submit(self._run, header, payload, request_id)
+
+    def _run(self, header, payload, request_id):
+        reply, reply_payload = self.server.handle_request_frame(header, payload)
+        try:
+            self.send({"type": "result", "id": request_id, **reply}, reply_payload)
+        except (OSError, ValueError):
+            pass  # bridge went away; it will retry over HTTP or a new connection
+
+
+echo_bp = Blueprint("channel_echo", __name__)
+
+
+@echo_bp.route("/channel/echo", methods=["POST"])
+def channel_echo():
+    """The HTTP half of the transport benchmark: what /transcribe does before the model runs."""
+    if "audio" not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
+    tmp_path = save_uploaded_audio(request.files["audio"])
+    try:
+        return jsonify({"bytes": os.path.getsize(tmp_path)})
+    finally:
+        os.remove(tmp_path)
+
+
+def start_channel(http_port, handlers, admission, log_prefix):
+    """Serve handlers on channel_port(http_port) in a daemon thread when AUDIO_CHANNEL=1."""
+    if not ENABLED:
+        return None
+    port = channel_port(http_port)
+    try:
+        server = ChannelServer(port, handlers, admission, log_prefix)
+    except OSError as err:
+        events.warn("channel", "%s Audio channel unavailable on %d: %s", log_prefix, port, err)
+        return None
+    threading.Thread(target=server.serve_forever, name=f"audio-channel-{port}", daemon=True).start()
+    events.info("channel", "%s Audio channel listening on 127.0.0.1:%d", log_prefix, port)
+    return server
@@ -0,0 +1,234 @@
+"""Non-blocking event log for the Python services' request paths.
+
+stdout is a pipe the bridge reads. A synchronous print() on every segment,
+TTS render or LLM call stalls the request thread whenever Node falls behind
+reading it. events.info(...) and friends only build a small tuple, append it
+to an in-memory ring, and hand it to a bounded queue. A background thread
+formats and writes the records in batches. When the queue is full the record
+is dropped (and counted) instead of blocking.
+
+  events.info("stt", "[STT] Transcribed in %dms (mlx): %.80s", elapsed, text, ms=elapsed)
+
+Formatting is lazy (%-style, done by the writer). Keyword fields are kept
+as structured data for JSON output and the debug endpoint.
+
+Controls (env):
+  EVENT_LOG_LEVEL   debug | info | warn | error (default info)
+  EVENT_LOG_SAMPLE  per-route output sampling for debug/info, e.g. "stt=0.1,llm=0.5";
+                    warnings and errors are never sampled out
+  EVENT_LOG_FORMAT  text (default; same lines as before) | json (one object per line)
+  EVENT_LOG_QUEUE   writer queue bound (default 2048)
+  EVENT_LOG_RING    records kept for GET /debug/events (default 1000)
+
+The ring keeps every record at or above the level, sampled or not, so
+/debug/events?n=100&route=stt&level=warn shows recent history without
+touching disk.
+"""
+
+import atexit
+import collections
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+LEVELS = {"debug": 10, "info": 20, "warn": 30, "error": 40}
+_LEVEL_NAMES = {number: name for name, number in LEVELS.items()}
+WRITE_BATCH = 256
+
+
+def _parse_sample(value):
+    rates = {}
+    for part in str(value or "").split(","):
+        route, _, rate = part.partition("=")
+        try:
+            rates[route.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+def _format_message(message, args):
+    if not args:
+        return message
+    try:
+        return message % args
+    except (TypeError, ValueError):
+        return f"{message} {args!r}"
+
+
+class EventLog:
+    def __init__(self, level="info", sample=None, queue_size=2048, ring_size=1000, fmt="text", stream=None):
+        self.level = LEVELS.get(level, LEVELS["info"])
+        self.sample = dict(sample or {})
+        self.fmt = fmt
+        self._stream = stream
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._ring = collections.deque(maxlen=max(1, ring_size))
+        self._counters = collections.Counter()
+        self._counter_lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        def env_int(name, default):
+            try:
+                return int(os.environ.get(name, "").strip() or default)
+            except ValueError:
+                return default
+
+        return cls(
+            level=os.environ.get("EVENT_LOG_LEVEL", "info").strip().lower(),
+            sample=_parse_sample(os.environ.get("EVENT_LOG_SAMPLE", "")),
+            queue_size=env_int("EVENT_LOG_QUEUE", 2048),
+            ring_size=env_int("EVENT_LOG_RING", 1000),
+            fmt=os.environ.get("EVENT_LOG_FORMAT", "text").strip().lower(),
+        )
+
+    # --- Producers (request threads) ---
+
+    def log(self, level, route, message, *args, **fields):
+        level_no = LEVELS.get(level, LEVELS["info"])
+        if level_no < self.level:
+            return
+        record = (time.time(), level, route, message, args, fields)
+        self._ring.append(record)
+
+        if level_no < LEVELS["warn"]:
+            rate = self.sample.get(route, 1.0)
+            if rate < 1.0 and random.random() >= rate:
+                self._count("sampled")
+                return
+        if self._writer is None:
+            self._start_writer()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._count("dropped")
+
+    def debug(self, route, message, *args, **fields):
+        self.log("debug", route, message, *args, **fields)
+
+    def info(self, route, message, *args, **fields):
+        self.log("info", route, message, *args, **fields)
+
+    def warn(self, route, message, *args, **fields):
+        self.log("warn", route, message, *args, **fields)
+
+    def error(self, route, message, *args, **fields):
+        self.log("error", route, message, *args, **fields)
+
+    def _count(self, key, amount=1):
+        with self._counter_lock:
+            self._counters[key] += amount
+
+    # --- Writer ---
+
+    def _start_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="event-log-writer", daemon=True)
+                self._writer.start()
+
+    def _render(self, record):
+        ts, level, route, message, args, fields = record
+        text = _format_message(message, args)
+        if self.fmt == "json":
+            return json.dumps({"ts": round(ts, 3), "level": level, "route": route, "msg": text, **fields}, default=str)
+        return text
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stream = self._stream or sys.stdout
+            try:
+                stream.write("".join(self._render(record) + "\n" for record in batch))
+                stream.flush()
+                self._count("written", len(batch))
+            except (OSError, ValueError):
+                self._count("write_errors", len(batch))
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout=1.0):
+        """Wait (bounded) for queued records to be written; used at exit."""
+        deadline = time.time() + timeout
+        while self._writer is not None and self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+
+    # --- Inspection ---
+
+    def recent(self, n=100, route=None, level=None):
+        min_level = LEVELS.get(level, 0) if level else 0
+        records = list(self._ring)
+        out = []
+        for ts, rec_level, rec_route, message, args, fields in reversed(records):
+            if route and rec_route != route:
+                continue
+            if LEVELS.get(rec_level, 0) < min_level:
+                continue
+            out.append({
+                "ts": round(ts, 3),
+                "level": rec_level,
+                "route": rec_route,
+                "msg": _format_message(message, args),
+                **({"fields": fields} if fields else {}),
+            })
+            if len(out) >= n:
+                break
+        out.reverse()
+        return out
+
+    def stats(self):
+        with self._counter_lock:
+            counters = dict(self._counters)
+        return {
+            "level": _LEVEL_NAMES[self.level],
+            "sample": self.sample,
+            "queued": self._queue.qsize(),
+            "queue_limit": self._queue.maxsize,
+            "ring": len(self._ring),
+            "ring_limit": self._ring.maxlen,
+            "written": counters.get("written", 0),
+            "dropped": counters.get("dropped", 0),
+            "sampled": counters.get("sampled", 0),
+            "write_errors": counters.get("write_errors", 0),
+        }
+
+
+events = EventLog.from_env()
+atexit.register(events.flush)
+
+
+def blueprint():
+    """GET /debug/events for a service app.
+
+    Flask is imported here rather than at module level, so the modules that
+    log (and their tests) don't need it.
+    """
+    from flask import Blueprint, jsonify, request
+
+    bp = Blueprint("event_log", __name__)
+
+    @bp.route("/debug/events", methods=["GET"])
+    def debug_events():
+        """Last N events from the in-memory ring (?n=, ?route=, ?level=)."""
+        try:
+            n = max(1, min(int(request.args.get("n", 100)), events._ring.maxlen))
+        except ValueError:
+            return jsonify({"error": "n must be an integer"}), 400
+        return jsonify({
+            "events": events.recent(n, route=request.args.get("route") or None, level=request.args.get("level") or None),
+            "stats": events.stats(),
+        })
+
+    return bp
@@ -0,0 +1,281 @@
+"""Vectorized face-embedding index over data/face-library.json.
+
+All embeddings live in one contiguous float32 matrix with rows pre-divided by
+their norms, so cosine similarity for one probe or a batch of probes is a
+single matmul. Enroll/remove update the matrix in place (amortized growth,
+swap-remove) and re-write a binary sidecar next to the library. The next
+process start maps that sidecar straight into memory instead of parsing JSON
+floats.
+
+The bridge keeps the index in sync through /faces/enroll and /faces/remove.
+Per-frame matching still runs in the browser (public/js/face/results.js)
+inside its synchronous results handler; /faces/match is not on that path yet.
+
+Sidecar layout (little-endian):
+  header  "<4sHIIIQQ": magic b"TFIX", version, dim, count, meta_len,
+          source mtime_ns, source size
+  meta    JSON {"ids": [...], "names": [...]} (meta_len bytes)
+  pad     zero bytes up to a 64-byte boundary
+  matrix  float32[count, dim], unit-norm rows
+"""
+
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+from event_log import events
+
+SIDECAR_MAGIC = b"TFIX"
+SIDECAR_VERSION = 1
+SIDECAR_HEADER = struct.Struct("<4sHIIIQQ")
+SIDECAR_ALIGN = 64
+
+
+def _source_signature(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return 0, 0
+
+
+def _unit_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class FaceIndex:
+    def __init__(self, library_path, sidecar_path=None):
+        self.library_path = library_path
+        self.sidecar_path = sidecar_path or os.path.splitext(library_path)[0] + ".f32idx"
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._count = 0
+        self._ids = []
+        self._names = []
+        self._row_by_id = {}
+        self._mapped = False
+        self._groups = None
+        self.loaded_from = None
+
+    # --- Loading / persistence ---
+
+    def load(self):
+        """Map the sidecar if it matches the library, otherwise rebuild from JSON."""
+        with self._lock:
+            signature = _source_signature(self.library_path)
+            if self._load_sidecar(signature):
+                self.loaded_from = "sidecar"
+            else:
+                self._load_json()
+                self.loaded_from = "json"
+                self.save()
+            return self
+
+    def _load_json(self):
+        try:
+            with open(self.library_path, "r", encoding="utf-8") as f:
+                faces = (json.load(f) or {}).get("faces") or []
+        except (OSError, ValueError):
+            faces = []
+
+        rows, ids, names = [], [], []
+        for face in faces:
+            embedding = face.get("embedding") if isinstance(face, dict) else None
+            if not isinstance(embedding, list) or not embedding:
+                continue
+            if rows and len(embedding) != len(rows[0]):
+                continue
+            rows.append(embedding)
+            ids.append(str(face.get("id") or ""))
+            names.append(str(face.get("name") or ""))
+
+        matrix = np.asarray(rows, dtype=np.float32) if rows else np.zeros((0, 0), dtype=np.float32)
+        self._set_rows(_unit_rows(matrix) if rows else matrix, ids, names, mapped=False)
+
+    def _load_sidecar(self, signature):
+        try:
+            with open(self.sidecar_path, "rb") as f:
+                header = f.read(SIDECAR_HEADER.size)
+                if len(header) < SIDECAR_HEADER.size:
+                    return False
+                magic, version, dim, count, meta_len, mtime_ns, size = SIDECAR_HEADER.unpack(header)
+                if magic != SIDECAR_MAGIC or version != SIDECAR_VERSION or (mtime_ns, size) != signature:
+                    return False
+                meta = json.loads(f.read(meta_len).decode("utf-8"))
+        except (OSError, ValueError):
+            return False
+
+        offset = SIDECAR_HEADER.size + meta_len
+        offset += (-offset) % SIDECAR_ALIGN
+        if count:
+            matrix = np.memmap(self.sidecar_path, dtype=np.float32, mode="r", offset=offset, shape=(count, dim))
+        else:
+            matrix = np.zeros((0, dim), dtype=np.float32)
+        self._set_rows(matrix, list(meta.get("ids") or []), list(meta.get("names") or []), mapped=bool(count))
+        return True
+
+    def save(self):
+        """Atomically re-write the sidecar, stamped with the library's current signature."""
+        with self._lock:
+            mtime_ns, size = _source_signature(self.library_path)
+            matrix = np.ascontiguousarray(self._matrix[:self._count], dtype=np.float32)
+            meta = json.dumps({"ids": self._ids, "names": self._names}).encode("utf-8")
+            header = SIDECAR_HEADER.pack(
+                SIDECAR_MAGIC, SIDECAR_VERSION, self.dim, self._count, len(meta), mtime_ns, size
+            )
+            pad = (-(len(header) + len(meta))) % SIDECAR_ALIGN
+            tmp_path = self.sidecar_path + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(header)
+                    f.write(meta)
+                    f.write(b"\0" * pad)
+                    f.write(matrix.tobytes())
+                os.replace(tmp_path, self.sidecar_path)
+            except OSError as err:
+                events.warn("faces", "[Faces] Could not write index sidecar: %s", err)
+
+    def _set_rows(self, matrix, ids, names, mapped):
+        self._matrix = matrix
+        self._count = len(ids)
+        self._ids = ids
+        self._names = names
+        self._row_by_id = {face_id: row for row, face_id in enumerate(ids)}
+        self._mapped = mapped
+        self._groups = None
+
+    def _writable(self, extra=0):
+        """Ensure a private, writable matrix with room for `extra` more rows."""
+        needed = self._count + extra
+        capacity = self._matrix.shape[0]
+        if not self._mapped and needed <= capacity:
+            return
+        new_capacity = max(needed, 16, capacity * 2 if needed > capacity else capacity)
+        grown = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        grown[:self._count] = self._matrix[:self._count]
+        self._matrix = grown
+        self._mapped = False
+
+    # --- Queries ---
+
+    @property
+    def dim(self):
+        return int(self._matrix.shape[1]) if self._matrix.ndim == 2 else 0
+
+    def __len__(self):
+        return self._count
+
+    def match(self, probes, k=5, by_name=True, threshold=None):
+        """Top-k cosine matches for each probe.
+
+        probes: one embedding or a list of embeddings. Returns one list of
+        {"id", "name", "score"} per probe, best first. With by_name, each
+        person appears once with their best-scoring embedding (same as the
+        browser matcher in public/js/face/results.js).
+        """
+        queries = np.asarray(probes, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        with self._lock:
+            if not self._count:
+                return [[] for _ in range(len(queries))]
+            if queries.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {queries.shape[1]} does not match index dimension {self.dim}")
+            scores = self._matrix[:self._count] @ _unit_rows(queries).T  # (count, probes)
+            ids = list(self._ids)
+            names = list(self._names)
+            if by_name:
+                labels, codes = self._name_groups()
+
+        if by_name:
+            candidates = np.full((len(labels), scores.shape[1]), -np.inf, dtype=np.float32)
+            np.maximum.at(candidates, codes, scores)
+        else:
+            candidates = scores
+
+        k = max(1, min(int(k), candidates.shape[0]))
+        top = np.argpartition(-candidates, k - 1, axis=0)[:k]
+        results = []
+        for col in range(candidates.shape[1]):
+            order = top[:, col][np.argsort(-candidates[top[:, col], col])]
+            matches = []
+            for idx in order:
+                score = float(candidates[idx, col])
+                if threshold is not None and score <= threshold:
+                    break
+                if by_name:
+                    name = str(labels[idx])
+                    rows = np.flatnonzero(codes == idx)
+                    row = rows[np.argmax(scores[rows, col])]
+                    matches.append({"id": ids[row], "name": name, "score": round(score, 5)})
+                else:
+                    matches.append({"id": ids[idx], "name": names[idx], "score": round(score, 5)})
+            results.append(matches)
+        return results
+
+    def _name_groups(self):
+        if self._groups is None:
+            labels, codes = np.unique(np.asarray(self._names, dtype=object), return_inverse=True)
+            self._groups = (labels, codes)
+        return self._groups
+
+    # --- Incremental updates ---
+
+    def enroll(self, face_id, name, embedding, persist=True):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        with self._lock:
+            if self._count and vector.shape[0] != self.dim:
+                raise ValueError(f"Embedding dimension {vector.shape[0]} does not match index dimension {self.dim}")
+            if not self._count and vector.shape[0] != self.dim:
+                self._matrix = np.zeros((0, vector.shape[0]), dtype=np.float32)
+                self._mapped = False
+            face_id = str(face_id)
+            if face_id in self._row_by_id:
+                self.remove(face_id, persist=False)
+            self._writable(extra=1)
+            norm = float(np.linalg.norm(vector)) or 1.0
+            self._matrix[self._count] = vector / norm
+            self._row_by_id[face_id] = self._count
+            self._ids.append(face_id)
+            self._names.append(str(name))
+            self._count += 1
+            self._groups = None
+            if persist:
+                self.save()
+
+    def remove(self, face_id, persist=True):
+        """Swap-remove one embedding; returns True if it was present."""
+        with self._lock:
+            row = self._row_by_id.pop(str(face_id), None)
+            if row is None:
+                return False
+            self._writable()
+            last = self._count - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._names[row] = self._names[last]
+                self._row_by_id[self._ids[row]] = row
+            self._ids.pop()
+            self._names.pop()
+            self._count = last
+            self._groups = None
+            if persist:
+                self.save()
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "faces": self._count,
+                "people": len(set(self._names)),
+                "dim": self.dim,
+                "loaded_from": self.loaded_from,
+                "memory_mapped": self._mapped,
+                "sidecar": self.sidecar_path,
+            }
@@ -0,0 +1,333 @@
+"""Legacy-mode front end (port 3001): /transcribe and /tts for the bridge.
+
+Engines come from the shared ModelHost (model_host.py). Unlike the realtime
+front end, both are loaded eagerly when the service starts (load_models()),
+including the STT_FALLBACK_MODEL tier when one is set (stt_tiers.py).
+"""
+
+import io
+import os
+import subprocess
+import time
+
+from flask import Blueprint, Response, jsonify, request
+
+import audio_channel
+from event_log import events
+from model_host import host, kokoro_wav_bytes, save_audio_bytes, save_uploaded_audio, system_wav_bytes, transcribe_mlx_file
+from stt_streaming import ndjson, parse_stream_options, single_segment_stream, stream_transcription
+from stt_tiers import SttTiers
+from tts_batch import BATCH_MIMETYPE, BatchRequestError, parse_batch_items, render_batch
+
+bp = Blueprint('legacy', __name__)
+admission = host.admission
+
+# Configuration
+PORT = int(os.environ.get("TRANSCRIPTION_SERVICE_PORT", "3001"))
+MODEL_SIZE = os.environ.get("WHISPER_MODEL", "small")
+FALLBACK_MODEL_SIZE = os.environ.get("STT_FALLBACK_MODEL", "").strip()
+STT_BACKEND = os.environ.get("STT_BACKEND", "mlx")
+TTS_BACKEND = os.environ.get("TTS_BACKEND", "kokoro")
+KOKORO_VOICE = os.environ.get("KOKORO_VOICE", "af_heart")
+
+channel = None
+
+
+def _load_stt_model(model_name):
+    return host.stt(STT_BACKEND, model_name, user='legacy', log_prefix='[STT]')
+
+
+stt_tiers = SttTiers(MODEL_SIZE, FALLBACK_MODEL_SIZE, _load_stt_model, log_prefix='[STT]')
+
+
+def _select_stt_model():
+    """(tier, model_name, engine) for the next segment."""
+    return stt_tiers.select(admission.backlog_ms("stt"))
+
+
+def _tts_model():
+    return host.tts(TTS_BACKEND, user='legacy', log_prefix='[TTS]')
+
+
+def load_models():
+    """Load (or attach to) this mode's engines up front."""
+    try:
+        stt_tiers.ensure_loaded()
+    except Exception as e:
+        print(f"[STT] Error loading {STT_BACKEND} ({MODEL_SIZE}, fallback={FALLBACK_MODEL_SIZE or 'none'}): {e}")
+        raise
+    try:
+        _tts_model()
+    except Exception as e:
+        print(f"[TTS] Error loading {TTS_BACKEND}: {e}")
+        raise
+
+
+def _speculative_wav_bytes(text, voice, speed, should_stop, prepared=None):
+    if TTS_BACKEND == "kokoro":
+        return kokoro_wav_bytes(_tts_model(), text, voice, speed, should_stop=should_stop, phonemes=prepared)
+    return system_wav_bytes(text)
+
+
+def _kokoro_phonemize(text, voice, speed):
+    return host.kokoro_frontend.phonemize(_tts_model(), text)
+
+
+speculator = host.speculator(
+    TTS_BACKEND, _speculative_wav_bytes,
+    prepare=_kokoro_phonemize if TTS_BACKEND == "kokoro" else None,
+    log_prefix='[TTS]',
+)
+
+
+@bp.route('/tts', methods=['POST'])
+@admission.guard("tts")
+def tts():
+    data = request.json
+    text = data.get('text', '')
+    voice = data.get('voice', KOKORO_VOICE)
+    if not text:
+        return jsonify({"error": "No text provided"}), 400
+
+    try:
+        wav_bytes, speculative = synthesize_wav(text, voice)
+    except subprocess.CalledProcessError as e:
+        events.error("tts", "[TTS] System process error: %s", e)
+        return jsonify({"error": "TTS generation failed"}), 500
+    except Exception as e:
+        events.error("tts", "[TTS] %s error: %s", TTS_BACKEND, e)
+        return jsonify({"error": str(e)}), 500
+
+    response = Response(wav_bytes, mimetype="audio/wav")
+    if speculative:
+        response.headers["X-TTS-Speculative"] = "hit"
+    return response
+
+
+def synthesize_wav(text, voice):
+    """Render text to WAV bytes; returns (wav_bytes, served_from_speculative_pool)."""
+    wav_bytes = speculator.claim(text, voice)
+    if wav_bytes:
+        events.info("tts", "[TTS] Served %d bytes from speculative pool (voice=%s)", len(wav_bytes), voice, bytes=len(wav_bytes), speculative=True)
+        return wav_bytes, True
+
+    if TTS_BACKEND == "kokoro":
+        t0 = time.time()
+        model = _tts_model()
+        timings = {}
+        # G2P runs before taking the GPU lock; only synthesis holds it.
+        phonemes = host.kokoro_frontend.phonemize(model, text, timings)
+        with host.gpu_lock:
+            wav_bytes = kokoro_wav_bytes(model, text, voice, phonemes=phonemes, timings=timings)
+        if not wav_bytes:
+            raise RuntimeError("Kokoro generated no audio")
+        elapsed = int((time.time() - t0) * 1000)
+        events.info(
+            "tts", "[TTS] Generated %d bytes in %dms (Kokoro, voice=%s, g2p %dms, synth %dms)",
+            len(wav_bytes), elapsed, voice, timings.get("g2p_ms", 0), timings.get("synth_ms", 0),
+            bytes=len(wav_bytes), ms=elapsed, **timings,
+        )
+        return wav_bytes, False
+
+    wav_bytes = system_wav_bytes(text)
+    if not wav_bytes:
+        raise RuntimeError("TTS conversion failed")
+    events.info("tts", "[TTS] Generated %d bytes (system)", len(wav_bytes), bytes=len(wav_bytes))
+    return wav_bytes, False
+
+
+@bp.route('/tts/batch', methods=['POST'])
+@admission.guard("tts")
+def tts_batch():
+    try:
+        items = parse_batch_items(request.json or {}, KOKORO_VOICE)
+    except BatchRequestError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if TTS_BACKEND == "kokoro":
+        model = _tts_model()
+        synthesize = lambda text, voice, speed, prepared: kokoro_wav_bytes(model, text, voice, speed, phonemes=prepared)
+        lock, prepare = host.gpu_lock, _kokoro_phonemize
+    else:
+        synthesize, lock, prepare = (lambda text, voice, speed: system_wav_bytes(text)), None, None
+    return Response(
+        render_batch(items, synthesize, lock=lock, prepare=prepare, log_prefix="[TTS]"),
+        mimetype=BATCH_MIMETYPE,
+    )
+
+
+@bp.route('/tts/speculate', methods=['POST'])
+def tts_speculate():
+    """Queue likely phrases for idle-time rendering; /tts serves them on a match."""
+    try:
+        items = parse_batch_items(request.json or {}, KOKORO_VOICE)
+    except BatchRequestError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(speculator.submit(items)), 202
+
+
+@bp.route('/transcribe', methods=['POST'])
+@admission.guard("stt")
+def transcribe():
+    if 'audio' not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
+
+    tmp_path = save_uploaded_audio(request.files['audio'])
+
+    try:
+        return jsonify(transcribe_audio(tmp_path))
+    except Exception as e:
+        events.error("stt", "[STT] %s transcription error: %s", STT_BACKEND, e)
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _mlx_transcribe(model, tier, tmp_path):
+    """Returns (text, elapsed_ms) and feeds the decode time back to the tier policy."""
+    t0 = time.time()
+    result = transcribe_mlx_file(model, tmp_path, log_prefix='[STT]')
+    if result is None:
+        raise RuntimeError("Could not decode audio")
+    elapsed = int((time.time() - t0) * 1000)
+    stt_tiers.observe(tier, result["duration"], elapsed / 1000.0)
+    return result["text"], elapsed
+
+
+def transcribe_audio(audio):
+    """Transcribe a saved upload (or, for faster-whisper, a file-like of audio bytes)."""
+    tier, model_name, model = _select_stt_model()
+    if STT_BACKEND == "mlx":
+        text, elapsed = _mlx_transcribe(model, tier, audio)
+        events.info("stt", "[STT] Transcribed in %dms (mlx %s): %.80s", elapsed, model_name, text, ms=elapsed, tier=tier)
+        return {
+            "text": text,
+            "language": "en",
+            "probability": 1.0,
+            "tier": tier,
+            "model": model_name,
+        }
+
+    t0 = time.time()
+    text, info = model.transcribe(audio, beam_size=1, language="en")
+    elapsed = int((time.time() - t0) * 1000)
+    stt_tiers.observe(tier, getattr(info, "duration", None), elapsed / 1000.0)
+    events.info("stt", "[STT] Transcribed in %dms (faster-whisper %s): %.80s", elapsed, model_name, text, ms=elapsed, tier=tier)
+    return {
+        "text": text,
+        "language": info.language,
+        "probability": info.language_probability,
+        "tier": tier,
+        "model": model_name,
+    }
+
+
+@bp.route('/transcribe/stream', methods=['POST'])
+@admission.guard("stt")
+def transcribe_stream():
+    """NDJSON variant of /transcribe: one line per decoded segment, then a done line."""
+    if 'audio' not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
+
+    tmp_path = save_uploaded_audio(request.files['audio'])
+    max_duration, wake_words = parse_stream_options(request.values)
+
+    def generate():
+        try:
+            tier, model_name, model = _select_stt_model()
+            if STT_BACKEND == "mlx":
+                # lightning-whisper-mlx decodes the whole file at once.
+                text, elapsed = _mlx_transcribe(model, tier, tmp_path)
+                events.info("stt", "[STT] Transcribed in %dms (mlx %s): %.80s", elapsed, model_name, text, ms=elapsed, tier=tier)
+                yield from single_segment_stream(text, elapsed_ms=elapsed, tier=tier, model=model_name)
+            else:
+                yield from stream_transcription(
+                    model,
+                    tmp_path,
+                    max_duration=max_duration,
+                    wake_words=wake_words,
+                    log_prefix="[STT]",
+                    observe=lambda audio_s, elapsed_s: stt_tiers.observe(tier, audio_s, elapsed_s),
+                    tier=tier,
+                    model=model_name,
+                )
+        except Exception as e:
+            events.error("stt", "[STT] Streaming transcription error: %s", e)
+            yield ndjson({"error": str(e)})
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+
+def _channel_transcribe(header, payload):
+    if not payload:
+        raise audio_channel.ChannelError(400, "No audio provided")
+    if STT_BACKEND != "mlx":
+        # faster-whisper decodes from memory; no temp file.
+        return transcribe_audio(io.BytesIO(payload)), b""
+    tmp_path = save_audio_bytes(payload, header.get('mime'))
+    try:
+        return transcribe_audio(tmp_path), b""
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _channel_tts(header, payload):
+    text = header.get('text', '')
+    if not text:
+        raise audio_channel.ChannelError(400, "No text provided")
+    wav_bytes, speculative = synthesize_wav(text, header.get('voice') or KOKORO_VOICE)
+    return {"bytes": len(wav_bytes), "speculative": speculative, "mimetype": "audio/wav"}, wav_bytes
+
+
+CHANNEL_HANDLERS = {
+    'transcribe': ("stt", _channel_transcribe),
+    'tts': ("tts", _channel_tts),
+}
+
+
+def start_channel():
+    """Open the persistent audio channel next to the HTTP port (AUDIO_CHANNEL=1)."""
+    global channel
+    channel = audio_channel.start_channel(PORT, CHANNEL_HANDLERS, admission, '[STT]')
+    return channel
+
+
+@bp.route('/host/stt', methods=['POST'])
+def host_stt():
+    """Switch the Whisper model in place; the old one unloads if no mode uses it."""
+    global MODEL_SIZE
+    model_name = str((request.json or {}).get('model') or '').strip()
+    if not model_name:
+        return jsonify({"error": "Missing model"}), 400
+    previous = MODEL_SIZE
+    try:
+        _load_stt_model(model_name)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    MODEL_SIZE = stt_tiers.primary = model_name
+    if not stt_tiers.in_use(previous):
+        host.release('stt', STT_BACKEND, previous, 'legacy')
+    return jsonify({"ok": True, "model": MODEL_SIZE, "previous": previous})
+
+
+@bp.route('/health', methods=['GET'])
+def health():
+    stt_workers = host.resident('stt', STT_BACKEND, MODEL_SIZE) if STT_BACKEND != "mlx" else None
+    return jsonify({
+        "status": "ok",
+        "model": MODEL_SIZE,
+        "stt_backend": STT_BACKEND,
+        "tts_backend": TTS_BACKEND,
+        "stt_workers": stt_workers.stats() if stt_workers is not None else None,
+        "stt_tiers": stt_tiers.stats(),
+        "admission": admission.stats(),
+        "speculative": speculator.stats(),
+        "channel": channel.stats() if channel is not None else None,
+        "events": events.stats(),
+        "host": host.stats(),
+    })
@@ -149,8 +149,43 @@ async function streamContent(args) {
   let fullText = '';
   let usage = {};
   let model = args.model;
+  let structured = null;
   let aborted = false;
 
+  // JSON/schema requests also carry `field` (scalar closed) and `item` (array
+  // element closed) events, e.g. beats[0] is complete while beats[1] streams.
+  const handleLine = (rawLine) => {
+    const line = rawLine.trim();
+    if (!line) return;
+    let parsed;
+    try {
+      parsed = JSON.parse(line);
+    } catch {
+      return;
+    }
+    if (parsed.error) {
+      const err = new Error(`Realtime LLM stream error: ${parsed.error}`);
+      err.code = 'REALTIME_LLM_STREAM_ERROR';
+      throw err;
+    }
+    if (parsed.delta) {
+      const delta = String(parsed.delta);
+      fullText += delta;
+      if (typeof args.onChunk === 'function') {
+        args.onChunk(delta);
+      }
+    }
+    if (parsed.field && typeof args.onField === 'function') {
+      args.onField(parsed.field);
+    }
+    if (parsed.item && typeof args.onItem === 'function') {
+      args.onItem(parsed.item);
+    }
+    if (parsed.usage) usage = parsed.usage;
+    if (parsed.model) model = parsed.model;
+    if (parsed.structured) structured = parsed.structured;
+  };
+
   try {
     while (true) {
       const { done, value } = await reader.read();
@@ -158,46 +193,9 @@ async function streamContent(args) {
       buffer += decoder.decode(value, { stream: true });
       const lines = buffer.split('\n');
       buffer = lines.pop() || '';
-
-      for (const rawLine of lines) {
-        const line = rawLine.trim();
-        if (!line) continue;
-        let parsed;
-        try {
-          parsed = JSON.parse(line);
-        } catch {
-          continue;
-        }
-        if (parsed.delta) {
-          const delta = String(parsed.delta);
-          fullText += delta;
-          if (typeof args.onChunk === 'function') {
-            args.onChunk(delta);
-          }
-        }
-        if (parsed.usage) usage = parsed.usage;
-        if (parsed.model) model = parsed.model;
-      }
-    }
-
-    const tail = buffer.trim();
-    if (tail) {
-      let parsedTail = null;
-      try {
-        parsedTail = JSON.parse(tail);
-      } catch {
-        parsedTail = null;
-      }
-      if (parsedTail?.delta) {
-        const delta = String(parsedTail.delta);
-        fullText += delta;
-        if (typeof args.onChunk === 'function') {
-          args.onChunk(delta);
-        }
-      }
-      if (parsedTail?.usage) usage = parsedTail.usage;
-      if (parsedTail?.model) model = parsedTail.model;
+      lines.forEach(handleLine);
     }
+    handleLine(buffer);
   } catch (err) {
     if (err?.name === 'AbortError') {
       aborted = true;
@@ -210,6 +208,7 @@ async function streamContent(args) {
     text: fullText,
     usage,
     model,
+    structured,
     aborted,
   };
 }
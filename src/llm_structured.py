@@ -0,0 +1,290 @@
+"""Structured-output helpers for the realtime LLM routes.
+
+Schema normalization (Gemini-style "OBJECT"/"STRING" types -> JSON Schema
+lowercase types) is cached by content hash, so the dual-head schema the bridge
+sends on every turn is walked once per process.
+
+IncrementalJsonParser consumes model output as it streams and reports values
+the moment they close, so /llm/stream can hand the bridge a finished field
+(e.g. beats[0].text) while later fields are still being generated:
+
+  {"field": {"path": ["beats", 0, "text"], "type": "string", "value": "..."}}
+  {"item": {"path": ["beats", 0], "type": "object", "value": {...}}}
+
+"field" fires for every scalar, "item" for every object/array element of an
+array. Types come from the compiled schema when it describes the path.
+"""
+
+import collections
+import hashlib
+import json
+import threading
+
+SCHEMA_CACHE_LIMIT = 32
+
+_TYPE_MAP = {
+    "OBJECT": "object",
+    "ARRAY": "array",
+    "STRING": "string",
+    "NUMBER": "number",
+    "INTEGER": "integer",
+    "BOOLEAN": "boolean",
+    "NULL": "null",
+}
+
+_schema_cache = collections.OrderedDict()
+_schema_cache_lock = threading.Lock()
+
+
+def normalize_response_schema(schema):
+    if not isinstance(schema, dict):
+        return None
+
+    def walk(node):
+        if isinstance(node, dict):
+            out = {}
+            for key, value in node.items():
+                if key == "type" and isinstance(value, str):
+                    mapped = _TYPE_MAP.get(value.upper())
+                    out[key] = mapped or value.lower()
+                else:
+                    out[key] = walk(value)
+            return out
+        if isinstance(node, list):
+            return [walk(item) for item in node]
+        return node
+
+    normalized = walk(schema)
+    if not isinstance(normalized, dict):
+        return None
+    return normalized
+
+
+def schema_digest(schema):
+    encoded = json.dumps(schema, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CompiledSchema:
+    """A normalized schema plus a path -> type table for the stream parser."""
+
+    def __init__(self, digest, schema):
+        self.digest = digest
+        self.schema = schema
+        self._types = {}
+        self._collect(schema, ())
+
+    def _collect(self, node, path):
+        if not isinstance(node, dict):
+            return
+        node_type = node.get("type")
+        if isinstance(node_type, str):
+            self._types[path] = node_type
+        for key, child in (node.get("properties") or {}).items():
+            self._collect(child, path + (key,))
+        if isinstance(node.get("items"), dict):
+            self._collect(node["items"], path + ("*",))
+
+    def type_at(self, path):
+        key = tuple("*" if isinstance(part, int) else part for part in path)
+        return self._types.get(key)
+
+
+def compile_response_schema(schema):
+    """Normalize and compile a response schema, reusing earlier work for identical content."""
+    if not isinstance(schema, dict):
+        return None
+    digest = schema_digest(schema)
+    with _schema_cache_lock:
+        compiled = _schema_cache.get(digest)
+        if compiled is not None:
+            _schema_cache.move_to_end(digest)
+            return compiled
+
+    normalized = normalize_response_schema(schema)
+    compiled = CompiledSchema(digest, normalized) if normalized else None
+    with _schema_cache_lock:
+        _schema_cache[digest] = compiled
+        while len(_schema_cache) > SCHEMA_CACHE_LIMIT:
+            _schema_cache.popitem(last=False)
+    return compiled
+
+
+def schema_cache_stats():
+    with _schema_cache_lock:
+        return {"entries": len(_schema_cache), "limit": SCHEMA_CACHE_LIMIT}
+
+
+def _json_type(value):
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    return "null"
+
+
+_WHITESPACE = " \t\r\n"
+_SCALAR_END = ",}]" + _WHITESPACE
+
+
+class IncrementalJsonParser:
+    """Feed JSON text in arbitrary chunks; get completed-value events back.
+
+    Text before the first "{" or "[" (and anything after the top-level value
+    closes) is ignored. On malformed input the parser stops emitting events
+    and sets `error`; the caller still has the raw text.
+    """
+
+    def __init__(self, compiled_schema=None):
+        self.compiled = compiled_schema
+        self.result = None
+        self.error = None
+        self._stack = []  # [kind, container, path, pending_key]
+        self._state = "seek"
+        self._buffer = []
+        self._escape = False
+        self._string_is_key = False
+        self._events = []
+
+    @property
+    def complete(self):
+        return self._state == "done"
+
+    def feed(self, chunk):
+        if self._state in {"done", "failed"}:
+            return []
+        for ch in chunk:
+            try:
+                self._step(ch)
+            except ValueError as err:
+                self._state = "failed"
+                self.error = str(err)
+                break
+            if self._state == "done":
+                break
+        events, self._events = self._events, []
+        return events
+
+    # --- State machine ---
+
+    def _step(self, ch):
+        state = self._state
+        if state == "string":
+            self._string_char(ch)
+        elif state == "scalar":
+            if ch in _SCALAR_END:
+                self._finish_scalar()
+                self._step(ch)
+            else:
+                self._buffer.append(ch)
+        elif state == "seek":
+            if ch in "{[":
+                self._open(ch)
+        elif ch in _WHITESPACE:
+            return
+        elif state == "key":
+            if ch == '"':
+                self._start_string(is_key=True)
+            elif ch == "}" and self._stack[-1][1] == {} and self._stack[-1][3] is None:
+                self._close()
+            else:
+                raise ValueError(f"expected object key, got {ch!r}")
+        elif state == "colon":
+            if ch != ":":
+                raise ValueError(f"expected ':', got {ch!r}")
+            self._state = "value"
+        elif state == "value":
+            if ch == '"':
+                self._start_string(is_key=False)
+            elif ch in "{[":
+                self._open(ch)
+            elif ch == "]" and self._stack[-1][0] == "array" and not self._stack[-1][1]:
+                self._close()
+            else:
+                self._buffer = [ch]
+                self._state = "scalar"
+        elif state == "after":
+            kind = self._stack[-1][0]
+            if ch == ",":
+                self._state = "key" if kind == "object" else "value"
+            elif (ch == "}" and kind == "object") or (ch == "]" and kind == "array"):
+                self._close()
+            else:
+                raise ValueError(f"unexpected {ch!r} after value")
+
+    def _start_string(self, is_key):
+        self._buffer = []
+        self._escape = False
+        self._string_is_key = is_key
+        self._state = "string"
+
+    def _string_char(self, ch):
+        if self._escape:
+            self._escape = False
+            self._buffer.append(ch)
+        elif ch == "\\":
+            self._escape = True
+            self._buffer.append(ch)
+        elif ch == '"':
+            value = json.loads('"' + "".join(self._buffer) + '"')
+            self._buffer = []
+            if self._string_is_key:
+                self._stack[-1][3] = value
+                self._state = "colon"
+            else:
+                self._attach(value, container=False)
+        else:
+            self._buffer.append(ch)
+
+    def _finish_scalar(self):
+        token = "".join(self._buffer)
+        self._buffer = []
+        self._attach(json.loads(token), container=False)
+
+    def _child_path(self):
+        if not self._stack:
+            return ()
+        kind, container, path, key = self._stack[-1]
+        return path + ((key,) if kind == "object" else (len(container),))
+
+    def _open(self, ch):
+        path = self._child_path()
+        if ch == "{":
+            self._stack.append(["object", {}, path, None])
+            self._state = "key"
+        else:
+            self._stack.append(["array", [], path, None])
+            self._state = "value"
+
+    def _close(self):
+        container = self._stack.pop()[1]
+        self._attach(container, container=True)
+
+    def _attach(self, value, container):
+        if not self._stack:
+            self.result = value
+            self._state = "done"
+            return
+        path = self._child_path()
+        frame = self._stack[-1]
+        if frame[0] == "object":
+            frame[1][frame[3]] = value
+            frame[3] = None
+        else:
+            frame[1].append(value)
+        self._state = "after"
+
+        if not container:
+            self._events.append({"field": self._describe(path, value)})
+        elif frame[0] == "array":
+            self._events.append({"item": self._describe(path, value)})
+
+    def _describe(self, path, value):
+        schema_type = self.compiled.type_at(path) if self.compiled is not None else None
+        return {"path": list(path), "type": schema_type or _json_type(value), "value": value}
@@ -0,0 +1,82 @@
+const http = require('http');
+const path = require('path');
+
+// With MODEL_HOST=1 both processing modes run on src/model-host.py: one Python
+// process serving the legacy (3001) and realtime (3002) routes over a shared
+// set of loaded models. The bridge attaches to a host that is already running
+// (e.g. started with `npm run model-host`) instead of spawning its own, and
+// swaps the STT model in place rather than restarting the process.
+
+const MODEL_HOST_ENABLED = ['1', 'true', 'yes', 'on'].includes(String(process.env.MODEL_HOST || '').trim().toLowerCase());
+const MODEL_HOST_SCRIPT = path.join(__dirname, 'model-host.py');
+const PROBE_TIMEOUT_MS = 800;
+const STT_SWAP_TIMEOUT_MS = 180000;
+
+function requestJson({ port, method = 'GET', pathName, body = null, timeoutMs }) {
+  return new Promise((resolve, reject) => {
+    const payload = body ? JSON.stringify(body) : null;
+    const req = http.request({
+      hostname: 'localhost',
+      port,
+      path: pathName,
+      method,
+      timeout: timeoutMs,
+      headers: payload
+        ? { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(payload) }
+        : {},
+    }, (res) => {
+      let data = '';
+      res.on('data', chunk => data += chunk);
+      res.on('end', () => {
+        let parsed = null;
+        try {
+          parsed = JSON.parse(data);
+        } catch {
+          parsed = null;
+        }
+        if (res.statusCode !== 200) {
+          reject(new Error(parsed?.error || `HTTP ${res.statusCode}`));
+          return;
+        }
+        resolve(parsed);
+      });
+    });
+    req.on('timeout', () => req.destroy(new Error('timeout')));
+    req.on('error', reject);
+    req.end(payload || undefined);
+  });
+}
+
+// Resolves with /health when a model host already serves `mode` on `port`,
+// otherwise null.
+async function probeModelHost(port, mode) {
+  try {
+    const health = await requestJson({ port, pathName: '/health', timeoutMs: PROBE_TIMEOUT_MS });
+    return health?.host?.front_ends?.includes(mode) ? health : null;
+  } catch {
+    return null;
+  }
+}
+
+function swapModelHostStt(port, modelName) {
+  return requestJson({
+    port,
+    method: 'POST',
+    pathName: '/host/stt',
+    body: { model: modelName },
+    timeoutMs: STT_SWAP_TIMEOUT_MS,
+  });
+}
+
+function describeHost(hostInfo) {
+  const engines = (hostInfo?.engines || []).map((engine) => `${engine.kind}:${engine.name}`);
+  return `pid=${hostInfo?.pid ?? '?'} engines=[${engines.join(', ')}]`;
+}
+
+module.exports = {
+  MODEL_HOST_ENABLED,
+  MODEL_HOST_SCRIPT,
+  probeModelHost,
+  swapModelHostStt,
+  describeHost,
+};
@@ -0,0 +1,61 @@
+"""Single process serving both the legacy (3001) and realtime (3002) front ends.
+
+Each distinct engine (Whisper model, Kokoro) is loaded once and shared, so
+running both modes, or switching the bridge from one to the other, does not
+load a second copy. Started by the bridge when MODEL_HOST=1, or by hand with
+`npm run model-host` so it outlives bridge restarts.
+"""
+
+import signal
+import sys
+import threading
+
+from flask import Flask
+from werkzeug.serving import make_server
+
+import audio_channel
+import event_log
+import legacy_frontend
+import realtime_frontend
+from model_host import host
+
+
+def build_app(name, blueprint):
+    app = Flask(name)
+    app.register_blueprint(blueprint)
+    app.register_blueprint(audio_channel.echo_bp)
+    app.register_blueprint(event_log.blueprint())
+    host.front_ends.append(name)
+    return app
+
+
+def main():
+    servers = [
+        make_server("127.0.0.1", legacy_frontend.PORT, build_app("legacy", legacy_frontend.bp), threaded=True),
+        make_server("127.0.0.1", realtime_frontend.PORT, build_app("realtime", realtime_frontend.bp), threaded=True),
+    ]
+    legacy_frontend.load_models()
+    legacy_frontend.start_channel()
+    realtime_frontend.start_channel()
+
+    def shutdown(*_):
+        for server in servers:
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    threads = [threading.Thread(target=server.serve_forever, name=f"http-{server.port}") for server in servers]
+    for thread in threads:
+        thread.start()
+    print(
+        f"Model host serving legacy on {legacy_frontend.PORT} and realtime on {realtime_frontend.PORT} "
+        f"(STT={legacy_frontend.STT_BACKEND}, TTS={legacy_frontend.TTS_BACKEND})"
+    )
+    for thread in threads:
+        thread.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
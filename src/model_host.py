@@ -0,0 +1,318 @@
+"""Shared model host for the legacy and realtime front ends.
+
+Both HTTP front ends (legacy_frontend.py on 3001, realtime_frontend.py on
+3002) take their engines from the one ModelHost in this process instead of
+loading their own. An engine is keyed by (kind, backend, model), so two modes
+configured with the same Whisper model or the same Kokoro build share one
+resident copy. Modes keep their own routes and defaults (voice, lazy vs eager
+loading, log prefixes). Kokoro voices are a per-request argument, not part of
+the key.
+
+transcription-service.py and realtime-processing-service.py each mount one
+front end. model-host.py mounts both in one process, so switching the bridge
+between modes re-attaches to already-loaded models. /health on either port
+reports the resident engines under "host".
+
+Also shared here: the GPU lock (Metal/MLX is not thread-safe), admission
+control, speculative TTS pools, and the WAV/ffmpeg helpers both front ends use.
+"""
+
+import collections
+import io
+import os
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+import wave
+
+import numpy as np
+
+from admission import AdmissionController
+from event_log import events
+from tts_g2p import KokoroFrontend
+from tts_speculative import SpeculativeSynth
+
+KOKORO_REPO = "mlx-community/Kokoro-82M-bf16"
+
+
+class _Engine:
+    __slots__ = ("kind", "backend", "name", "value", "users", "load_ms", "loaded_at")
+
+    def __init__(self, kind, backend, name, value, load_ms):
+        self.kind = kind
+        self.backend = backend
+        self.name = name
+        self.value = value
+        self.users = set()
+        self.load_ms = load_ms
+        self.loaded_at = time.time()
+
+
+class ModelHost:
+    def __init__(self):
+        self.gpu_lock = threading.Lock()
+        self.admission = AdmissionController("[Admission]")
+        self._lock = threading.Lock()
+        self._key_locks = collections.defaultdict(threading.Lock)
+        self._engines = {}
+        self._speculators = {}
+        self.kokoro_frontend = KokoroFrontend.from_env(KOKORO_REPO)
+        self.front_ends = []
+
+    # --- Engines ---
+
+    def _claim_locked(self, key, user):
+        engine = self._engines.get(key)
+        if engine is not None:
+            engine.users.add(user)
+        return engine
+
+    def _acquire(self, key, user, loader):
+        # Users are only changed under self._lock, the lock release() checks
+        # them under, so an engine can't be unloaded between lookup and claim.
+        with self._lock:
+            engine = self._claim_locked(key, user)
+            key_lock = self._key_locks[key]
+        if engine is not None:
+            return engine.value
+        with key_lock:
+            with self._lock:
+                engine = self._claim_locked(key, user)
+            if engine is None:
+                t0 = time.time()
+                value = loader()
+                engine = _Engine(*key, value, int((time.time() - t0) * 1000))
+                with self._lock:
+                    engine.users.add(user)
+                    self._engines[key] = engine
+        return engine.value
+
+    def stt(self, backend, model_name, user, log_prefix="[STT]"):
+        """Return the resident STT engine for (backend, model), loading it on first use."""
+
+        def load():
+            if backend == "mlx":
+                from lightning_whisper_mlx import LightningWhisperMLX
+                print(f"{log_prefix} Loading lightning-whisper-mlx: {model_name}")
+                model = LightningWhisperMLX(model=model_name, batch_size=12)
+            else:
+                from whisper_cpu_pool import WhisperCpuPool
+                print(f"{log_prefix} Loading faster-whisper: {model_name} on cpu (int8)")
+                model = WhisperCpuPool(model_name, compute_type="int8", log_prefix=log_prefix)
+                self.admission.set_concurrency("stt", model.workers)
+            print(f"{log_prefix} {model_name} ready")
+            return model
+
+        return self._acquire(("stt", backend, model_name), user, load)
+
+    def tts(self, backend, user, log_prefix="[TTS]"):
+        """Return the resident TTS engine for backend ("system" for macOS say)."""
+
+        def load():
+            if backend == "kokoro":
+                from mlx_audio.tts.utils import load_model as load_tts_model
+                print(f"{log_prefix} Loading Kokoro...")
+                model = load_tts_model(KOKORO_REPO)
+                print(f"{log_prefix} Kokoro ready")
+                return model
+            print(f"{log_prefix} Using macOS system TTS (say)")
+            return "system"
+
+        name = KOKORO_REPO if backend == "kokoro" else "say"
+        return self._acquire(("tts", backend, name), user, load)
+
+    def resident(self, kind, backend, name):
+        """The loaded engine for a key, or None; never triggers a load."""
+        with self._lock:
+            engine = self._engines.get((kind, backend, name))
+        return engine.value if engine is not None else None
+
+    def release(self, kind, backend, name, user):
+        """Drop user's claim on an engine; unload it once nobody uses it."""
+        with self._lock:
+            engine = self._engines.get((kind, backend, name))
+            if engine is None:
+                return False
+            engine.users.discard(user)
+            if engine.users:
+                return False
+            del self._engines[(kind, backend, name)]
+        if hasattr(engine.value, "close"):
+            engine.value.close()
+        print(f"[Host] Unloaded {kind} {backend}:{name}")
+        return True
+
+    def speculator(self, tts_backend, synthesize, prepare=None, log_prefix="[TTS]"):
+        """One speculative pool per TTS engine, shared by every front end using it."""
+        with self._lock:
+            speculator = self._speculators.get(tts_backend)
+            if speculator is None:
+                speculator = SpeculativeSynth(
+                    synthesize,
+                    lock=self.gpu_lock if tts_backend == "kokoro" else None,
+                    is_busy=self.admission.busy,
+                    prepare=prepare,
+                    log_prefix=log_prefix,
+                )
+                self._speculators[tts_backend] = speculator
+            return speculator
+
+    def stats(self):
+        with self._lock:
+            engines = [
+                {
+                    "kind": engine.kind,
+                    "backend": engine.backend,
+                    "name": engine.name,
+                    "users": sorted(engine.users),
+                    "load_ms": engine.load_ms,
+                    "loaded_at": int(engine.loaded_at),
+                }
+                for engine in self._engines.values()
+            ]
+        kokoro_loaded = any(engine["backend"] == "kokoro" for engine in engines)
+        return {
+            "pid": os.getpid(),
+            "front_ends": list(self.front_ends),
+            "engines": engines,
+            "kokoro_g2p": self.kokoro_frontend.stats() if kokoro_loaded else None,
+        }
+
+
+host = ModelHost()
+
+
+# --- Shared audio helpers ---
+
+def pcm_to_wav_bytes(pcm_float32, sample_rate=24000):
+    pcm_int16 = np.clip(pcm_float32 * 32767, -32768, 32767).astype(np.int16)
+    num_samples = len(pcm_int16)
+    data_size = num_samples * 2
+
+    buf = io.BytesIO()
+    buf.write(b"RIFF")
+    buf.write(struct.pack("<I", 36 + data_size))
+    buf.write(b"WAVE")
+    buf.write(b"fmt ")
+    buf.write(struct.pack("<I", 16))
+    buf.write(struct.pack("<H", 1))
+    buf.write(struct.pack("<H", 1))
+    buf.write(struct.pack("<I", sample_rate))
+    buf.write(struct.pack("<I", sample_rate * 2))
+    buf.write(struct.pack("<H", 2))
+    buf.write(struct.pack("<H", 16))
+    buf.write(b"data")
+    buf.write(struct.pack("<I", data_size))
+    buf.write(pcm_int16.tobytes())
+    return buf.getvalue()
+
+
+def kokoro_wav_bytes(model, text, voice, speed=1.0, should_stop=None, phonemes=None, timings=None):
+    """Synthesize with Kokoro; caller holds host.gpu_lock. Returns None if no audio.
+
+    Text goes through host.kokoro_frontend (normalization, cached G2P);
+    phonemes from an earlier kokoro_frontend.phonemize() call (chunks or
+    TEXT_FALLBACK) skip that stage. timings, if given, collects g2p_ms and synth_ms. should_stop()
+    is checked after each segment so speculative renders can hand the
+    engine back early.
+    """
+    segments = []
+    for audio in host.kokoro_frontend.generate(model, text, voice, speed, phonemes=phonemes, timings=timings):
+        segments.append(np.array(audio).reshape(-1))
+        if should_stop is not None and should_stop():
+            return None
+    if not segments:
+        return None
+    return pcm_to_wav_bytes(np.concatenate(segments), sample_rate=24000)
+
+
+def system_wav_bytes(text):
+    """Synthesize with macOS say + afconvert. Returns None if conversion produced nothing."""
+    filename = f"tts_{uuid.uuid4().hex}"
+    aiff_path = os.path.join(tempfile.gettempdir(), filename + ".aiff")
+    wav_path = os.path.join(tempfile.gettempdir(), filename + ".wav")
+    try:
+        subprocess.run(["say", "-o", aiff_path, text], check=True, timeout=12)
+        subprocess.run(["afconvert", "-f", "WAVE", "-d", "LEI16", "-r", "22050", aiff_path, wav_path], check=True, timeout=6)
+        if not os.path.exists(wav_path):
+            return None
+        with open(wav_path, "rb") as f:
+            return f.read()
+    finally:
+        if os.path.exists(aiff_path):
+            os.remove(aiff_path)
+        if os.path.exists(wav_path):
+            os.remove(wav_path)
+
+
+def normalize_audio_mime_type(value):
+    normalized = str(value or "").lower()
+    if "audio/wav" in normalized or "audio/x-wav" in normalized or "audio/wave" in normalized:
+        return "audio/wav"
+    return "audio/webm"
+
+
+def save_uploaded_audio(audio_file):
+    mime = normalize_audio_mime_type(audio_file.mimetype)
+    filename = (audio_file.filename or "").lower()
+    suffix = ".wav" if mime == "audio/wav" or filename.endswith(".wav") else ".webm"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        audio_file.save(tmp.name)
+        return tmp.name
+
+
+def save_audio_bytes(payload, mime_type):
+    """save_uploaded_audio for raw bytes (audio channel frames)."""
+    suffix = ".wav" if normalize_audio_mime_type(mime_type) == "audio/wav" else ".webm"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        tmp.write(payload)
+        return tmp.name
+
+
+def wav_duration_s(path):
+    """Length of a WAV file in seconds; None if it can't be read as WAV."""
+    try:
+        with wave.open(path, "rb") as wav:
+            return wav.getnframes() / float(wav.getframerate() or 1)
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
+def transcribe_mlx_file(model, tmp_path, log_prefix="[STT]"):
+    """Transcribe with lightning-whisper-mlx; None if the container can't be decoded.
+
+    Browser-segment WAV uploads are transcribed directly; other containers
+    (e.g. webm) are converted to a separate temp WAV first. "duration" is the
+    decoded audio length in seconds (None if unknown).
+    """
+    is_wav_input = tmp_path.lower().endswith(".wav")
+    wav_path = tmp_path if is_wav_input else tmp_path.rsplit(".", 1)[0] + ".stt.wav"
+    try:
+        if not is_wav_input:
+            try:
+                subprocess.run(
+                    ["ffmpeg", "-y", "-i", tmp_path, "-ar", "16000", "-ac", "1", wav_path],
+                    check=True,
+                    timeout=12,
+                    capture_output=True,
+                )
+            except subprocess.CalledProcessError as err:
+                events.warn("stt", "%s ffmpeg decode failed (code=%s) — empty segment", log_prefix, err.returncode)
+                return None
+            except subprocess.TimeoutExpired:
+                events.warn("stt", "%s ffmpeg decode timeout — empty segment", log_prefix)
+                return None
+        with host.gpu_lock:
+            result = model.transcribe(wav_path, language="en")
+        return {
+            "text": str(result.get("text", "")).strip(),
+            "language": "en",
+            "probability": 1.0,
+            "duration": wav_duration_s(wav_path),
+        }
+    finally:
+        if not is_wav_input and os.path.exists(wav_path):
+            os.remove(wav_path)
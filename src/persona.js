@@ -66,6 +66,24 @@ function loadGreetingConfig() {
   };
 }
 
+function normalizeGreetingSet(set) {
+  const toLines = (list) => (Array.isArray(list) ? list.map((s) => String(s || '').trim()).filter(Boolean) : []);
+  return {
+    unnamed: toLines(set?.unnamed),
+    named: toLines(set?.named),
+  };
+}
+
+// Face-triggered greeting templates (wake/join/departure); named lines use %name%.
+function loadFaceGreetingTemplates() {
+  const config = readJsonFile(greetingsPath, {});
+  return {
+    wake: normalizeGreetingSet(config.wake),
+    join: normalizeGreetingSet(config.join),
+    departure: normalizeGreetingSet(config.departure),
+  };
+}
+
 function randomItem(list) {
   if (!Array.isArray(list) || list.length === 0) return null;
   return list[Math.floor(Math.random() * list.length)];
@@ -109,5 +127,6 @@ function pickGreetingResponse(text) {
 module.exports = {
   loadSystemPrompt,
   loadGreetingConfig,
+  loadFaceGreetingTemplates,
   pickGreetingResponse,
 };
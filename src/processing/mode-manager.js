@@ -41,8 +41,15 @@ function restartTranscriptionService(modelName, reason = 'runtime config update'
   return activeMode.restartTranscriptionService(modelName, reason);
 }
 
-function transcribeAudio(audioBuffer, mimeType = 'audio/webm') {
-  return activeMode.transcribeAudio(audioBuffer, mimeType);
+// options.sessionId keeps a conversation's requests on one worker when a
+// worker router is in front (X-Session-Id).
+function transcribeAudio(audioBuffer, mimeType = 'audio/webm', options = {}) {
+  return activeMode.transcribeAudio(audioBuffer, mimeType, options);
+}
+
+// Segment-by-segment transcription; see src/stt-stream-client.js for options.
+function transcribeAudioStream(audioBuffer, mimeType = 'audio/webm', options = {}) {
+  return activeMode.transcribeAudioStream(audioBuffer, mimeType, options);
 }
 
 function getTtsProxyTarget() {
@@ -56,6 +63,12 @@ function getTtsProxyTarget() {
   };
 }
 
+function syncFaceIndex(op, payload) {
+  if (typeof activeMode.syncFaceIndex === 'function') {
+    activeMode.syncFaceIndex(op, payload);
+  }
+}
+
 module.exports = {
   getProcessingMode,
   getModeAdapter,
@@ -63,5 +76,7 @@ module.exports = {
   stopProcessingStack,
   restartTranscriptionService,
   transcribeAudio,
+  transcribeAudioStream,
   getTtsProxyTarget,
+  syncFaceIndex,
 };
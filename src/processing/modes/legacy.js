@@ -3,6 +3,7 @@ const {
   stopTranscriptionService,
   restartTranscriptionService,
   transcribeAudio,
+  transcribeAudioStream,
 } = require('../../python-service');
 
 function getTtsProxyTarget() {
@@ -24,8 +25,11 @@ module.exports = {
   restartTranscriptionService(modelName, reason = 'runtime config update') {
     return restartTranscriptionService(modelName, reason);
   },
-  transcribeAudio(audioBuffer, mimeType = 'audio/webm') {
-    return transcribeAudio(audioBuffer, mimeType);
+  transcribeAudio(audioBuffer, mimeType = 'audio/webm', options = {}) {
+    return transcribeAudio(audioBuffer, mimeType, options);
+  },
+  transcribeAudioStream(audioBuffer, mimeType = 'audio/webm', options = {}) {
+    return transcribeAudioStream(audioBuffer, mimeType, options);
   },
   getTtsProxyTarget,
 };
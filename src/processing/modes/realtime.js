@@ -3,6 +3,8 @@ const {
   stopRealtimeProcessingService,
   restartRealtimeProcessingService,
   transcribeAudioRealtime,
+  transcribeAudioRealtimeStream,
+  syncRealtimeFaceIndex,
   getRealtimeTtsProxyTarget,
 } = require('../../realtime-service');
 
@@ -17,10 +19,16 @@ module.exports = {
   restartTranscriptionService(modelName, reason = 'runtime config update') {
     return restartRealtimeProcessingService(modelName, reason);
   },
-  transcribeAudio(audioBuffer, mimeType = 'audio/webm') {
-    return transcribeAudioRealtime(audioBuffer, mimeType);
+  transcribeAudio(audioBuffer, mimeType = 'audio/webm', options = {}) {
+    return transcribeAudioRealtime(audioBuffer, mimeType, options);
+  },
+  transcribeAudioStream(audioBuffer, mimeType = 'audio/webm', options = {}) {
+    return transcribeAudioRealtimeStream(audioBuffer, mimeType, options);
   },
   getTtsProxyTarget() {
     return getRealtimeTtsProxyTarget();
   },
+  syncFaceIndex(op, payload) {
+    return syncRealtimeFaceIndex(op, payload);
+  },
 };
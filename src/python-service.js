@@ -2,24 +2,76 @@ const http = require('http');
 const path = require('path');
 const { spawn } = require('child_process');
 const { runtimeConfig, normalizeSttModel } = require('./config');
+const { streamTranscription } = require('./stt-stream-client');
+const {
+  MODEL_HOST_ENABLED,
+  MODEL_HOST_SCRIPT,
+  probeModelHost,
+  swapModelHostStt,
+  describeHost,
+} = require('./model-host-client');
+const { WORKER_POOL_ENABLED, WORKER_ROUTER_SCRIPT, SESSION_HEADER } = require('./worker-pool-client');
+const {
+  AUDIO_CHANNEL_ENABLED,
+  getAudioChannel,
+  isChannelUnavailable,
+  transcribeOverChannel,
+} = require('./audio-channel-client');
+const {
+  STT_REQUEST_DEADLINE_MS,
+  DEADLINE_HEADER,
+  getRetryAfterMs,
+  isBackpressureStatus,
+  createBusyError,
+  connectRetryDelayMs,
+} = require('./service-backpressure');
 
 let pythonProcess = null;
+let attachedToHost = false;
 const pythonPath = path.join(__dirname, '../venv/bin/python');
+const LEGACY_PORT = 3001;
 
 function startTranscriptionService(modelName = runtimeConfig.sttModel) {
   const resolvedModel = normalizeSttModel(modelName);
   runtimeConfig.sttModel = resolvedModel;
-  console.log(`[Bridge] Spawning Python service (Whisper=${resolvedModel})...`);
+  if (!MODEL_HOST_ENABLED || WORKER_POOL_ENABLED) {
+    spawnTranscriptionService(resolvedModel);
+    return;
+  }
+
+  probeModelHost(LEGACY_PORT, 'legacy').then(async (health) => {
+    if (!health) {
+      spawnTranscriptionService(resolvedModel);
+      return;
+    }
+    attachedToHost = true;
+    console.log(`[Bridge] Attached to running model host (${describeHost(health.host)})`);
+    if (health.model !== resolvedModel) {
+      try {
+        await swapModelHostStt(LEGACY_PORT, resolvedModel);
+      } catch (err) {
+        console.error(`[Bridge] Model host could not switch Whisper to ${resolvedModel}: ${err.message}`);
+      }
+    }
+  });
+}
+
+function spawnTranscriptionService(resolvedModel) {
+  const script = WORKER_POOL_ENABLED
+    ? WORKER_ROUTER_SCRIPT
+    : (MODEL_HOST_ENABLED ? MODEL_HOST_SCRIPT : path.join(__dirname, 'transcription-service.py'));
+  console.log(`[Bridge] Spawning Python service (Whisper=${resolvedModel}, script=${path.basename(script)})...`);
 
   const proc = spawn(
     pythonPath,
-    ['-u', path.join(__dirname, 'transcription-service.py')],
+    ['-u', script],
     {
       env: {
         ...process.env,
         WHISPER_MODEL: resolvedModel,
         TTS_BACKEND: runtimeConfig.ttsBackend || 'kokoro',
         STT_BACKEND: runtimeConfig.sttBackend || 'mlx',
+        WORKER_ROUTER_MODE: 'legacy',
       },
     }
   );
@@ -100,6 +152,18 @@ function stopTranscriptionService(timeoutMs = 5000) {
 
 async function restartTranscriptionService(modelName, reason = 'runtime config update') {
   const resolvedModel = normalizeSttModel(modelName);
+  if ((MODEL_HOST_ENABLED || WORKER_POOL_ENABLED) && (attachedToHost || pythonProcess)) {
+    // The host keeps Kokoro (and the other mode's engines) loaded; only Whisper changes.
+    console.log(`[Bridge] Switching model host Whisper to ${resolvedModel} (${reason})...`);
+    try {
+      await swapModelHostStt(LEGACY_PORT, resolvedModel);
+      runtimeConfig.sttModel = resolvedModel;
+      return;
+    } catch (err) {
+      if (!pythonProcess) throw err;
+      console.error(`[Bridge] In-place Whisper switch failed (${err.message}); restarting host process`);
+    }
+  }
   console.log(`[Bridge] Restarting transcription service (${reason}) with Whisper=${resolvedModel}...`);
   await stopTranscriptionService();
   if (pythonProcess) {
@@ -118,20 +182,42 @@ function normalizeAudioMimeType(value) {
   return 'audio/webm';
 }
 
-function transcribeAudio(audioBuffer, mimeType = 'audio/webm') {
+// Prefers the persistent audio channel (AUDIO_CHANNEL=1); multipart HTTP is the
+// fallback whenever the channel can't be reached.
+async function transcribeAudio(audioBuffer, mimeType = 'audio/webm', { sessionId = null } = {}) {
+  if (AUDIO_CHANNEL_ENABLED && !WORKER_POOL_ENABLED) {
+    try {
+      return await transcribeOverChannel(
+        getAudioChannel(LEGACY_PORT, 'Transcription channel'),
+        audioBuffer,
+        normalizeAudioMimeType(mimeType),
+        'Transcription service'
+      );
+    } catch (err) {
+      if (!isChannelUnavailable(err)) throw err;
+    }
+  }
+  return transcribeAudioHttp(audioBuffer, mimeType, sessionId);
+}
+
+function transcribeAudioHttp(audioBuffer, mimeType = 'audio/webm', sessionId = null) {
   return new Promise((resolve, reject) => {
     const boundary = '---BOUNDARY';
     const safeMimeType = normalizeAudioMimeType(mimeType);
     const extension = safeMimeType === 'audio/wav' ? 'wav' : 'webm';
 
-    const tryRequest = (retries = 10) => {
+    const deadlineAt = Date.now() + STT_REQUEST_DEADLINE_MS;
+
+    const tryRequest = (attempt = 0) => {
       const req = http.request({
         hostname: 'localhost',
-        port: 3001,
+        port: LEGACY_PORT,
         path: '/transcribe',
         method: 'POST',
         headers: {
-          'Content-Type': `multipart/form-data; boundary=${boundary}`
+          'Content-Type': `multipart/form-data; boundary=${boundary}`,
+          [DEADLINE_HEADER]: String(Math.max(1, deadlineAt - Date.now())),
+          ...(sessionId ? { [SESSION_HEADER]: String(sessionId) } : {}),
         }
       }, (res) => {
         let body = '';
@@ -143,6 +229,16 @@ function transcribeAudio(audioBuffer, mimeType = 'audio/webm') {
             } catch (e) {
               reject(new Error('Invalid JSON from transcription service'));
             }
+          } else if (isBackpressureStatus(res.statusCode)) {
+            // 429 = queue full, worth one more try if Retry-After still fits the
+            // deadline. 503 = this segment was shed or can't finish in time.
+            const retryAfterMs = getRetryAfterMs(res, body);
+            if (res.statusCode === 429 && Date.now() + retryAfterMs < deadlineAt) {
+              console.log(`[Bridge] Transcription service queue full, retrying in ${retryAfterMs}ms`);
+              setTimeout(() => tryRequest(attempt + 1), retryAfterMs);
+              return;
+            }
+            reject(createBusyError('Transcription service', res, body));
           } else {
             reject(new Error(`Transcription failed: ${body}`));
           }
@@ -150,9 +246,10 @@ function transcribeAudio(audioBuffer, mimeType = 'audio/webm') {
       });
 
       req.on('error', (err) => {
-        if (retries > 0 && err.code === 'ECONNREFUSED') {
-          console.log(`[Bridge] Transcription service busy/loading, retrying... (${retries})`);
-          setTimeout(() => tryRequest(retries - 1), 2000);
+        const delayMs = connectRetryDelayMs(attempt);
+        if (err.code === 'ECONNREFUSED' && Date.now() + delayMs < deadlineAt) {
+          console.log(`[Bridge] Transcription service not listening yet, retrying in ${delayMs}ms...`);
+          setTimeout(() => tryRequest(attempt + 1), delayMs);
         } else {
           reject(err);
         }
@@ -170,9 +267,20 @@ function transcribeAudio(audioBuffer, mimeType = 'audio/webm') {
   });
 }
 
+function transcribeAudioStream(audioBuffer, mimeType = 'audio/webm', options = {}) {
+  return streamTranscription({
+    ...options,
+    port: LEGACY_PORT,
+    audioBuffer,
+    mimeType: normalizeAudioMimeType(mimeType),
+    label: 'Transcription',
+  });
+}
+
 module.exports = {
   startTranscriptionService,
   stopTranscriptionService,
   restartTranscriptionService,
   transcribeAudio,
+  transcribeAudioStream,
 };
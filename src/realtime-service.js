@@ -2,11 +2,35 @@ const http = require('http');
 const path = require('path');
 const { spawn } = require('child_process');
 const { runtimeConfig, normalizeSttModel } = require('./config');
+const { streamTranscription } = require('./stt-stream-client');
+const {
+  MODEL_HOST_ENABLED,
+  MODEL_HOST_SCRIPT,
+  probeModelHost,
+  swapModelHostStt,
+  describeHost,
+} = require('./model-host-client');
+const { WORKER_POOL_ENABLED, WORKER_ROUTER_SCRIPT, SESSION_HEADER } = require('./worker-pool-client');
+const {
+  AUDIO_CHANNEL_ENABLED,
+  getAudioChannel,
+  isChannelUnavailable,
+  transcribeOverChannel,
+} = require('./audio-channel-client');
+const {
+  STT_REQUEST_DEADLINE_MS,
+  DEADLINE_HEADER,
+  getRetryAfterMs,
+  isBackpressureStatus,
+  createBusyError,
+  connectRetryDelayMs,
+} = require('./service-backpressure');
 
 const DEFAULT_PORT = Number.parseInt(process.env.REALTIME_PROCESSING_PORT || '3002', 10) || 3002;
 const pythonPath = path.join(__dirname, '../venv/bin/python');
 
 let realtimeProcess = null;
+let attachedToHost = false;
 
 function buildRealtimeChildEnv({ sttModel } = {}) {
   const resolvedModel = normalizeSttModel(sttModel || runtimeConfig.sttModel || process.env.REALTIME_STT_MODEL || process.env.WHISPER_MODEL || 'small');
@@ -28,6 +52,7 @@ function buildRealtimeChildEnv({ sttModel } = {}) {
     env: {
       ...process.env,
       REALTIME_PROCESSING_PORT: String(DEFAULT_PORT),
+      WORKER_ROUTER_MODE: 'realtime',
       REALTIME_STT_MODEL: resolvedModel,
       REALTIME_STT_BACKEND: resolvedSttBackend,
       REALTIME_TTS_BACKEND: resolvedTtsBackend,
@@ -45,20 +70,47 @@ function getRealtimeServicePort() {
 }
 
 function startRealtimeProcessingService({ sttModel } = {}) {
-  const {
-    resolvedModel,
-    resolvedSttBackend,
-    resolvedTtsBackend,
-    resolvedKokoroVoice,
-    env,
-  } = buildRealtimeChildEnv({ sttModel });
+  const childConfig = buildRealtimeChildEnv({ sttModel });
+  runtimeConfig.sttModel = childConfig.resolvedModel;
+  if (!MODEL_HOST_ENABLED || WORKER_POOL_ENABLED) {
+    spawnRealtimeProcessingService(childConfig);
+    return;
+  }
+
+  probeModelHost(DEFAULT_PORT, 'realtime').then(async (health) => {
+    if (!health) {
+      spawnRealtimeProcessingService(childConfig);
+      return;
+    }
+    attachedToHost = true;
+    console.log(`[Bridge] Attached to running model host (${describeHost(health.host)})`);
+    if (health.stt_model !== childConfig.resolvedModel) {
+      try {
+        await swapModelHostStt(DEFAULT_PORT, childConfig.resolvedModel);
+      } catch (err) {
+        console.error(`[Bridge] Model host could not switch realtime STT to ${childConfig.resolvedModel}: ${err.message}`);
+      }
+    }
+  });
+}
+
+function spawnRealtimeProcessingService({
+  resolvedModel,
+  resolvedSttBackend,
+  resolvedTtsBackend,
+  resolvedKokoroVoice,
+  env,
+}) {
+  const script = WORKER_POOL_ENABLED
+    ? WORKER_ROUTER_SCRIPT
+    : (MODEL_HOST_ENABLED ? MODEL_HOST_SCRIPT : path.join(__dirname, 'realtime-processing-service.py'));
   console.log(
-    `[Bridge] Spawning realtime processing service (port=${DEFAULT_PORT}, sttModel=${resolvedModel}, sttBackend=${resolvedSttBackend}, ttsBackend=${resolvedTtsBackend}, voice=${resolvedKokoroVoice})...`
+    `[Bridge] Spawning realtime processing service (port=${DEFAULT_PORT}, sttModel=${resolvedModel}, sttBackend=${resolvedSttBackend}, ttsBackend=${resolvedTtsBackend}, voice=${resolvedKokoroVoice}, script=${path.basename(script)})...`
   );
 
   const proc = spawn(
     pythonPath,
-    ['-u', path.join(__dirname, 'realtime-processing-service.py')],
+    ['-u', script],
     { env }
   );
 
@@ -136,6 +188,18 @@ function stopRealtimeProcessingService(timeoutMs = 5000) {
 
 async function restartRealtimeProcessingService(modelName, reason = 'runtime config update') {
   const resolvedModel = normalizeSttModel(modelName);
+  if ((MODEL_HOST_ENABLED || WORKER_POOL_ENABLED) && (attachedToHost || realtimeProcess)) {
+    // The host keeps Kokoro (and the other mode's engines) loaded; only STT changes.
+    console.log(`[Bridge] Switching model host realtime STT to ${resolvedModel} (${reason})...`);
+    try {
+      await swapModelHostStt(DEFAULT_PORT, resolvedModel);
+      runtimeConfig.sttModel = resolvedModel;
+      return;
+    } catch (err) {
+      if (!realtimeProcess) throw err;
+      console.error(`[Bridge] In-place STT switch failed (${err.message}); restarting host process`);
+    }
+  }
   console.log(`[Bridge] Restarting realtime processing service (${reason}) with STT=${resolvedModel}...`);
   await stopRealtimeProcessingService();
   if (realtimeProcess) {
@@ -154,20 +218,42 @@ function normalizeAudioMimeType(value) {
   return 'audio/webm';
 }
 
-function transcribeAudioRealtime(audioBuffer, mimeType = 'audio/webm') {
+// Prefers the persistent audio channel (AUDIO_CHANNEL=1); multipart HTTP is the
+// fallback whenever the channel can't be reached.
+async function transcribeAudioRealtime(audioBuffer, mimeType = 'audio/webm', { sessionId = null } = {}) {
+  if (AUDIO_CHANNEL_ENABLED && !WORKER_POOL_ENABLED) {
+    try {
+      return await transcribeOverChannel(
+        getAudioChannel(DEFAULT_PORT, 'Realtime channel'),
+        audioBuffer,
+        normalizeAudioMimeType(mimeType),
+        'Realtime processing service'
+      );
+    } catch (err) {
+      if (!isChannelUnavailable(err)) throw err;
+    }
+  }
+  return transcribeAudioRealtimeHttp(audioBuffer, mimeType, sessionId);
+}
+
+function transcribeAudioRealtimeHttp(audioBuffer, mimeType = 'audio/webm', sessionId = null) {
   return new Promise((resolve, reject) => {
     const boundary = '---BOUNDARY';
     const safeMimeType = normalizeAudioMimeType(mimeType);
     const extension = safeMimeType === 'audio/wav' ? 'wav' : 'webm';
 
-    const tryRequest = (retries = 10) => {
+    const deadlineAt = Date.now() + STT_REQUEST_DEADLINE_MS;
+
+    const tryRequest = (attempt = 0) => {
       const req = http.request({
         hostname: 'localhost',
         port: DEFAULT_PORT,
         path: '/transcribe',
         method: 'POST',
         headers: {
-          'Content-Type': `multipart/form-data; boundary=${boundary}`
+          'Content-Type': `multipart/form-data; boundary=${boundary}`,
+          [DEADLINE_HEADER]: String(Math.max(1, deadlineAt - Date.now())),
+          ...(sessionId ? { [SESSION_HEADER]: String(sessionId) } : {}),
         }
       }, (res) => {
         let body = '';
@@ -179,6 +265,16 @@ function transcribeAudioRealtime(audioBuffer, mimeType = 'audio/webm') {
             } catch {
               reject(new Error('Invalid JSON from realtime processing service'));
             }
+          } else if (isBackpressureStatus(res.statusCode)) {
+            // 429 = queue full, worth one more try if Retry-After still fits the
+            // deadline. 503 = this segment was shed or can't finish in time.
+            const retryAfterMs = getRetryAfterMs(res, body);
+            if (res.statusCode === 429 && Date.now() + retryAfterMs < deadlineAt) {
+              console.log(`[Bridge] Realtime processing service queue full, retrying in ${retryAfterMs}ms`);
+              setTimeout(() => tryRequest(attempt + 1), retryAfterMs);
+              return;
+            }
+            reject(createBusyError('Realtime processing service', res, body));
           } else {
             reject(new Error(`Realtime transcription failed: ${body}`));
           }
@@ -186,9 +282,10 @@ function transcribeAudioRealtime(audioBuffer, mimeType = 'audio/webm') {
       });
 
       req.on('error', (err) => {
-        if (retries > 0 && err.code === 'ECONNREFUSED') {
-          console.log(`[Bridge] Realtime processing service unavailable, retrying... (${retries})`);
-          setTimeout(() => tryRequest(retries - 1), 2000);
+        const delayMs = connectRetryDelayMs(attempt);
+        if (err.code === 'ECONNREFUSED' && Date.now() + delayMs < deadlineAt) {
+          console.log(`[Bridge] Realtime processing service not listening yet, retrying in ${delayMs}ms...`);
+          setTimeout(() => tryRequest(attempt + 1), delayMs);
         } else {
           reject(err);
         }
@@ -206,6 +303,42 @@ function transcribeAudioRealtime(audioBuffer, mimeType = 'audio/webm') {
   });
 }
 
+function transcribeAudioRealtimeStream(audioBuffer, mimeType = 'audio/webm', options = {}) {
+  return streamTranscription({
+    ...options,
+    port: DEFAULT_PORT,
+    audioBuffer,
+    mimeType: normalizeAudioMimeType(mimeType),
+    label: 'Realtime transcription',
+  });
+}
+
+// Mirror a face-library change into the realtime service's face index so it
+// can update incrementally instead of reloading data/face-library.json.
+function syncRealtimeFaceIndex(op, payload) {
+  const routePath = op === 'remove' ? '/faces/remove' : '/faces/enroll';
+  const body = JSON.stringify(payload || {});
+  const req = http.request({
+    hostname: 'localhost',
+    port: DEFAULT_PORT,
+    path: routePath,
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Content-Length': Buffer.byteLength(body),
+    },
+  }, (res) => {
+    res.resume();
+    if (res.statusCode !== 200) {
+      console.warn(`[Bridge] Realtime face index ${op} failed (${res.statusCode})`);
+    }
+  });
+  req.on('error', (err) => {
+    console.warn(`[Bridge] Realtime face index ${op} skipped: ${err.message}`);
+  });
+  req.end(body);
+}
+
 function getRealtimeTtsProxyTarget() {
   return {
     hostname: 'localhost',
@@ -220,5 +353,7 @@ module.exports = {
   stopRealtimeProcessingService,
   restartRealtimeProcessingService,
   transcribeAudioRealtime,
+  transcribeAudioRealtimeStream,
+  syncRealtimeFaceIndex,
   getRealtimeTtsProxyTarget,
 };
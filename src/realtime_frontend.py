@@ -0,0 +1,510 @@
+"""Realtime-mode front end (port 3002): STT, TTS, face index and LLM routes.
+
+Engines come from the shared ModelHost (model_host.py) and are loaded lazily
+on first use, configured by the REALTIME_* variables. With
+REALTIME_STT_FALLBACK_MODEL set, segments move to that model under load
+(stt_tiers.py).
+"""
+
+import io
+import itertools
+import os
+import subprocess
+import threading
+import time
+
+from flask import Blueprint, Response, jsonify, request
+
+import audio_channel
+from event_log import events
+from face_index import FaceIndex
+from llm_structured import IncrementalJsonParser, schema_cache_stats
+from model_host import host, kokoro_wav_bytes, save_audio_bytes, save_uploaded_audio, system_wav_bytes, transcribe_mlx_file
+from realtime_llm import LLM_PROVIDER, llm_generate, llm_stream_chunks, prepare_llm_request
+from stt_streaming import ndjson, parse_stream_options, single_segment_stream, stream_transcription
+from stt_tiers import SttTiers
+from tts_batch import BATCH_MIMETYPE, BatchRequestError, parse_batch_items, render_batch
+
+bp = Blueprint("realtime", __name__)
+admission = host.admission
+
+PORT = int(os.environ.get("REALTIME_PROCESSING_PORT", "3002"))
+STT_MODEL = os.environ.get("REALTIME_STT_MODEL", os.environ.get("WHISPER_MODEL", "small"))
+STT_FALLBACK_MODEL = os.environ.get("REALTIME_STT_FALLBACK_MODEL", os.environ.get("STT_FALLBACK_MODEL", "")).strip()
+STT_BACKEND = os.environ.get("REALTIME_STT_BACKEND", os.environ.get("STT_BACKEND", "mlx")).strip().lower()
+TTS_BACKEND = os.environ.get("REALTIME_TTS_BACKEND", os.environ.get("TTS_BACKEND", "kokoro")).strip().lower()
+KOKORO_VOICE = os.environ.get("REALTIME_KOKORO_VOICE", os.environ.get("KOKORO_VOICE", "hm_omega"))
+MIN_STT_AUDIO_BYTES = int(os.environ.get("REALTIME_MIN_STT_AUDIO_BYTES", "2048"))
+FACE_LIBRARY_PATH = os.environ.get(
+    "FACE_LIBRARY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "face-library.json"),
+)
+
+face_index = None
+channel = None
+_face_index_lock = threading.Lock()
+
+
+def _load_stt_model(model_name):
+    return host.stt(STT_BACKEND, model_name, user="realtime", log_prefix="[Realtime STT]")
+
+
+stt_tiers = SttTiers(STT_MODEL, STT_FALLBACK_MODEL, _load_stt_model, log_prefix="[Realtime STT]")
+
+
+def select_stt_model():
+    """(tier, model_name, engine) for the next segment; loads both tiers on first use."""
+    stt_tiers.ensure_loaded()
+    return stt_tiers.select(admission.backlog_ms("stt"))
+
+
+def ensure_tts_model():
+    return host.tts(TTS_BACKEND, user="realtime", log_prefix="[Realtime TTS]")
+
+
+def ensure_face_index():
+    global face_index
+    if face_index is not None:
+        return face_index
+
+    with _face_index_lock:
+        if face_index is None:
+            t0 = time.time()
+            index = FaceIndex(FACE_LIBRARY_PATH).load()
+            elapsed = int((time.time() - t0) * 1000)
+            events.info(
+                "faces", "[Realtime Faces] Index ready: %d embeddings from %s in %dms",
+                len(index), index.loaded_from, elapsed, faces=len(index), ms=elapsed,
+            )
+            face_index = index
+    return face_index
+
+
+def speculative_wav_bytes(text, voice, speed, should_stop, prepared=None):
+    model = ensure_tts_model()
+    if TTS_BACKEND == "kokoro":
+        return kokoro_wav_bytes(model, text, voice, speed, should_stop=should_stop, phonemes=prepared)
+    return system_wav_bytes(text)
+
+
+def kokoro_phonemize(text, voice, speed):
+    return host.kokoro_frontend.phonemize(ensure_tts_model(), text)
+
+
+speculator = host.speculator(
+    TTS_BACKEND, speculative_wav_bytes,
+    prepare=kokoro_phonemize if TTS_BACKEND == "kokoro" else None,
+    log_prefix="[Realtime TTS]",
+)
+
+
+@bp.route("/health", methods=["GET"])
+def health():
+    stt_workers = host.resident("stt", STT_BACKEND, STT_MODEL) if STT_BACKEND != "mlx" else None
+    return jsonify({
+        "status": "ok",
+        "port": PORT,
+        "stt_model": STT_MODEL,
+        "stt_backend": STT_BACKEND,
+        "tts_backend": TTS_BACKEND,
+        "llm_provider": LLM_PROVIDER,
+        "stt_workers": stt_workers.stats() if stt_workers is not None else None,
+        "stt_tiers": stt_tiers.stats(),
+        "face_index": face_index.stats() if face_index is not None else None,
+        "admission": admission.stats(),
+        "speculative": speculator.stats(),
+        "llm_schema_cache": schema_cache_stats(),
+        "channel": channel.stats() if channel is not None else None,
+        "events": events.stats(),
+        "host": host.stats(),
+    })
+
+
+@bp.route("/host/stt", methods=["POST"])
+def host_stt_route():
+    """Switch this mode's Whisper model in place; the old one unloads if unused."""
+    global STT_MODEL
+    model_name = str((request.json or {}).get("model") or "").strip()
+    if not model_name:
+        return jsonify({"error": "Missing model"}), 400
+    previous = STT_MODEL
+    try:
+        _load_stt_model(model_name)
+    except Exception as err:
+        return jsonify({"error": str(err)}), 500
+    STT_MODEL = stt_tiers.primary = model_name
+    if not stt_tiers.in_use(previous):
+        host.release("stt", STT_BACKEND, previous, "realtime")
+    return jsonify({"ok": True, "stt_model": STT_MODEL, "previous": previous})
+
+
+EMPTY_TRANSCRIPT = {
+    "text": "",
+    "language": "en",
+    "probability": 0.0,
+}
+
+
+@bp.route("/transcribe", methods=["POST"])
+@admission.guard("stt")
+def transcribe():
+    if "audio" not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
+
+    tmp_path = save_uploaded_audio(request.files["audio"])
+
+    try:
+        if os.path.getsize(tmp_path) < MIN_STT_AUDIO_BYTES:
+            return jsonify(EMPTY_TRANSCRIPT)
+        return jsonify(transcribe_audio(tmp_path))
+    except Exception as err:
+        return jsonify({"error": str(err)}), 500
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def transcribe_audio(audio):
+    """Transcribe a saved upload (or, for faster-whisper, a file-like of audio bytes)."""
+    tier, model_name, model = select_stt_model()
+    t0 = time.time()
+
+    if STT_BACKEND == "mlx":
+        result = transcribe_mlx_file(model, audio, log_prefix="[Realtime STT]")
+        if result is None:
+            return {**EMPTY_TRANSCRIPT, "tier": tier, "model": model_name}
+        elapsed = int((time.time() - t0) * 1000)
+        stt_tiers.observe(tier, result.pop("duration"), elapsed / 1000.0)
+        events.info("stt", "[Realtime STT] mlx transcribed in %dms (%s): %.80s", elapsed, model_name, result["text"], ms=elapsed, tier=tier)
+        return {**result, "tier": tier, "model": model_name}
+
+    text, info = model.transcribe(audio, beam_size=1, language="en")
+    elapsed = int((time.time() - t0) * 1000)
+    stt_tiers.observe(tier, getattr(info, "duration", None), elapsed / 1000.0)
+    events.info("stt", "[Realtime STT] faster-whisper transcribed in %dms (%s): %.80s", elapsed, model_name, text, ms=elapsed, tier=tier)
+    return {
+        "text": text,
+        "language": getattr(info, "language", "en"),
+        "probability": float(getattr(info, "language_probability", 1.0) or 1.0),
+        "tier": tier,
+        "model": model_name,
+    }
+
+
+@bp.route("/transcribe/stream", methods=["POST"])
+@admission.guard("stt")
+def transcribe_stream():
+    if "audio" not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
+
+    tmp_path = save_uploaded_audio(request.files["audio"])
+    max_duration, wake_words = parse_stream_options(request.values)
+
+    def cleanup():
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if os.path.getsize(tmp_path) < MIN_STT_AUDIO_BYTES:
+        cleanup()
+        return Response(single_segment_stream("", probability=0.0), mimetype="application/x-ndjson")
+
+    try:
+        tier, model_name, model = select_stt_model()
+    except Exception as err:
+        cleanup()
+        return jsonify({"error": str(err)}), 500
+
+    def generate():
+        t0 = time.time()
+        try:
+            if STT_BACKEND == "mlx":
+                # lightning-whisper-mlx decodes the whole file at once, so the
+                # stream carries a single segment.
+                result = transcribe_mlx_file(model, tmp_path, log_prefix="[Realtime STT]") or EMPTY_TRANSCRIPT
+                elapsed = int((time.time() - t0) * 1000)
+                stt_tiers.observe(tier, result.get("duration"), elapsed / 1000.0)
+                events.info("stt", "[Realtime STT] mlx transcribed in %dms (%s): %.80s", elapsed, model_name, result["text"], ms=elapsed, tier=tier)
+                yield from single_segment_stream(
+                    result["text"], probability=result["probability"], elapsed_ms=elapsed, tier=tier, model=model_name
+                )
+            else:
+                yield from stream_transcription(
+                    model,
+                    tmp_path,
+                    max_duration=max_duration,
+                    wake_words=wake_words,
+                    log_prefix="[Realtime STT]",
+                    observe=lambda audio_s, elapsed_s: stt_tiers.observe(tier, audio_s, elapsed_s),
+                    tier=tier,
+                    model=model_name,
+                )
+        except Exception as err:
+            yield ndjson({"error": str(err)})
+        finally:
+            cleanup()
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+
+@bp.route("/tts", methods=["POST"])
+@admission.guard("tts")
+def tts():
+    data = request.json or {}
+    text = str(data.get("text") or "").strip()
+    voice = str(data.get("voice") or KOKORO_VOICE).strip().lower()
+    if not text:
+        return jsonify({"error": "No text provided"}), 400
+
+    try:
+        wav_bytes, speculative = synthesize_wav(text, voice)
+    except subprocess.CalledProcessError as err:
+        return jsonify({"error": f"TTS process failed: {err}"}), 500
+    except Exception as err:
+        return jsonify({"error": str(err)}), 500
+
+    response = Response(wav_bytes, mimetype="audio/wav")
+    if speculative:
+        response.headers["X-TTS-Speculative"] = "hit"
+    return response
+
+
+def synthesize_wav(text, voice):
+    """Render text to WAV bytes; returns (wav_bytes, served_from_speculative_pool)."""
+    wav_bytes = speculator.claim(text, voice)
+    if wav_bytes:
+        events.info("tts", "[Realtime TTS] Served %d bytes from speculative pool", len(wav_bytes), bytes=len(wav_bytes), speculative=True)
+        return wav_bytes, True
+
+    if TTS_BACKEND == "kokoro":
+        t0 = time.time()
+        model = ensure_tts_model()
+        timings = {}
+        # G2P runs before taking the GPU lock; only synthesis holds it.
+        phonemes = host.kokoro_frontend.phonemize(model, text, timings)
+        with host.gpu_lock:
+            wav_bytes = kokoro_wav_bytes(model, text, voice, phonemes=phonemes, timings=timings)
+        if not wav_bytes:
+            raise RuntimeError("Kokoro generated no audio")
+        elapsed = int((time.time() - t0) * 1000)
+        events.info(
+            "tts", "[Realtime TTS] Kokoro generated %d bytes in %dms (g2p %dms, synth %dms)",
+            len(wav_bytes), elapsed, timings.get("g2p_ms", 0), timings.get("synth_ms", 0),
+            bytes=len(wav_bytes), ms=elapsed, **timings,
+        )
+        return wav_bytes, False
+
+    wav_bytes = system_wav_bytes(text)
+    if not wav_bytes:
+        raise RuntimeError("TTS conversion failed")
+    events.info("tts", "[Realtime TTS] System generated %d bytes", len(wav_bytes), bytes=len(wav_bytes))
+    return wav_bytes, False
+
+
+@bp.route("/tts/batch", methods=["POST"])
+@admission.guard("tts")
+def tts_batch():
+    try:
+        items = parse_batch_items(request.json or {}, KOKORO_VOICE)
+    except BatchRequestError as err:
+        return jsonify({"error": str(err)}), 400
+
+    try:
+        model = ensure_tts_model()
+    except Exception as err:
+        return jsonify({"error": str(err)}), 500
+
+    if TTS_BACKEND == "kokoro":
+        synthesize = lambda text, voice, speed, prepared: kokoro_wav_bytes(model, text, voice, speed, phonemes=prepared)
+        lock, prepare = host.gpu_lock, kokoro_phonemize
+    else:
+        synthesize = lambda text, voice, speed: system_wav_bytes(text)
+        lock, prepare = None, None
+    return Response(
+        render_batch(items, synthesize, lock=lock, prepare=prepare, log_prefix="[Realtime TTS]"),
+        mimetype=BATCH_MIMETYPE,
+    )
+
+
+@bp.route("/tts/speculate", methods=["POST"])
+def tts_speculate():
+    """Queue likely phrases for idle-time rendering; /tts serves them on a match."""
+    try:
+        items = parse_batch_items(request.json or {}, KOKORO_VOICE)
+    except BatchRequestError as err:
+        return jsonify({"error": str(err)}), 400
+    return jsonify(speculator.submit(items)), 202
+
+
+def _channel_transcribe(header, payload):
+    if len(payload) < MIN_STT_AUDIO_BYTES:
+        return EMPTY_TRANSCRIPT, b""
+    if STT_BACKEND != "mlx":
+        # faster-whisper decodes from memory; no temp file.
+        return transcribe_audio(io.BytesIO(payload)), b""
+    tmp_path = save_audio_bytes(payload, header.get("mime"))
+    try:
+        return transcribe_audio(tmp_path), b""
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _channel_tts(header, payload):
+    text = str(header.get("text") or "").strip()
+    voice = str(header.get("voice") or KOKORO_VOICE).strip().lower()
+    if not text:
+        raise audio_channel.ChannelError(400, "No text provided")
+    wav_bytes, speculative = synthesize_wav(text, voice)
+    return {"bytes": len(wav_bytes), "speculative": speculative, "mimetype": "audio/wav"}, wav_bytes
+
+
+CHANNEL_HANDLERS = {
+    "transcribe": ("stt", _channel_transcribe),
+    "tts": ("tts", _channel_tts),
+}
+
+
+def start_channel():
+    """Open the persistent audio channel next to the HTTP port (AUDIO_CHANNEL=1)."""
+    global channel
+    channel = audio_channel.start_channel(PORT, CHANNEL_HANDLERS, admission, "[Realtime STT]")
+    return channel
+
+
+@bp.route("/faces/match", methods=["POST"])
+def faces_match_route():
+    payload = request.json or {}
+    single = payload.get("embedding")
+    batch = payload.get("embeddings")
+    if single is None and batch is None:
+        return jsonify({"error": "Provide embedding or embeddings"}), 400
+    try:
+        k = int(payload.get("k") or 5)
+        threshold = payload.get("threshold")
+        threshold = float(threshold) if threshold is not None else None
+        by_name = payload.get("byName", True) is not False
+        t0 = time.time()
+        results = ensure_face_index().match(
+            single if batch is None else batch,
+            k=k,
+            by_name=by_name,
+            threshold=threshold,
+        )
+        elapsed_ms = round((time.time() - t0) * 1000, 3)
+        if batch is None:
+            return jsonify({"matches": results[0], "elapsedMs": elapsed_ms})
+        return jsonify({"matches": results, "elapsedMs": elapsed_ms})
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+    except Exception as err:
+        return jsonify({"error": str(err)}), 500
+
+
+@bp.route("/faces/enroll", methods=["POST"])
+def faces_enroll_route():
+    payload = request.json or {}
+    face_id = str(payload.get("id") or "").strip()
+    name = str(payload.get("name") or "").strip()
+    embedding = payload.get("embedding")
+    if not face_id or not name or not isinstance(embedding, list):
+        return jsonify({"error": "Missing id, name or embedding array"}), 400
+    try:
+        index = ensure_face_index()
+        index.enroll(face_id, name, embedding)
+        return jsonify({"ok": True, "faces": len(index)})
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+
+@bp.route("/faces/remove", methods=["POST"])
+def faces_remove_route():
+    payload = request.json or {}
+    face_id = str(payload.get("id") or "").strip()
+    if not face_id:
+        return jsonify({"error": "Missing id"}), 400
+    index = ensure_face_index()
+    removed = index.remove(face_id)
+    return jsonify({"ok": True, "removed": removed, "faces": len(index)})
+
+
+@bp.route("/faces/reload", methods=["POST"])
+def faces_reload_route():
+    index = ensure_face_index().load()
+    return jsonify({"ok": True, **index.stats()})
+
+
+@bp.route("/llm/generate", methods=["POST"])
+@admission.guard("llm")
+def llm_generate_route():
+    payload = request.json or {}
+    try:
+        result = llm_generate(payload)
+        return jsonify(result)
+    except Exception as err:
+        return jsonify({"error": str(err)}), 500
+
+
+@bp.route("/llm/stream", methods=["POST"])
+@admission.guard("llm")
+def llm_stream_route():
+    """NDJSON: {"delta"} lines as tokens arrive, then {"done", "usage", "model"}.
+
+    Deltas are trimmed so they join to the same text as /llm/generate. For
+    JSON/schema requests, {"field"} and {"item"} events (see
+    llm_structured.py) are interleaved as soon as each value closes. The
+    dual-head turn flow streams its script here and uses the first closed
+    main-head beat to start that line's TTS early.
+    """
+    payload = request.json or {}
+    try:
+        req = prepare_llm_request(payload)
+        chunks = llm_stream_chunks(req)
+        # Pull the first chunk here so connection/model errors still map to a 500.
+        first = next(chunks, None)
+    except Exception as err:
+        return jsonify({"error": str(err)}), 500
+    if first is None:
+        return jsonify({"error": f"{req['provider']} stream ended without a response"}), 502
+
+    structured = req["response_schema"] is not None or req["response_mime_type"] == "application/json"
+    parser = IncrementalJsonParser(req["compiled_schema"]) if structured else None
+
+    def generate():
+        t0 = time.time()
+        first_field_ms = None
+        chars = 0
+        usage, model = {}, req["model"]
+        try:
+            for kind, value in itertools.chain([first], chunks):
+                if kind == "done":
+                    usage, model = value
+                    continue
+                chars += len(value)
+                yield ndjson({"delta": value})
+                if parser is None:
+                    continue
+                for event in parser.feed(value):
+                    if first_field_ms is None:
+                        first_field_ms = int((time.time() - t0) * 1000)
+                    yield ndjson(event)
+        except Exception as err:
+            events.error("llm", "[Realtime LLM] Stream error: %s", err)
+            yield ndjson({"error": str(err)})
+            return
+        finally:
+            chunks.close()
+
+        done = {"done": True, "usage": usage, "model": model}
+        elapsed = int((time.time() - t0) * 1000)
+        if parser is not None:
+            done["structured"] = {
+                "complete": parser.complete,
+                "error": parser.error,
+                "firstFieldMs": first_field_ms,
+            }
+            events.info("llm", "[Realtime LLM] Streamed %d chars in %dms (first field at %sms)", chars, elapsed, first_field_ms, chars=chars, ms=elapsed, first_field_ms=first_field_ms)
+        else:
+            events.info("llm", "[Realtime LLM] Streamed %d chars in %dms", chars, elapsed, chars=chars, ms=elapsed)
+        yield ndjson(done)
+
+    return Response(generate(), mimetype="application/x-ndjson")
@@ -0,0 +1,360 @@
+"""LLM provider calls for the realtime front end (Ollama or OpenAI-compatible).
+
+Requests arrive in the bridge's Gemini-shaped payload (systemInstruction,
+contents[].parts, responseMimeType/responseSchema) and are mapped to chat
+messages. Streaming variants yield ("delta", text) chunks followed by
+("done", (usage, model)).
+"""
+
+import json
+import os
+import urllib.error
+import urllib.request
+
+from event_log import events
+from llm_structured import compile_response_schema
+
+LLM_PROVIDER = os.environ.get("REALTIME_LLM_PROVIDER", "ollama").strip().lower()
+LLM_BASE_URL = os.environ.get("REALTIME_LLM_BASE_URL", "http://127.0.0.1:11434").rstrip("/")
+OPENAI_BASE_URL = os.environ.get("REALTIME_OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+
+
+def parts_to_text(parts):
+    chunks = []
+    for part in parts or []:
+        if not isinstance(part, dict):
+            continue
+        text = part.get("text")
+        if isinstance(text, str) and text.strip():
+            chunks.append(text.strip())
+            continue
+        if part.get("inline_data"):
+            chunks.append("[image omitted]")
+    return "\n".join(chunks).strip()
+
+
+def build_messages(system_instruction, contents):
+    messages = []
+    if isinstance(system_instruction, str) and system_instruction.strip():
+        messages.append({"role": "system", "content": system_instruction.strip()})
+
+    for item in contents or []:
+        if not isinstance(item, dict):
+            continue
+        role = str(item.get("role", "user")).strip().lower()
+        mapped_role = "assistant" if role == "model" else role if role in {"user", "assistant", "system"} else "user"
+        text = parts_to_text(item.get("parts") or [])
+        if text:
+            messages.append({"role": mapped_role, "content": text})
+    return messages
+
+
+def http_json_post(url, payload, headers=None, timeout=45):
+    merged_headers = {"Content-Type": "application/json"}
+    if headers:
+        merged_headers.update(headers)
+    request_obj = urllib.request.Request(
+        url=url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers=merged_headers,
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request_obj, timeout=timeout) as response:
+            raw = response.read().decode("utf-8")
+            return response.getcode(), raw
+    except urllib.error.HTTPError as err:
+        body = err.read().decode("utf-8", errors="replace")
+        return err.code, body
+
+
+def http_json_stream(url, payload, headers=None, timeout=90):
+    """POST JSON and yield the response body line by line; raises on HTTP errors."""
+    merged_headers = {"Content-Type": "application/json"}
+    if headers:
+        merged_headers.update(headers)
+    request_obj = urllib.request.Request(
+        url=url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers=merged_headers,
+        method="POST",
+    )
+    try:
+        response = urllib.request.urlopen(request_obj, timeout=timeout)
+    except urllib.error.HTTPError as err:
+        body = err.read().decode("utf-8", errors="replace")
+        return err.code, body, None
+    return response.getcode(), "", response
+
+
+def iter_response_lines(response):
+    with response:
+        for raw_line in response:
+            line = raw_line.decode("utf-8", errors="replace").strip()
+            if line:
+                yield line
+
+
+def ollama_list_models():
+    try:
+        req = urllib.request.Request(
+            url=f"{LLM_BASE_URL}/api/tags",
+            headers={"Content-Type": "application/json"},
+            method="GET",
+        )
+        with urllib.request.urlopen(req, timeout=15) as response:
+            raw = response.read().decode("utf-8")
+        parsed = json.loads(raw)
+        models = []
+        for item in (parsed.get("models") or []):
+            if not isinstance(item, dict):
+                continue
+            name = str(item.get("name") or item.get("model") or "").strip()
+            if name:
+                models.append(name)
+        return models
+    except Exception:
+        return []
+
+
+def ollama_chat_payload(model, messages, temperature, max_output_tokens, response_mime_type="", response_schema=None, stream=False):
+    options = {"temperature": temperature}
+    if max_output_tokens:
+        options["num_predict"] = int(max_output_tokens)
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": stream,
+        "options": options,
+    }
+    if isinstance(response_schema, dict) and response_schema:
+        payload["format"] = response_schema
+    elif response_mime_type == "application/json":
+        payload["format"] = "json"
+    return payload
+
+
+def ollama_error(status, raw):
+    detail = raw[:400]
+    if status == 404 and "not found" in raw.lower():
+        available = ollama_list_models()
+        if available:
+            preview = ", ".join(available[:8])
+            detail = f"{detail} | available models: {preview}"
+        else:
+            detail = f"{detail} | no local models found from /api/tags"
+    return RuntimeError(f"Ollama error ({status}): {detail}")
+
+
+def ollama_usage(data):
+    return {
+        "promptTokenCount": int(data.get("prompt_eval_count") or 0),
+        "candidatesTokenCount": int(data.get("eval_count") or 0),
+    }
+
+
+def ollama_generate(model, messages, temperature, max_output_tokens, response_mime_type="", response_schema=None):
+    payload = ollama_chat_payload(model, messages, temperature, max_output_tokens, response_mime_type, response_schema)
+    status, raw = http_json_post(f"{LLM_BASE_URL}/api/chat", payload, timeout=90)
+    if status < 200 or status >= 300:
+        raise ollama_error(status, raw)
+    data = json.loads(raw)
+    text = str(((data.get("message") or {}).get("content") or "")).strip()
+    return text, ollama_usage(data), str(data.get("model") or model)
+
+
+def ollama_stream(model, messages, temperature, max_output_tokens, response_mime_type="", response_schema=None):
+    """Yield ("delta", text) as Ollama generates, then ("done", (usage, model))."""
+    payload = ollama_chat_payload(
+        model, messages, temperature, max_output_tokens, response_mime_type, response_schema, stream=True
+    )
+    status, raw, response = http_json_stream(f"{LLM_BASE_URL}/api/chat", payload, timeout=90)
+    if response is None or status < 200 or status >= 300:
+        raise ollama_error(status, raw)
+    usage, resolved_model = {}, model
+    for line in iter_response_lines(response):
+        data = json.loads(line)
+        if data.get("error"):
+            raise RuntimeError(f"Ollama error: {data['error']}")
+        delta = str((data.get("message") or {}).get("content") or "")
+        if delta:
+            yield "delta", delta
+        if data.get("done"):
+            usage, resolved_model = ollama_usage(data), str(data.get("model") or model)
+    yield "done", (usage, resolved_model)
+
+
+def openai_chat_payload(model, messages, temperature, max_output_tokens, stream=False):
+    if not OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY is required when REALTIME_LLM_PROVIDER=openai")
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+    }
+    if max_output_tokens:
+        payload["max_tokens"] = int(max_output_tokens)
+    if stream:
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+    return payload
+
+
+def openai_usage(usage_raw):
+    return {
+        "promptTokenCount": int((usage_raw or {}).get("prompt_tokens") or 0),
+        "candidatesTokenCount": int((usage_raw or {}).get("completion_tokens") or 0),
+    }
+
+
+def openai_generate(model, messages, temperature, max_output_tokens):
+    payload = openai_chat_payload(model, messages, temperature, max_output_tokens)
+    status, raw = http_json_post(
+        f"{OPENAI_BASE_URL}/chat/completions",
+        payload,
+        headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+        timeout=90,
+    )
+    if status < 200 or status >= 300:
+        raise RuntimeError(f"OpenAI error ({status}): {raw[:400]}")
+    data = json.loads(raw)
+    choices = data.get("choices") or []
+    content = ""
+    if choices:
+        content = str((((choices[0] or {}).get("message") or {}).get("content") or "")).strip()
+    return content, openai_usage(data.get("usage")), str(data.get("model") or model)
+
+
+def openai_stream(model, messages, temperature, max_output_tokens):
+    """Yield ("delta", text) from the SSE stream, then ("done", (usage, model))."""
+    payload = openai_chat_payload(model, messages, temperature, max_output_tokens, stream=True)
+    status, raw, response = http_json_stream(
+        f"{OPENAI_BASE_URL}/chat/completions",
+        payload,
+        headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+        timeout=90,
+    )
+    if response is None or status < 200 or status >= 300:
+        raise RuntimeError(f"OpenAI error ({status}): {raw[:400]}")
+    usage, resolved_model = {}, model
+    for line in iter_response_lines(response):
+        if not line.startswith("data:"):
+            continue
+        body = line[5:].strip()
+        if body == "[DONE]":
+            break
+        data = json.loads(body)
+        resolved_model = str(data.get("model") or resolved_model)
+        if data.get("usage"):
+            usage = openai_usage(data["usage"])
+        for choice in data.get("choices") or []:
+            delta = str(((choice or {}).get("delta") or {}).get("content") or "")
+            if delta:
+                yield "delta", delta
+    yield "done", (usage, resolved_model)
+
+
+def prepare_llm_request(payload):
+    model = str(payload.get("model") or "llama3.1:8b")
+    system_instruction = payload.get("systemInstruction") or ""
+    contents = payload.get("contents") or []
+    temperature = float(payload.get("temperature") if payload.get("temperature") is not None else 0.7)
+    max_output_tokens = payload.get("maxOutputTokens") or 256
+    provider = str(payload.get("provider") or LLM_PROVIDER).strip().lower()
+    response_mime_type = str(payload.get("responseMimeType") or "").strip().lower()
+    compiled_schema = compile_response_schema(payload.get("responseSchema"))
+    response_schema = compiled_schema.schema if compiled_schema is not None else None
+
+    if not isinstance(system_instruction, str) or not system_instruction.strip():
+        raise RuntimeError(
+            "systemInstruction is required for realtime LLM requests (persona prompt missing)."
+        )
+
+    messages = build_messages(system_instruction, contents)
+    if not messages:
+        messages = [{"role": "user", "content": "Say hello in one short sentence."}]
+    system_chars = len(system_instruction.strip())
+    events.info(
+        "llm",
+        "[Realtime LLM] provider=%s model=%s messages=%d systemChars=%d format=%s",
+        provider, model, len(messages), system_chars,
+        "schema" if response_schema else response_mime_type or "text",
+        messages=len(messages), systemChars=system_chars,
+    )
+    return {
+        "provider": provider,
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_output_tokens": max_output_tokens,
+        "response_mime_type": response_mime_type,
+        "response_schema": response_schema,
+        "compiled_schema": compiled_schema,
+    }
+
+
+def llm_generate(payload):
+    req = prepare_llm_request(payload)
+    if req["provider"] == "openai":
+        text, usage, resolved_model = openai_generate(
+            req["model"], req["messages"], req["temperature"], req["max_output_tokens"]
+        )
+    else:
+        text, usage, resolved_model = ollama_generate(
+            req["model"],
+            req["messages"],
+            req["temperature"],
+            req["max_output_tokens"],
+            response_mime_type=req["response_mime_type"],
+            response_schema=req["response_schema"],
+        )
+
+    return {
+        "text": text,
+        "usage": usage,
+        "model": resolved_model,
+        "provider": req["provider"],
+    }
+
+
+def strip_stream(chunks):
+    """Deltas of a reply trimmed like the non-streaming path's .strip().
+
+    Leading whitespace is dropped and trailing whitespace is held back until
+    more text follows, so the concatenated deltas equal text.strip().
+    """
+    started = False
+    pending = ""
+    try:
+        for kind, value in chunks:
+            if kind != "delta":
+                yield kind, value
+                continue
+            if not started:
+                value = value.lstrip()
+                if not value:
+                    continue
+                started = True
+            text = pending + value
+            body = text.rstrip()
+            pending = text[len(body):]
+            if body:
+                yield "delta", body
+    finally:
+        chunks.close()
+
+
+def llm_stream_chunks(req):
+    if req["provider"] == "openai":
+        chunks = openai_stream(req["model"], req["messages"], req["temperature"], req["max_output_tokens"])
+    else:
+        chunks = ollama_stream(
+            req["model"],
+            req["messages"],
+            req["temperature"],
+            req["max_output_tokens"],
+            response_mime_type=req["response_mime_type"],
+            response_schema=req["response_schema"],
+        )
+    return strip_stream(chunks)
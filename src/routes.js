@@ -22,9 +22,11 @@ const { broadcast, getClients, getLatestFrame, consumeAppearanceFrame, abortActi
 const { detectWakeWord, WAKE_MATCHER_VERSION } = require('./wake-word');
 const {
   transcribeAudio,
+  transcribeAudioStream,
   restartTranscriptionService,
   getProcessingMode,
   getTtsProxyTarget,
+  syncFaceIndex,
 } = require('./processing/mode-manager');
 const { readFaceLib, writeFaceLib } = require('./face-library');
 const { generateAssistantReply, generateStreamingAssistantReply } = require('./assistant-service');
@@ -33,6 +35,8 @@ const { createOrder: createPayPalOrder, captureOrder: capturePayPalOrder } = req
 const { logConversation, logTubsReply } = require('./logger');
 const { createTurnTimer } = require('./turn-timing');
 const { captureTurnTrace } = require('./langfuse');
+const { AUDIO_CHANNEL_ENABLED, getAudioChannel, isChannelUnavailable, synthesizeOverChannel } = require('./audio-channel-client');
+const { WORKER_POOL_ENABLED } = require('./worker-pool-client');
 
 const staticPath = path.join(__dirname, '../public');
 
@@ -48,6 +52,63 @@ const MANUAL_ACTORS = new Set(['main', 'small']);
 const MANUAL_ACTIONS = new Set(['speak', 'react', 'wait']);
 const MANUAL_EMOJI_CUES = new Set(['🙂', '😄', '😏', '🥺', '😢', '😤', '🤖', '🫶']);
 
+// Wake-gated speech outside a conversation: stream segments and stop decoding
+// once the text so far has a wake word, so the turn starts on the segment that
+// carried it. Without a wake word the decode runs to the end and the route
+// checks the full transcript, the same as /transcribe. Falls back to
+// /transcribe if streaming fails.
+async function transcribeWakeGated(audioBuffer, mimeType, label, sessionId) {
+  try {
+    const result = await transcribeAudioStream(audioBuffer, mimeType, {
+      sessionId,
+      onSegment: (segment, textSoFar) => detectWakeWord(textSoFar).detected,
+    });
+    if (result.stopped === 'client') {
+      console.log(`[${label}] Wake word heard, stopped STT early.`);
+    }
+    return result;
+  } catch (err) {
+    if (err.code === 'STT_BUSY') throw err;
+    console.warn(`[${label}] Streaming STT failed, using /transcribe: ${err.message}`);
+    return transcribeAudio(audioBuffer, mimeType, { sessionId });
+  }
+}
+
+// Worker-pool session (X-Session-Id): STT requests of one conversation stay on
+// one worker. A new id starts once the conversation window has lapsed.
+let sttSessionId = null;
+function getSttSessionId() {
+  if (!sttSessionId || (Date.now() - lastConversationAt) >= CONVERSATION_WINDOW_MS) {
+    sttSessionId = crypto.randomBytes(6).toString('hex');
+  }
+  return sttSessionId;
+}
+
+// STT_BUSY: the STT service shed the request (queue full or deadline). Tell
+// the user to repeat themselves instead of reporting a transcription failure;
+// Retry-After tells the page how long to hold off.
+function respondSttBusy(res, err, label, { notify = true } = {}) {
+  console.warn(`[${label}] STT busy: ${err.message}`);
+  if (notify) {
+    broadcast({ type: 'system', text: 'Speech recognition is busy, please say that again in a moment.' });
+    broadcast({ type: 'expression', expression: 'idle' });
+  }
+  if (res.headersSent) return;
+  res.writeHead(503, {
+    'Content-Type': 'application/json',
+    'Retry-After': String(Math.max(1, Math.ceil((err.retryAfterMs || 1000) / 1000))),
+  });
+  res.end(JSON.stringify({ error: err.message, busy: true, reason: err.reason, retryAfterMs: err.retryAfterMs }));
+}
+
+function parseJsonBody(body) {
+  try {
+    return JSON.parse(body || '{}');
+  } catch {
+    return null;
+  }
+}
+
 function isMuted() {
   return runtimeConfig.muted === true;
 }
@@ -246,13 +307,15 @@ function handleRequest(req, res) {
       broadcast({ type: 'thinking' });
 
       try {
+        const inConversation = (Date.now() - lastConversationAt) < CONVERSATION_WINDOW_MS;
         turnTimer.mark('STT started');
-        const result = await transcribeAudio(audioBuffer, req.headers['content-type']);
+        const result = wakeWord && !inConversation
+          ? await transcribeWakeGated(audioBuffer, req.headers['content-type'], 'Voice', getSttSessionId())
+          : await transcribeAudio(audioBuffer, req.headers['content-type'], { sessionId: getSttSessionId() });
         turnTimer.mark('STT completed');
         const text = result.text;
         console.log(`[Transcribed] "${text}"`);
         let wake = null;
-        const inConversation = (Date.now() - lastConversationAt) < CONVERSATION_WINDOW_MS;
 
         if (wakeWord) {
           wake = detectWakeWord(text);
@@ -357,6 +420,10 @@ function handleRequest(req, res) {
       } catch (err) {
         turnTimer.mark(`Error (${err?.message || 'unknown'})`);
         turnTimer.log({ title: '[Turn Timing]' });
+        if (err.code === 'STT_BUSY') {
+          respondSttBusy(res, err, 'Voice');
+          return;
+        }
         console.error('[Voice] Transcription error:', err);
         broadcast({ type: 'error', text: 'Transcription failed' });
         if (!res.headersSent) {
@@ -392,6 +459,10 @@ function handleRequest(req, res) {
         res.writeHead(200, { 'Content-Type': 'application/json' });
         res.end(JSON.stringify({ ok: true, text }));
       } catch (err) {
+        if (err.code === 'STT_BUSY') {
+          respondSttBusy(res, err, 'Voice:preview', { notify: false });
+          return;
+        }
         console.error('[Voice:preview] Transcription error:', err);
         if (!res.headersSent) {
           res.writeHead(500, { 'Content-Type': 'application/json' });
@@ -428,8 +499,11 @@ function handleRequest(req, res) {
       }
 
       try {
+        const wakeGated = wakeWord && !activeTurn && (Date.now() - lastConversationAt) >= CONVERSATION_WINDOW_MS;
         (activeTurn?.turnTimer || provisionalTurnTimer)?.mark('STT started');
-        const result = await transcribeAudio(audioBuffer, req.headers['content-type']);
+        const result = wakeGated
+          ? await transcribeWakeGated(audioBuffer, req.headers['content-type'], 'Segment', getSttSessionId())
+          : await transcribeAudio(audioBuffer, req.headers['content-type'], { sessionId: getSttSessionId() });
         (activeTurn?.turnTimer || provisionalTurnTimer)?.mark('STT completed');
         const text = result.text?.trim();
         console.log(`[Segment] Transcribed: "${text}"`);
@@ -571,6 +645,12 @@ function handleRequest(req, res) {
         res.end(JSON.stringify({ ok: true, text, turnId: activeTurn?.turnId }));
 
       } catch (err) {
+        if (err.code === 'STT_BUSY') {
+          provisionalTurnTimer?.mark('Ignored (STT busy)');
+          provisionalTurnTimer?.log({ title: '[Turn Timing]' });
+          respondSttBusy(res, err, 'Segment');
+          return;
+        }
         console.error('[Segment] Error:', err);
         if (!res.headersSent) {
           res.writeHead(500, { 'Content-Type': 'application/json' });
@@ -590,15 +670,47 @@ function handleRequest(req, res) {
     return;
   }
 
-  if (req.method === 'POST' && url.pathname === '/tts') {
+  // `/tts/batch` renders many phrases in one pass (length-prefixed WAV frames).
+  if (req.method === 'POST' && (url.pathname === '/tts' || url.pathname === '/tts/batch')) {
     let body = '';
     req.on('data', chunk => body += chunk);
-    req.on('end', () => {
+    req.on('end', async () => {
       const ttsTarget = getTtsProxyTarget();
+      const channelRequest = url.pathname === '/tts' && AUDIO_CHANNEL_ENABLED && !WORKER_POOL_ENABLED
+        ? parseJsonBody(body)
+        : null;
+      if (channelRequest) {
+        // Persistent audio channel first; fall through to the HTTP proxy if it's down.
+        try {
+          const { wav, speculative } = await synthesizeOverChannel(
+            getAudioChannel(ttsTarget.port || 3001, 'TTS channel'),
+            channelRequest
+          );
+          res.writeHead(200, {
+            'Content-Type': 'audio/wav',
+            'Content-Length': wav.length,
+            ...(speculative ? { 'X-TTS-Speculative': 'hit' } : {}),
+          });
+          res.end(wav);
+          return;
+        } catch (err) {
+          if (!isChannelUnavailable(err)) {
+            const status = err.statusCode || 500;
+            res.writeHead(status, {
+              'Content-Type': 'application/json',
+              ...(err.retryAfterMs ? { 'Retry-After': String(Math.max(1, Math.ceil(err.retryAfterMs / 1000))) } : {}),
+            });
+            res.end(JSON.stringify({ error: err.message }));
+            return;
+          }
+        }
+      }
+
+      const basePath = ttsTarget.path || '/tts';
       const reqOptions = {
         hostname: ttsTarget.hostname || 'localhost',
         port: ttsTarget.port || 3001,
-        path: ttsTarget.path || '/tts',
+        path: url.pathname === '/tts/batch' ? `${basePath}/batch` : basePath,
         method: 'POST',
         headers: {
           'Content-Type': 'application/json'
@@ -797,6 +909,7 @@ function handleRequest(req, res) {
         }
         lib.faces.push(entry);
         writeFaceLib(lib);
+        syncFaceIndex('enroll', { id, name, embedding });
         console.log(`[Faces] Added "${name}" (id=${id})`);
         res.writeHead(200, { 'Content-Type': 'application/json' });
         res.end(JSON.stringify({ ok: true, id }));
@@ -836,6 +949,7 @@ function handleRequest(req, res) {
     const before = lib.faces.length;
     lib.faces = lib.faces.filter(f => f.id !== id);
     writeFaceLib(lib);
+    syncFaceIndex('remove', { id });
     console.log(`[Faces] Deleted id=${id} (${before - lib.faces.length} removed)`);
     res.writeHead(200, { 'Content-Type': 'application/json' });
     res.end(JSON.stringify({ ok: true }));
@@ -0,0 +1,57 @@
+// Shared handling for the Python services' admission control responses
+// (429 queue full / 503 deadline or shed, both with Retry-After).
+
+// Defaults to the Python STT gate's own deadline (ADMISSION_STT_DEADLINE_MS,
+// 15000 in src/admission.py) so both sides agree unless one is set explicitly.
+const STT_REQUEST_DEADLINE_MS = Number.parseInt(
+  process.env.STT_REQUEST_DEADLINE_MS || process.env.ADMISSION_STT_DEADLINE_MS || '15000',
+  10
+) || 15000;
+const DEADLINE_HEADER = 'X-Request-Deadline-Ms';
+
+function parseJsonSafe(body) {
+  try {
+    return JSON.parse(body);
+  } catch {
+    return null;
+  }
+}
+
+function getRetryAfterMs(res, body) {
+  const parsed = parseJsonSafe(body);
+  if (parsed && Number.isFinite(parsed.retryAfterMs)) {
+    return Math.max(0, parsed.retryAfterMs);
+  }
+  const header = Number.parseFloat(res.headers['retry-after']);
+  return Number.isFinite(header) ? header * 1000 : 1000;
+}
+
+function isBackpressureStatus(statusCode) {
+  return statusCode === 429 || statusCode === 503;
+}
+
+function createBusyError(label, res, body) {
+  const parsed = parseJsonSafe(body) || {};
+  const err = new Error(`${label} busy (${parsed.reason || res.statusCode}): queue depth ${parsed.queueDepth ?? res.headers['x-queue-depth'] ?? '?'}`);
+  err.code = 'STT_BUSY';
+  err.statusCode = res.statusCode;
+  err.reason = parsed.reason || null;
+  err.queueDepth = parsed.queueDepth ?? null;
+  err.retryAfterMs = getRetryAfterMs(res, body);
+  return err;
+}
+
+// Connection refused means the service isn't listening yet (spawning or
+// restarting) — back off briefly, but never past the request deadline.
+function connectRetryDelayMs(attempt) {
+  return Math.min(2000, 250 * (2 ** attempt));
+}
+
+module.exports = {
+  STT_REQUEST_DEADLINE_MS,
+  DEADLINE_HEADER,
+  getRetryAfterMs,
+  isBackpressureStatus,
+  createBusyError,
+  connectRetryDelayMs,
+};
@@ -0,0 +1,35 @@
+"""Small helpers shared by the Python services' modules."""
+
+import re
+
+_DONATION_MARKER_RE = re.compile(r"\[{1,2}\s*SHOW[\s_-]*QR\s*\]{1,2}", re.IGNORECASE)
+_CONTROL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+# Approximates \p{Extended_Pictographic}, which Python's re lacks.
+_PICTOGRAPH_CHARS = (
+    "\u00a9\u00ae\u203c\u2049\u2122\u2139\u2194-\u21aa\u231a-\u23ff\u24c2"
+    "\u25aa-\u27bf\u2934\u2935\u2b05-\u2b55\u3030\u303d\u3297\u3299\U0001f000-\U0001faff"
+)
+_PICTOGRAPH_RE = re.compile(f"[{_PICTOGRAPH_CHARS}](?:\ufe0f|\u200d[{_PICTOGRAPH_CHARS}])*")
+_ALL_CAPS_RE = re.compile(r"\b[A-Z]{3,}\b")
+_ACRONYM_KEEP = {"AI", "LLM", "API", "GPU", "CPU", "SDK", "SQL", "HTTP", "HTTPS", "USA", "EU", "UK"}
+
+
+def speech_key_text(text):
+    """Same cleanup as normalizeSpeechText in public/js/tts-text.js.
+
+    The browser normalizes text before POSTing /tts, so the bridge can submit
+    raw greeting lines and still hit the pool.
+    """
+    value = _ALL_CAPS_RE.sub(
+        lambda m: m.group(0) if m.group(0) in _ACRONYM_KEEP else m.group(0).lower(),
+        str(text or ""),
+    )
+    value = value.replace("\r\n", "\n").replace("\r", "\n")
+    value = _DONATION_MARKER_RE.sub(" ", value)
+    value = _CONTROL_RE.sub("", value)
+    value = _PICTOGRAPH_RE.sub("", value)
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def parse_flag(value):
+    return str(value or "").strip().lower() in {"1", "true", "yes", "on"}
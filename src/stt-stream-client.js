@@ -0,0 +1,124 @@
+const http = require('http');
+const { SESSION_HEADER } = require('./worker-pool-client');
+const { WAKE_ALIASES } = require('./wake-word');
+const { STT_REQUEST_DEADLINE_MS, DEADLINE_HEADER, createBusyError, isBackpressureStatus } = require('./service-backpressure');
+
+// Client for the Python services' NDJSON `/transcribe/stream` route.
+// `onSegment(segment, textSoFar)` runs as each segment is decoded; returning
+// true stops decoding early (e.g. once detectWakeWord() matched), and the
+// promise resolves with the text received so far. `stopOnWake` lets the
+// service stop by itself on the bridge's wake aliases. `sessionId` keeps a
+// session's requests on one worker when a worker router is in front.
+function streamTranscription({
+  port,
+  audioBuffer,
+  mimeType = 'audio/webm',
+  maxDurationS = 0,
+  stopOnWake = false,
+  wakeWords = [...WAKE_ALIASES].join(','),
+  onSegment = null,
+  label = 'Transcription',
+  sessionId = null,
+}) {
+  return new Promise((resolve, reject) => {
+    const boundary = '---BOUNDARY';
+    const extension = mimeType === 'audio/wav' ? 'wav' : 'webm';
+    const segments = [];
+    let settled = false;
+
+    const finish = (err, result) => {
+      if (settled) return;
+      settled = true;
+      if (err) reject(err);
+      else resolve(result);
+    };
+
+    const textSoFar = () => segments.map(segment => segment.text).filter(Boolean).join(' ').trim();
+
+    const req = http.request({
+      hostname: 'localhost',
+      port,
+      path: '/transcribe/stream',
+      method: 'POST',
+      headers: {
+        'Content-Type': `multipart/form-data; boundary=${boundary}`,
+        [DEADLINE_HEADER]: String(STT_REQUEST_DEADLINE_MS),
+        ...(sessionId ? { [SESSION_HEADER]: String(sessionId) } : {}),
+      }
+    }, (res) => {
+      if (res.statusCode !== 200) {
+        let body = '';
+        res.on('data', chunk => body += chunk);
+        res.on('end', () => finish(
+          isBackpressureStatus(res.statusCode)
+            ? createBusyError(label, res, body)
+            : new Error(`${label} stream failed: ${body}`)
+        ));
+        return;
+      }
+
+      let pending = '';
+      res.setEncoding('utf8');
+      res.on('data', (chunk) => {
+        pending += chunk;
+        let newlineIdx = pending.indexOf('\n');
+        while (newlineIdx !== -1 && !settled) {
+          const line = pending.slice(0, newlineIdx).trim();
+          pending = pending.slice(newlineIdx + 1);
+          newlineIdx = pending.indexOf('\n');
+          if (!line) continue;
+
+          let event;
+          try {
+            event = JSON.parse(line);
+          } catch {
+            finish(new Error(`Invalid NDJSON from ${label.toLowerCase()} stream`));
+            req.destroy();
+            return;
+          }
+
+          if (event.error) {
+            finish(new Error(`${label} stream failed: ${event.error}`));
+            req.destroy();
+            return;
+          }
+          if (event.segment) {
+            segments.push(event.segment);
+            if (typeof onSegment === 'function' && onSegment(event.segment, textSoFar()) === true) {
+              finish(null, { text: textSoFar(), segments, stopped: 'client' });
+              req.destroy();
+              return;
+            }
+          }
+          if (event.done) {
+            finish(null, { ...event, segments });
+          }
+        }
+      });
+      res.on('end', () => finish(new Error(`${label} stream ended without a done event`)));
+      res.on('error', err => finish(err));
+    });
+
+    req.on('error', err => finish(err));
+
+    const writeField = (name, value) => {
+      req.write(`--${boundary}\r\n`);
+      req.write(`Content-Disposition: form-data; name="${name}"\r\n\r\n`);
+      req.write(`${value}\r\n`);
+    };
+    if (maxDurationS > 0) writeField('max_duration', String(maxDurationS));
+    if (stopOnWake) writeField('stop_on_wake', 'true');
+    if (stopOnWake && wakeWords) writeField('wake_words', String(wakeWords));
+
+    req.write(`--${boundary}\r\n`);
+    req.write(`Content-Disposition: form-data; name="audio"; filename="audio.${extension}"\r\n`);
+    req.write(`Content-Type: ${mimeType}\r\n\r\n`);
+    req.write(audioBuffer);
+    req.write(`\r\n--${boundary}--\r\n`);
+    req.end();
+  });
+}
+
+module.exports = {
+  streamTranscription,
+};
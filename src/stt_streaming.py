@@ -0,0 +1,203 @@
+"""Helpers for the NDJSON /transcribe/stream routes.
+
+Segments are emitted one JSON object per line as faster-whisper decodes them:
+  {"segment": {"index", "start", "end", "text", "avg_logprob"}}
+  ...
+  {"done": true, "text", "language", "probability", "stopped", "elapsed_ms"}
+
+Decoding can end early once the audio decoded so far passes max_duration
+seconds, or as soon as the text so far contains a wake word. Wake matching is
+a port of isWakeAlias/findWakeToken in src/wake-word.js (glue prefixes,
+collapsed repeats, edit distance to "tubs"/"tub", compact/merged tokens for
+short utterances); the bridge sends its alias list in wake_words. Weak aliases
+("terps") never stop decoding, since the bridge only accepts them in context.
+"""
+
+import json
+import os
+import re
+import time
+import unicodedata
+
+from event_log import events
+from service_util import parse_flag
+
+DEFAULT_WAKE_WORDS = os.environ.get(
+    "STT_WAKE_WORDS",
+    "tubs,tub,tubbs,top,tops,tab,tap,tup,tob,toob,dub,dubs,tobbs,etab,hotops",
+)
+WAKE_WEAK_ALIASES = {"terps", "turps"}
+WAKE_GLUE_PREFIXES = ("h", "ho", "hey", "e", "eh", "a", "at", "yo", "ok", "okay")
+_REPEAT_RE = re.compile(r"(.)\1+")
+
+
+def normalize_wake_text(text):
+    """Same normalization as normalizeWakeText in src/wake-word.js."""
+    decomposed = unicodedata.normalize("NFKD", str(text or "").lower())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9\s]", " ", stripped)).strip()
+
+
+def parse_wake_words(value):
+    raw = value if value else DEFAULT_WAKE_WORDS
+    return {normalize_wake_text(word) for word in str(raw).split(",") if normalize_wake_text(word)}
+
+
+def levenshtein(a, b):
+    if a == b:
+        return 0
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        curr = [i]
+        for j, cb in enumerate(b, 1):
+            curr.append(min(curr[j - 1] + 1, prev[j] + 1, prev[j - 1] + (ca != cb)))
+        prev = curr
+    return prev[-1]
+
+
+def wake_candidates(token):
+    candidates = {token, _REPEAT_RE.sub(r"\1", token)}
+    for prefix in WAKE_GLUE_PREFIXES:
+        if token.startswith(prefix) and len(token) > len(prefix) + 2:
+            stripped = token[len(prefix):]
+            candidates.update((stripped, _REPEAT_RE.sub(r"\1", stripped)))
+    return candidates
+
+
+def is_wake_alias(token, wake_words):
+    """isWakeAlias() from src/wake-word.js, minus the weak aliases."""
+    if not token or not 3 <= len(token) <= 8:
+        return False
+    candidates = wake_candidates(token)
+    if candidates & WAKE_WEAK_ALIASES:
+        return False
+    for candidate in candidates:
+        if candidate in wake_words:
+            return True
+        if not 3 <= len(candidate) <= 6:
+            continue
+        if levenshtein(candidate, "tubs") <= 1 or levenshtein(candidate, "tub") <= 1:
+            return True
+        if candidate[0] in "td" and len(candidate) >= 4 and levenshtein(candidate, "tubs") <= 2:
+            return True
+    return False
+
+
+def find_wake_token(tokens, wake_words):
+    """findWakeToken() from src/wake-word.js; returns the matched token or None."""
+    for token in tokens:
+        if is_wake_alias(token, wake_words):
+            return token
+    if len(tokens) <= 3:
+        merged = ["".join(tokens)] + [a + b for a, b in zip(tokens, tokens[1:])]
+        for token in merged:
+            if is_wake_alias(token, wake_words):
+                return token
+    return None
+
+
+def parse_stream_options(values):
+    """Read early-stop options from request form/query values."""
+    try:
+        max_duration = float(values.get("max_duration") or 0)
+    except (TypeError, ValueError):
+        max_duration = 0.0
+    stop_on_wake = parse_flag(values.get("stop_on_wake"))
+    wake_words = parse_wake_words(values.get("wake_words")) if stop_on_wake else set()
+    return max(0.0, max_duration), wake_words
+
+
+def make_stop_check(max_duration=0.0, wake_words=None):
+    """Return stop(segment) -> reason or None, evaluated after each decoded segment."""
+    wake_words = set(wake_words or ())
+    tokens = []
+
+    def stop(segment):
+        if wake_words:
+            # Match on the text so far, like detectWakeWord(textSoFar) in the bridge.
+            tokens.extend(normalize_wake_text(segment.text).split())
+            if find_wake_token(tokens, wake_words):
+                return "wake_word"
+        if max_duration and float(segment.end or 0) >= max_duration:
+            return "duration"
+        return None
+
+    return stop
+
+
+def segment_payload(index, segment):
+    avg_logprob = getattr(segment, "avg_logprob", None)
+    return {
+        "index": index,
+        "start": round(float(segment.start or 0), 3),
+        "end": round(float(segment.end or 0), 3),
+        "text": str(segment.text or "").strip(),
+        "avg_logprob": round(float(avg_logprob), 4) if avg_logprob is not None else None,
+    }
+
+
+def ndjson(payload):
+    return json.dumps(payload) + "\n"
+
+
+def stream_transcription(pool, audio_path, max_duration=0.0, wake_words=None, log_prefix="[STT]", observe=None, **done_fields):
+    """Yield NDJSON lines for a WhisperCpuPool transcription, segment by segment.
+
+    observe(audio_s, elapsed_s) is called with the audio actually decoded;
+    done_fields (e.g. tier/model) are added to the done line.
+    """
+    t0 = time.time()
+    texts = []
+    language = "en"
+    probability = 1.0
+    stopped = None
+    audio_s = 0.0
+    decoded_to = 0.0
+    stop = make_stop_check(max_duration, wake_words)
+    for kind, value in pool.stream(audio_path, stop=stop, beam_size=1, language="en"):
+        if kind == "info":
+            language = getattr(value, "language", "en") or "en"
+            probability = float(getattr(value, "language_probability", 1.0) or 1.0)
+            audio_s = float(getattr(value, "duration", 0.0) or 0.0)
+        elif kind == "segment":
+            payload = segment_payload(len(texts), value)
+            texts.append(payload["text"])
+            decoded_to = payload["end"]
+            yield ndjson({"segment": payload})
+        else:
+            stopped = value
+
+    text = " ".join(chunk for chunk in texts if chunk).strip()
+    elapsed = int((time.time() - t0) * 1000)
+    if observe is not None:
+        observe(decoded_to if stopped else audio_s, elapsed / 1000.0)
+    events.info(
+        "stt",
+        "%s faster-whisper streamed %d segment(s) in %dms%s: %.80s",
+        log_prefix, len(texts), elapsed, f" (stopped: {stopped})" if stopped else "", text,
+        segments=len(texts), ms=elapsed, stopped=stopped,
+    )
+    yield ndjson({
+        "done": True,
+        "text": text,
+        "language": language,
+        "probability": probability,
+        "stopped": stopped,
+        "elapsed_ms": elapsed,
+        **done_fields,
+    })
+
+
+def single_segment_stream(text, language="en", probability=1.0, elapsed_ms=0, **done_fields):
+    """NDJSON for backends that only decode whole files (lightning-whisper-mlx)."""
+    if text:
+        yield ndjson({"segment": {"index": 0, "start": 0.0, "end": None, "text": text, "avg_logprob": None}})
+    yield ndjson({
+        "done": True,
+        "text": text,
+        "language": language,
+        "probability": probability,
+        "stopped": None,
+        "elapsed_ms": elapsed_ms,
+        **done_fields,
+    })
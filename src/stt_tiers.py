@@ -0,0 +1,224 @@
+"""Adaptive STT model tiers: a fast fallback Whisper model next to the primary.
+
+With STT_FALLBACK_MODEL (or REALTIME_STT_FALLBACK_MODEL) set, a front end keeps
+two models resident, e.g. "small" as the primary tier and "tiny" as the
+fallback (see the benchmark.py recommendations for the latency/accuracy
+trade). Each segment asks the policy which tier to use:
+
+  primary -> fallback  after CONFIRM consecutive segments that see an STT queue
+                       backlog of DEGRADE_WAIT_MS or more, or CONFIRM
+                       consecutive primary decodes with a real-time factor
+                       (decode s / audio s) of DEGRADE_RTF or more
+  fallback -> primary  once the backlog is down to RECOVER_WAIT_MS and PROBE_S
+                       have passed, segments go to the primary as probes, one
+                       at a time; CONFIRM consecutive probes at or under
+                       RECOVER_RTF switch back, and a slower probe keeps the
+                       fallback for another PROBE_S
+
+Degrade thresholds sit above recover thresholds and every switch needs
+CONFIRM samples in a row, so one slow or fast segment doesn't flip the tier.
+Every transcript carries "tier" and "model".
+
+The policy only sees numbers and an engine loader, so it runs with stub
+engines and a fake clock:
+
+  tiers = SttTiers("small", "tiny", load=StubEngine, clock=fake_clock)
+  tier, model_name, engine = tiers.select(queue_wait_ms=2500)   # CONFIRM of these -> fallback
+  tiers.observe(tier, audio_s=4.0, elapsed_s=0.3)
+
+tests/test_stt_tiers.py does exactly that.
+
+Thresholds (env, shared by both front ends):
+  STT_ADAPTIVE_DEGRADE_WAIT_MS  (default 1500)
+  STT_ADAPTIVE_RECOVER_WAIT_MS  (default 300)
+  STT_ADAPTIVE_DEGRADE_RTF      (default 0.6)
+  STT_ADAPTIVE_RECOVER_RTF      (default 0.35)
+  STT_ADAPTIVE_PROBE_S          (default 10)
+  STT_ADAPTIVE_CONFIRM          (default 3)
+"""
+
+import os
+import threading
+import time
+
+from event_log import events
+
+PRIMARY = "primary"
+FALLBACK = "fallback"
+RTF_ALPHA = 0.3
+MIN_RTF_AUDIO_S = 0.5  # shorter clips are dominated by fixed decode overhead
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+class TierPolicy:
+    def __init__(self, degrade_wait_ms=1500, recover_wait_ms=300, degrade_rtf=0.6, recover_rtf=0.35,
+                 probe_s=10.0, confirm=3, clock=time.monotonic):
+        self.degrade_wait_ms = float(degrade_wait_ms)
+        self.recover_wait_ms = min(float(recover_wait_ms), self.degrade_wait_ms)
+        self.degrade_rtf = float(degrade_rtf)
+        self.recover_rtf = min(float(recover_rtf), self.degrade_rtf)
+        self.probe_s = max(0.0, float(probe_s))
+        self.confirm = max(1, int(confirm))
+        self.clock = clock
+        self.tier = PRIMARY
+        self.reason = None
+        self.rtf = {PRIMARY: None, FALLBACK: None}
+        self._since = clock()
+        self._probe_at = None
+        self._busy_streak = 0  # consecutive segments over degrade_wait_ms
+        self._slow_streak = 0  # consecutive primary decodes over degrade_rtf
+        self._good_probes = 0  # consecutive probes under recover_rtf
+        self._lock = threading.Lock()
+        self.counters = {"served_primary": 0, "served_fallback": 0, "degraded": 0, "recovered": 0, "probes": 0}
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        return cls(
+            degrade_wait_ms=_env_float("STT_ADAPTIVE_DEGRADE_WAIT_MS", 1500),
+            recover_wait_ms=_env_float("STT_ADAPTIVE_RECOVER_WAIT_MS", 300),
+            degrade_rtf=_env_float("STT_ADAPTIVE_DEGRADE_RTF", 0.6),
+            recover_rtf=_env_float("STT_ADAPTIVE_RECOVER_RTF", 0.35),
+            probe_s=_env_float("STT_ADAPTIVE_PROBE_S", 10),
+            confirm=_env_float("STT_ADAPTIVE_CONFIRM", 3),
+            **kwargs,
+        )
+
+    def _switch_locked(self, tier, reason):
+        self.tier = tier
+        self.reason = reason
+        self._since = self.clock()
+        self._probe_at = None
+        self._busy_streak = self._slow_streak = self._good_probes = 0
+        self.counters["degraded" if tier == FALLBACK else "recovered"] += 1
+
+    def choose(self, queue_wait_ms):
+        """Tier for the next segment, given the current STT queue backlog."""
+        queue_wait_ms = float(queue_wait_ms or 0)
+        with self._lock:
+            now = self.clock()
+            if self.tier == PRIMARY:
+                self._busy_streak = self._busy_streak + 1 if queue_wait_ms >= self.degrade_wait_ms else 0
+                if self._busy_streak >= self.confirm:
+                    self._switch_locked(FALLBACK, f"queue wait {int(queue_wait_ms)}ms")
+            elif (
+                queue_wait_ms <= self.recover_wait_ms
+                and now - self._since >= self.probe_s
+                and (self._probe_at is None or now - self._probe_at >= self.probe_s)
+            ):
+                # One probe in flight at a time; a lost probe frees the slot after probe_s.
+                self._probe_at = now
+                self.counters["probes"] += 1
+                self.counters["served_primary"] += 1
+                return PRIMARY
+            self.counters[f"served_{self.tier}"] += 1
+            return self.tier
+
+    def observe(self, tier, audio_s, elapsed_s):
+        """Feed back one decode's timing; a primary decode while degraded is a probe."""
+        if not audio_s or audio_s < MIN_RTF_AUDIO_S:
+            return
+        sample = max(0.0, float(elapsed_s)) / float(audio_s)
+        with self._lock:
+            previous = self.rtf[tier]
+            self.rtf[tier] = sample if previous is None else (1 - RTF_ALPHA) * previous + RTF_ALPHA * sample
+            if tier != PRIMARY:
+                return
+            if self.tier == PRIMARY:
+                self._slow_streak = self._slow_streak + 1 if sample >= self.degrade_rtf else 0
+                if self._slow_streak >= self.confirm:
+                    self._switch_locked(FALLBACK, f"rtf {sample:.2f} x{self.confirm}")
+                return
+            self._probe_at = None
+            if sample <= self.recover_rtf:
+                self._good_probes += 1
+                if self._good_probes >= self.confirm:
+                    self._switch_locked(PRIMARY, f"probe rtf {sample:.2f} x{self.confirm}")
+            else:
+                self._good_probes = 0
+                self._since = self.clock()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tier": self.tier,
+                "reason": self.reason,
+                "in_tier_s": round(self.clock() - self._since, 1),
+                "rtf": {tier: round(value, 3) if value is not None else None for tier, value in self.rtf.items()},
+                "thresholds": {
+                    "degrade_wait_ms": self.degrade_wait_ms,
+                    "recover_wait_ms": self.recover_wait_ms,
+                    "degrade_rtf": self.degrade_rtf,
+                    "recover_rtf": self.recover_rtf,
+                    "probe_s": self.probe_s,
+                    "confirm": self.confirm,
+                },
+                **self.counters,
+            }
+
+
+class SttTiers:
+    """Primary/fallback model names, their engines, and the policy between them.
+
+    load(model_name) returns the engine (host.stt(...) in the front ends, a stub
+    in tests). Without a distinct fallback model every segment is "primary".
+    """
+
+    def __init__(self, primary, fallback, load, policy=None, clock=time.monotonic, log_prefix="[STT]"):
+        self.primary = primary
+        self.fallback = fallback or None
+        self.load = load
+        self.policy = policy or TierPolicy.from_env(clock=clock)
+        self.log_prefix = log_prefix
+
+    @property
+    def enabled(self):
+        return self.fallback is not None and self.fallback != self.primary
+
+    def model_name(self, tier):
+        return self.fallback if tier == FALLBACK and self.enabled else self.primary
+
+    def ensure_loaded(self):
+        """Load both tiers, so degrading never waits on a model load."""
+        self.load(self.primary)
+        if self.enabled:
+            self.load(self.fallback)
+
+    def in_use(self, model_name):
+        return model_name in (self.primary, self.fallback)
+
+    def select(self, queue_wait_ms=0):
+        """(tier, model_name, engine) for the next segment."""
+        if not self.enabled:
+            return PRIMARY, self.primary, self.load(self.primary)
+        previous = self.policy.tier
+        tier = self.policy.choose(queue_wait_ms)
+        if self.policy.tier != previous:
+            self._log_switch()
+        model_name = self.model_name(tier)
+        return tier, model_name, self.load(model_name)
+
+    def observe(self, tier, audio_s, elapsed_s):
+        if not self.enabled:
+            return
+        previous = self.policy.tier
+        self.policy.observe(tier, audio_s, elapsed_s)
+        if self.policy.tier != previous:
+            self._log_switch()
+
+    def _log_switch(self):
+        tier = self.policy.tier
+        events.warn(
+            "stt", "%s Switched to %s tier (%s): %s", self.log_prefix, tier, self.model_name(tier), self.policy.reason,
+            tier=tier, model=self.model_name(tier),
+        )
+
+    def stats(self):
+        if not self.enabled:
+            return None
+        return {"primary": self.primary, "fallback": self.fallback, **self.policy.stats()}
@@ -0,0 +1,120 @@
+const http = require('http');
+const { runtimeConfig } = require('./config');
+const { loadGreetingConfig, loadFaceGreetingTemplates } = require('./persona');
+const { getTtsProxyTarget } = require('./processing/mode-manager');
+
+// Idle-time pre-synthesis hints for the Python TTS service. The bridge sends
+// the lines it is likely to speak next to `/tts/speculate`; the service renders
+// them only while nothing else is running and serves a later `/tts` for the
+// same text straight from its pool (see src/tts_speculative.py).
+//
+// Candidates, most likely first: wake greetings for the people in view, the
+// generic wake greetings, then the "hi" reply lines. Join/departure lines have
+// too many variants per person to be worth rendering ahead of time.
+
+const SPECULATE_COOLDOWN_MS = Math.max(
+  0,
+  Number.parseInt(process.env.TTS_SPECULATE_COOLDOWN_MS || '60000', 10) || 60000
+);
+const MAX_SPECULATE_ITEMS = 64;
+const MAX_PRESENT_NAMES = 4;
+const SPECULATE_TIMEOUT_MS = 2000;
+
+let lastSignature = '';
+let lastSubmittedAt = 0;
+let failureLogged = false;
+
+function presentNames(names) {
+  const seen = new Set();
+  const result = [];
+  for (const raw of Array.isArray(names) ? names : []) {
+    const name = String(raw || '').trim();
+    const key = name.toLowerCase();
+    if (!name || seen.has(key)) continue;
+    seen.add(key);
+    result.push(name);
+    if (result.length >= MAX_PRESENT_NAMES) break;
+  }
+  return result;
+}
+
+function buildSpeculationCandidates({ names = [] } = {}) {
+  const templates = loadFaceGreetingTemplates();
+  const lines = [];
+  for (const name of presentNames(names)) {
+    // Same substitution as public/js/face/greetings.js.
+    lines.push(...templates.wake.named.map((template) => template.replace('%name%', name)));
+  }
+  lines.push(...templates.wake.unnamed);
+  lines.push(...loadGreetingConfig().responses);
+  return [...new Set(lines)].slice(0, MAX_SPECULATE_ITEMS);
+}
+
+function postSpeculation(items, voice) {
+  return new Promise((resolve, reject) => {
+    const target = getTtsProxyTarget();
+    const body = JSON.stringify({ items, voice });
+    const req = http.request({
+      hostname: target.hostname || 'localhost',
+      port: target.port || 3001,
+      path: `${target.path || '/tts'}/speculate`,
+      method: 'POST',
+      timeout: SPECULATE_TIMEOUT_MS,
+      headers: {
+        'Content-Type': 'application/json',
+        'Content-Length': Buffer.byteLength(body),
+      },
+    }, (res) => {
+      let data = '';
+      res.on('data', chunk => data += chunk);
+      res.on('end', () => {
+        if (res.statusCode !== 202) {
+          reject(new Error(`status ${res.statusCode}: ${data}`));
+          return;
+        }
+        try {
+          resolve(JSON.parse(data));
+        } catch {
+          resolve({});
+        }
+      });
+    });
+    req.on('timeout', () => req.destroy(new Error('timeout')));
+    req.on('error', reject);
+    req.end(body);
+  });
+}
+
+// Fire-and-forget; resubmitting the same set within the cooldown is skipped.
+function speculateGreetings({ names = [], reason = 'presence' } = {}) {
+  const voice = runtimeConfig.kokoroVoice;
+  const items = buildSpeculationCandidates({ names });
+  if (!items.length) return;
+
+  const signature = `${voice}|${presentNames(names).join(',').toLowerCase()}`;
+  const now = Date.now();
+  if (signature === lastSignature && now - lastSubmittedAt < SPECULATE_COOLDOWN_MS) return;
+  lastSignature = signature;
+  lastSubmittedAt = now;
+
+  postSpeculation(items, voice)
+    .then((result) => {
+      failureLogged = false;
+      if (result.queued) {
+        console.log(`[TTS] Speculating ${result.queued} phrase(s) (${reason}, ${result.cached || 0} already pooled)`);
+      }
+    })
+    .catch((err) => {
+      // Allow a retry on the next trigger, e.g. once the service is up.
+      lastSubmittedAt = 0;
+      if (!failureLogged) {
+        failureLogged = true;
+        console.warn(`[TTS] Speculative pre-synthesis unavailable: ${err.message}`);
+      }
+    });
+}
+
+module.exports = {
+  buildSpeculationCandidates,
+  speculateGreetings,
+};
@@ -0,0 +1,145 @@
+"""Batch TTS: synthesize an ordered list of phrases in one locked pass.
+
+Request body:
+  {"items": [{"text": "...", "voice": "af_heart", "speed": 1.0}, ...],
+   "voice": "<default voice>", "speed": <default speed>}
+
+Response (application/x-tts-batch) is a stream of length-prefixed frames, one
+per phrase. A single render thread works through the list, so frames arrive in
+request order, each as soon as its phrase is done:
+
+  uint32 BE header length | JSON header | WAV bytes
+
+Each header carries {"index", "bytes", "offset", "elapsedMs"} (or "error"),
+where offset is the byte position of that phrase's WAV payload in the response
+body. A final frame {"done": true, "count", "elapsedMs"} with no payload ends
+the stream.
+
+The render thread takes the engine lock per phrase, so /tts and STT can get in
+between phrases, and a slow reader never holds the engine. An optional
+prepare(text, voice, speed) runs before the lock is taken (Kokoro's G2P) and
+its result reaches synthesize as prepared=, so the lock covers synthesis
+only; finished phrases
+wait in a queue until the response drains them. When the client goes away the
+response is closed and the thread stops before the next phrase. Duplicate
+(text, voice, speed) entries are synthesized once.
+"""
+
+import json
+import queue
+import struct
+import threading
+import time
+
+from event_log import events
+
+BATCH_MIMETYPE = "application/x-tts-batch"
+MAX_BATCH_ITEMS = 64
+_FRAME_PREFIX = struct.Struct(">I")
+
+
+class BatchRequestError(ValueError):
+    pass
+
+
+def parse_batch_items(payload, default_voice, default_speed=1.0, max_items=MAX_BATCH_ITEMS):
+    raw_items = payload.get("items") if isinstance(payload, dict) else None
+    if not isinstance(raw_items, list) or not raw_items:
+        raise BatchRequestError("items must be a non-empty list")
+    if len(raw_items) > max_items:
+        raise BatchRequestError(f"At most {max_items} items per batch")
+
+    batch_voice = str(payload.get("voice") or default_voice).strip().lower()
+    try:
+        batch_speed = float(payload.get("speed") or default_speed)
+    except (TypeError, ValueError):
+        batch_speed = default_speed
+
+    items = []
+    for index, raw in enumerate(raw_items):
+        if isinstance(raw, str):
+            raw = {"text": raw}
+        if not isinstance(raw, dict):
+            raise BatchRequestError(f"items[{index}] must be a string or object")
+        text = str(raw.get("text") or "").strip()
+        if not text:
+            raise BatchRequestError(f"items[{index}] has no text")
+        try:
+            speed = float(raw.get("speed") or batch_speed)
+        except (TypeError, ValueError):
+            speed = batch_speed
+        items.append({
+            "index": index,
+            "text": text,
+            "voice": str(raw.get("voice") or batch_voice).strip().lower(),
+            "speed": max(0.5, min(2.0, speed)),
+        })
+    return items
+
+
+def _frame(header, payload=b""):
+    encoded = json.dumps(header).encode("utf-8")
+    return _FRAME_PREFIX.pack(len(encoded)) + encoded + payload
+
+
+def render_batch(items, synthesize, lock=None, prepare=None, log_prefix="[TTS]"):
+    """Yield framed results in request order as synthesize(text, voice, speed) -> wav bytes finishes."""
+    results = queue.Queue()
+    cancelled = threading.Event()
+    held = lock if lock is not None else threading.Lock()
+    t0 = time.time()
+
+    def worker():
+        rendered = {}
+        for item in items:
+            if cancelled.is_set():
+                break
+            key = (item["text"], item["voice"], item["speed"])
+            started = time.time()
+            if key not in rendered:
+                try:
+                    prepared = {} if prepare is None else {"prepared": prepare(*key)}
+                    with held:
+                        rendered[key] = (synthesize(*key, **prepared), None)
+                except Exception as err:
+                    rendered[key] = (None, str(err))
+            wav_bytes, error = rendered[key]
+            results.put((item, wav_bytes, error, int((time.time() - started) * 1000)))
+        results.put(None)
+
+    threading.Thread(target=worker, name="tts-batch", daemon=True).start()
+
+    offset = 0
+    count = 0
+    try:
+        while True:
+            entry = results.get()
+            if entry is None:
+                break
+            item, wav_bytes, error, elapsed_ms = entry
+            header = {"index": item["index"], "voice": item["voice"], "elapsedMs": elapsed_ms}
+            if error is not None or not wav_bytes:
+                header["error"] = error or "No audio generated"
+                frame = _frame(header)
+            else:
+                header_probe = json.dumps({**header, "bytes": len(wav_bytes), "offset": 0}).encode("utf-8")
+                # Offset depends on the header's own length; size it with the
+                # final values so the encoded header matches what we measured.
+                header["bytes"] = len(wav_bytes)
+                header["offset"] = offset + _FRAME_PREFIX.size + len(header_probe)
+                encoded = json.dumps(header).encode("utf-8")
+                while len(encoded) != len(header_probe):
+                    header_probe = encoded
+                    header["offset"] = offset + _FRAME_PREFIX.size + len(header_probe)
+                    encoded = json.dumps(header).encode("utf-8")
+                frame = _FRAME_PREFIX.pack(len(encoded)) + encoded + wav_bytes
+                count += 1
+            offset += len(frame)
+            yield frame
+    finally:
+        # Client disconnected (or the stream finished): stop before the next phrase.
+        cancelled.set()
+
+    elapsed = int((time.time() - t0) * 1000)
+    events.info("tts", "%s Batch rendered %d/%d phrase(s) in %dms", log_prefix, count, len(items), elapsed, ms=elapsed)
+    yield _frame({"done": True, "count": count, "elapsedMs": elapsed})
@@ -0,0 +1,243 @@
+"""Text front end for Kokoro: normalization and cached grapheme-to-phoneme.
+
+model.generate(text=...) runs misaki's G2P (spaCy tagging, lexicon lookups,
+espeak for out-of-lexicon words) on every call, so greetings, persona lines
+and names are re-phonemized each time they are spoken. KokoroFrontend does
+that stage once and hands phonemes to the pipeline instead:
+
+  1. normalize with speech_key_text (the same cleanup as normalizeSpeechText
+     in public/js/tts-text.js: acronyms, donation markers, control chars,
+     emoji, whitespace; numbers are left for misaki to expand)
+  2. split into sentences and look each one up in a sentence LRU; misses go
+     through misaki, whose per-word out-of-lexicon fallback is itself
+     cached in a word LRU (names like "Tubs" or "Rapha" hit it on any new
+     sentence)
+  3. pack sentence phonemes into chunks of at most MAX_PHONEMES and render
+     them with pipeline.generate_from_tokens
+
+Anything the phoneme path can't take (a sentence over MAX_PHONEMES) renders
+from normalized text. With the cache off, or on an mlx-audio build without
+generate_from_tokens, the original text goes to model.generate unchanged.
+stats() splits render time into G2P and acoustic synthesis.
+
+G2P takes only the frontend's own lock, so /tts, batch and speculative renders
+run phonemize() before taking host.gpu_lock and hand its result (chunks, or
+the TEXT_FALLBACK marker) to the locked render, which holds the GPU for
+acoustic synthesis alone.
+
+Tunable via TTS_G2P_CACHE (0 renders from the original text),
+TTS_G2P_SENTENCES and TTS_G2P_WORDS (LRU entry limits).
+"""
+
+import collections
+import os
+import re
+import threading
+import time
+
+from event_log import events
+from service_util import parse_flag, speech_key_text
+
+MAX_PHONEMES = 510  # Kokoro's per-inference phoneme limit
+TEXT_FALLBACK = object()  # phonemize() result: render from text, don't phonemize again
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def pack_phonemes(sentences, limit=MAX_PHONEMES):
+    """Join sentence phoneme strings into as few chunks <= limit as possible.
+
+    Returns None if a single sentence is over the limit.
+    """
+    chunks = []
+    current = ""
+    for phonemes in sentences:
+        if not phonemes:
+            continue
+        if len(phonemes) > limit:
+            return None
+        if current and len(current) + 1 + len(phonemes) > limit:
+            chunks.append(current)
+            current = ""
+        current = f"{current} {phonemes}" if current else phonemes
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class _Lru:
+    def __init__(self, max_entries):
+        self.max_entries = max(1, max_entries)
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+class KokoroFrontend:
+    def __init__(self, repo_id, lang_code="a", enabled=True, max_sentences=512, max_words=4096, log_prefix="[TTS]"):
+        self.repo_id = repo_id
+        self.lang_code = lang_code
+        self.enabled = enabled
+        self.log_prefix = log_prefix
+        self.sentences = _Lru(max_sentences)
+        self.words = _Lru(max_words)
+        self._lock = threading.Lock()  # misaki is not thread-safe; also guards the LRUs
+        self._pipeline = None
+        self._pipeline_model = None
+        self._stats_lock = threading.Lock()
+        self.counters = collections.Counter()
+
+    @classmethod
+    def from_env(cls, repo_id, **kwargs):
+        return cls(
+            repo_id,
+            enabled=parse_flag(os.environ.get("TTS_G2P_CACHE", "1")),
+            max_sentences=_env_int("TTS_G2P_SENTENCES", 512),
+            max_words=_env_int("TTS_G2P_WORDS", 4096),
+            **kwargs,
+        )
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            self.counters.update(deltas)
+
+    def _disable(self, reason):
+        self.enabled = False
+        events.warn("tts", "%s Phoneme input disabled, rendering from text: %s", self.log_prefix, reason)
+
+    # --- G2P ---
+
+    def _cached_fallback(self, fallback):
+        """Wrap misaki's out-of-lexicon fallback (espeak) with the word LRU."""
+
+        def lookup(token):
+            word = getattr(token, "text", token)
+            cached = self.words.get(word)
+            if cached is not None:
+                return cached
+            result = fallback(token)
+            self.words.put(word, result)
+            return result
+
+        return lookup
+
+    def _pipeline_for_locked(self, model):
+        if self._pipeline is not None and self._pipeline_model is model:
+            return self._pipeline
+        from mlx_audio.tts.models.kokoro import KokoroPipeline
+
+        pipeline = KokoroPipeline(lang_code=self.lang_code, model=model, repo_id=self.repo_id)
+        if not hasattr(pipeline, "generate_from_tokens"):
+            raise AttributeError("KokoroPipeline has no generate_from_tokens")
+        fallback = getattr(pipeline.g2p, "fallback", None)
+        if fallback is not None:
+            pipeline.g2p.fallback = self._cached_fallback(fallback)
+        self._pipeline, self._pipeline_model = pipeline, model
+        return pipeline
+
+    def phonemize(self, model, text, timings=None):
+        """Phoneme chunks for text, or TEXT_FALLBACK when it has to render from text.
+
+        Run it before taking the GPU lock and pass the result to generate() as
+        phonemes, so the locked render does no G2P at all.
+        """
+        if not self.enabled:
+            return TEXT_FALLBACK
+        t0 = time.perf_counter()
+        sentences = [s for s in _SENTENCE_RE.split(speech_key_text(text)) if s]
+        phonemes = []
+        with self._lock:
+            try:
+                pipeline = self._pipeline_for_locked(model)
+            except (ImportError, AttributeError, TypeError) as err:
+                self._disable(err)
+                return TEXT_FALLBACK
+            for sentence in sentences:
+                cached = self.sentences.get(sentence)
+                if cached is None:
+                    cached, _ = pipeline.g2p(sentence)
+                    cached = cached or ""
+                    self.sentences.put(sentence, cached)
+                phonemes.append(cached)
+        g2p_s = time.perf_counter() - t0
+        self._count(g2p_calls=1, g2p_us=int(g2p_s * 1e6))
+        if timings is not None:
+            timings["g2p_ms"] = timings.get("g2p_ms", 0) + int(g2p_s * 1000)
+        chunks = pack_phonemes(phonemes)
+        return TEXT_FALLBACK if chunks is None else chunks
+
+    # --- Synthesis ---
+
+    def generate(self, model, text, voice, speed=1.0, phonemes=None, timings=None):
+        """Yield audio arrays for text; caller holds host.gpu_lock."""
+        chunks = phonemes if phonemes is not None else self.phonemize(model, text, timings)
+        if chunks is TEXT_FALLBACK:
+            source = speech_key_text(text) if self.enabled else text
+            results = model.generate(text=source, voice=voice, speed=speed, lang_code=self.lang_code)
+            self._count(text_renders=1)
+        else:
+            results = (
+                result
+                for chunk in chunks
+                for result in self._pipeline.generate_from_tokens(chunk, voice=voice, speed=speed)
+            )
+            self._count(phoneme_renders=1)
+
+        synth_s = 0.0
+        t0 = time.perf_counter()
+        try:
+            for result in results:
+                synth_s += time.perf_counter() - t0
+                yield result.audio
+                t0 = time.perf_counter()
+        finally:
+            self._count(synth_us=int(synth_s * 1e6))
+            if timings is not None:
+                timings["synth_ms"] = timings.get("synth_ms", 0) + int(synth_s * 1000)
+
+    def stats(self):
+        with self._stats_lock:
+            counters = dict(self.counters)
+        sentences, words = self.sentences.stats(), self.words.stats()
+        renders = counters.get("phoneme_renders", 0) + counters.get("text_renders", 0)
+        g2p_calls = counters.get("g2p_calls", 0)
+        return {
+            "phoneme_input": self.enabled,
+            "sentences": sentences,
+            "words": words,
+            "phoneme_renders": counters.get("phoneme_renders", 0),
+            "text_renders": counters.get("text_renders", 0),
+            "avg_g2p_ms": round(counters.get("g2p_us", 0) / g2p_calls / 1000, 2) if g2p_calls else None,
+            "avg_synth_ms": round(counters.get("synth_us", 0) / renders / 1000, 1) if renders else None,
+        }
@@ -0,0 +1,329 @@
+"""Idle-time speculative pre-synthesis for the TTS routes.
+
+The bridge submits phrases it expects to speak soon (wake/join greetings,
+greetings for the people in view) to POST /tts/speculate. A background thread
+renders them only while the service is idle, meaning nothing has been admitted
+or queued on any route for idle_grace_s. It re-checks between Kokoro segments
+and gives the engine back as soon as interactive work shows up, so a
+speculative render delays a real request by at most one segment. A preempted
+phrase goes back to the front of the queue.
+
+Finished audio waits in a bounded LRU pool (entry count, total bytes, TTL).
+/tts claims a pooled entry when the normalized text, voice and speed match and
+skips the engine entirely. A claim for the phrase that is rendering right now
+keeps that render from being preempted and waits up to claim_wait_s for it;
+past that the render is preempted and /tts renders the phrase itself. stats() reports the hit rate and the render time
+spent on work that was preempted, failed, or evicted without being played.
+
+Tunable via TTS_SPECULATIVE (0 disables), TTS_SPECULATIVE_MAX_ENTRIES,
+TTS_SPECULATIVE_MAX_MB, TTS_SPECULATIVE_TTL_S, TTS_SPECULATIVE_IDLE_MS,
+TTS_SPECULATIVE_QUEUE and TTS_SPECULATIVE_CLAIM_WAIT_MS.
+"""
+
+import collections
+import os
+import threading
+import time
+
+from event_log import events
+from service_util import parse_flag, speech_key_text
+
+IDLE_POLL_S = 0.1
+
+def speculation_key(text, voice, speed=1.0):
+    return speech_key_text(text), str(voice or "").strip().lower(), round(float(speed or 1.0), 2)
+
+
+def _env_number(name, default, cast=int):
+    try:
+        return cast(os.environ.get(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+class _Entry:
+    __slots__ = ("wav_bytes", "created", "cost_s", "hits")
+
+    def __init__(self, wav_bytes, cost_s):
+        self.wav_bytes = wav_bytes
+        self.created = time.time()
+        self.cost_s = cost_s
+        self.hits = 0
+
+
+class SpeculativeSynth:
+    """Render queued phrases while idle; hand them to matching /tts requests.
+
+    synthesize(text, voice, speed, should_stop) -> wav bytes or None. It should
+    call should_stop() between segments and return early when it is true.
+    is_busy() -> True while interactive work is in flight or queued.
+    prepare(text, voice, speed), if given, runs for the next phrase before the
+    lock is taken, for work that doesn't need the engine (Kokoro's G2P); its
+    result reaches synthesize as prepared=.
+    """
+
+    def __init__(
+        self,
+        synthesize,
+        lock=None,
+        is_busy=None,
+        prepare=None,
+        max_entries=None,
+        max_bytes=None,
+        ttl_s=None,
+        idle_grace_s=None,
+        max_pending=None,
+        claim_wait_s=None,
+        log_prefix="[TTS]",
+    ):
+        self._synthesize = synthesize
+        self._lock = lock
+        self._is_busy = is_busy or (lambda: False)
+        self._prepare = prepare
+        self.enabled = parse_flag(os.environ.get("TTS_SPECULATIVE", "1"))
+        self.max_entries = max_entries or _env_number("TTS_SPECULATIVE_MAX_ENTRIES", 64)
+        self.max_bytes = max_bytes or _env_number("TTS_SPECULATIVE_MAX_MB", 32, float) * 1024 * 1024
+        self.ttl_s = ttl_s or _env_number("TTS_SPECULATIVE_TTL_S", 1800, float)
+        self.idle_grace_s = (
+            idle_grace_s if idle_grace_s is not None
+            else _env_number("TTS_SPECULATIVE_IDLE_MS", 1500, float) / 1000.0
+        )
+        self.max_pending = max_pending or _env_number("TTS_SPECULATIVE_QUEUE", 128)
+        self.claim_wait_s = (
+            claim_wait_s if claim_wait_s is not None
+            else _env_number("TTS_SPECULATIVE_CLAIM_WAIT_MS", 3000, float) / 1000.0
+        )
+        self.log_prefix = log_prefix
+        self._cond = threading.Condition()
+        self._pending = collections.OrderedDict()  # (text, voice, speed) -> True
+        self._pool = collections.OrderedDict()  # key -> _Entry, LRU first
+        self._pool_bytes = 0
+        self._rendering = None
+        self._claim_waiters = 0  # claims waiting on the in-flight render
+        self._superseded = False  # a claim gave up on it; don't requeue it
+        self._thread = None
+        self._closed = False
+        self._wasted_s = 0.0
+        self._saved_s = 0.0
+        self.counters = collections.Counter()
+
+    # --- Submission ---
+
+    def submit(self, items):
+        """Queue parsed {text, voice, speed} items; returns what happened to them."""
+        result = {"queued": 0, "cached": 0, "dropped": 0}
+        if not self.enabled:
+            result["dropped"] = len(items)
+            return result
+
+        with self._cond:
+            self._expire_locked(time.time())
+            for item in items:
+                key = speculation_key(item["text"], item["voice"], item["speed"])
+                if not key[0]:
+                    continue
+                if key in self._pool or key == self._rendering:
+                    result["cached"] += 1
+                    continue
+                if key in self._pending:
+                    self._pending.move_to_end(key)
+                    continue
+                if len(self._pending) >= self.max_pending:
+                    # Newer submissions reflect who is in view now.
+                    self._pending.popitem(last=False)
+                    self.counters["dropped"] += 1
+                    result["dropped"] += 1
+                self._pending[key] = True
+                self.counters["submitted"] += 1
+                result["queued"] += 1
+            self._start_locked()
+            self._cond.notify_all()
+        return result
+
+    def _start_locked(self):
+        if self._thread is None and self._pending:
+            self._thread = threading.Thread(target=self._run, name="tts-speculative", daemon=True)
+            self._thread.start()
+
+    # --- Claiming ---
+
+    def claim(self, text, voice, speed=1.0):
+        """Return pooled WAV bytes for an interactive request, or None on a miss."""
+        if not self.enabled:
+            return None
+        key = speculation_key(text, voice, speed)
+        with self._cond:
+            if key == self._rendering:
+                self._await_render_locked(key)
+            self._expire_locked(time.time())
+            entry = self._pool.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                # The interactive request renders it now; don't do it twice.
+                if key == self._rendering:
+                    self._superseded = True
+                    self.counters["superseded"] += 1
+                elif self._pending.pop(key, None) is not None:
+                    self.counters["superseded"] += 1
+                return None
+            self._pool.move_to_end(key)
+            entry.hits += 1
+            self.counters["hits"] += 1
+            self._saved_s += entry.cost_s
+            return entry.wav_bytes
+
+    def _await_render_locked(self, key):
+        """Wait up to claim_wait_s for the in-flight render of key to finish."""
+        self._claim_waiters += 1
+        self.counters["awaited"] += 1
+        deadline = time.time() + self.claim_wait_s
+        try:
+            while self._rendering == key:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    # Once nobody waits, should_stop() preempts the render and
+                    # the caller renders the phrase itself.
+                    self.counters["await_timeouts"] += 1
+                    break
+                self._cond.wait(remaining)
+        finally:
+            self._claim_waiters -= 1
+
+    # --- Pool ---
+
+    def _discard_locked(self, key, reason):
+        entry = self._pool.pop(key)
+        self._pool_bytes -= len(entry.wav_bytes)
+        if entry.hits == 0:
+            self.counters[f"{reason}_unused"] += 1
+            self._wasted_s += entry.cost_s
+        else:
+            self.counters[reason] += 1
+
+    def _expire_locked(self, now):
+        stale = [key for key, entry in self._pool.items() if now - entry.created > self.ttl_s]
+        for key in stale:
+            self._discard_locked(key, "expired")
+
+    def _store_locked(self, key, wav_bytes, cost_s):
+        self._pool[key] = _Entry(wav_bytes, cost_s)
+        self._pool_bytes += len(wav_bytes)
+        while self._pool and (len(self._pool) > self.max_entries or self._pool_bytes > self.max_bytes):
+            self._discard_locked(next(iter(self._pool)), "evicted")
+
+    # --- Background rendering ---
+
+    def _wait_for_idle(self):
+        idle_since = None
+        while not self._closed:
+            now = time.time()
+            if self._is_busy():
+                idle_since = None
+            elif idle_since is None:
+                idle_since = now
+            elif now - idle_since >= self.idle_grace_s:
+                return True
+            time.sleep(IDLE_POLL_S)
+        return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._pending:
+                    self._cond.wait()
+                if self._closed:
+                    return
+
+            if not self._wait_for_idle():
+                return
+            with self._cond:
+                if not self._pending:
+                    continue
+                key = next(iter(self._pending))
+            try:
+                prepared = {} if self._prepare is None else {"prepared": self._prepare(*key)}
+            except Exception as err:
+                with self._cond:
+                    if self._pending.pop(key, None) is not None:
+                        self.counters["errors"] += 1
+                events.warn("tts", "%s Speculative prepare failed for '%.40s': %s", self.log_prefix, key[0], err)
+                continue
+            if self._lock is not None and not self._lock.acquire(blocking=False):
+                time.sleep(IDLE_POLL_S)
+                continue
+
+            try:
+                with self._cond:
+                    # Claimed or superseded while it was being prepared.
+                    if self._pending.pop(key, None) is None:
+                        continue
+                    self._rendering = key
+                    self._superseded = False
+                self._render(key, prepared)
+            finally:
+                if self._lock is not None:
+                    self._lock.release()
+
+    def _render(self, key, prepared):
+        text, voice, speed = key
+        preempted = []
+
+        def should_stop():
+            # The /tts request that made the service busy is waiting on this render.
+            if self._claim_waiters and not self._closed:
+                return False
+            if self._closed or self._is_busy():
+                preempted.append(True)
+                return True
+            return False
+
+        started = time.time()
+        error = None
+        try:
+            wav_bytes = self._synthesize(text, voice, speed, should_stop, **prepared)
+        except Exception as err:
+            wav_bytes, error = None, err
+        cost_s = time.time() - started
+
+        with self._cond:
+            self._rendering = None
+            self._cond.notify_all()
+            if preempted:
+                self.counters["preempted"] += 1
+                self._wasted_s += cost_s
+                if not self._superseded:
+                    self._pending[key] = True
+                    self._pending.move_to_end(key, last=False)
+            elif error is not None or not wav_bytes:
+                self.counters["errors"] += 1
+                self._wasted_s += cost_s
+                events.warn("tts", "%s Speculative render failed for '%.40s': %s", self.log_prefix, text, error or "no audio")
+            else:
+                self.counters["synthesized"] += 1
+                self._store_locked(key, wav_bytes, cost_s)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # --- Reporting ---
+
+    def stats(self):
+        with self._cond:
+            self._expire_locked(time.time())
+            hits = self.counters["hits"]
+            lookups = hits + self.counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "pending": len(self._pending),
+                "pooled": len(self._pool),
+                "pool_bytes": self._pool_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": int(self.max_bytes),
+                "rendering": self._rendering is not None,
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+                "saved_ms": int(self._saved_s * 1000),
+                "wasted_ms": int(self._wasted_s * 1000),
+                "counters": dict(self.counters),
+            }
@@ -1,6 +1,8 @@
 const WAKE_PREFIXES = new Set(['hey', 'hi', 'yo', 'okay', 'ok', 'oi', 'ey', 'ay']);
 const WAKE_NOISE_PREFIXES = new Set(['a', 'at', 'ah', 'uh', 'oh', 'um', 'hm', 'hmm']);
 const WAKE_MATCHER_VERSION = '2026-02-11.3';
+// Also sent as wake_words to /transcribe/stream, whose early stop mirrors
+// isWakeAlias() (src/stt_streaming.py).
 const WAKE_ALIASES = new Set([
   'tubs', 'tub', 'tubbs', 'top', 'tops', 'tab', 'tap', 'tup',
   'tob', 'toob', 'dub', 'dubs', 'tobbs', 'etab', 'hotops',
@@ -235,4 +237,4 @@ function detectWakeWord(text) {
   };
 }
 
-module.exports = { detectWakeWord, findWakeToken, isWakeAlias, WAKE_MATCHER_VERSION };
+module.exports = { detectWakeWord, findWakeToken, isWakeAlias, WAKE_ALIASES, WAKE_MATCHER_VERSION };
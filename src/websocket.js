@@ -5,6 +5,7 @@ const crypto = require('crypto');
 const { logConversation, logTubsReply } = require('./logger');
 const { createTurnTimer } = require('./turn-timing');
 const { captureTurnTrace } = require('./langfuse');
+const { speculateGreetings } = require('./tts-speculation');
 
 let clients = new Set();
 let latestFrame = null; // { data: base64String, ts: number }
@@ -50,6 +51,7 @@ function initWebSocket(server) {
 
     ws.send(JSON.stringify({ type: 'config', ...runtimeConfig }));
     ws.send(JSON.stringify({ type: 'system', text: 'Connected to Tubs Bridge Server' }));
+    speculateGreetings({ reason: 'client_connected' });
 
     ws.on('message', (raw) => {
       try {
@@ -98,6 +100,8 @@ function initWebSocket(server) {
         if (msg.type === 'presence') {
           if (msg.present === true) {
             cancelPresenceContextClear();
+            // Pre-render likely greetings while the TTS engine is idle.
+            speculateGreetings({ names: msg.faces, reason: 'presence' });
             return;
           }
 
@@ -0,0 +1,265 @@
+"""CPU worker pool for the faster-whisper STT backend.
+
+Each worker owns a WhisperModel replica sized to a slice of the host's cores
+and, where the OS supports it, pinned to that slice. Concurrent segments then
+run side by side on separate cores instead of contending for one model's
+thread pool.
+
+Tuning (all optional, default "auto"):
+  STT_CPU_MODE     replicas (one model per worker, pinned) | shared (one model, num_workers)
+  STT_CPU_WORKERS  number of parallel decode workers
+  STT_CPU_THREADS  intra-op threads per worker
+  STT_CPU_PIN      0 to disable core pinning
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+def available_cpus():
+    """CPUs this process may run on (respects taskset/cgroup affinity)."""
+    if hasattr(os, "sched_getaffinity"):
+        try:
+            return sorted(os.sched_getaffinity(0))
+        except OSError:
+            pass
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_workers(core_count, workers=None, threads=None):
+    """Split cores into (workers, threads_per_worker).
+
+    Whisper decoding stops scaling past a few intra-op threads, so by default
+    each worker gets 2-4 threads and the rest of the cores go to more workers.
+    """
+    core_count = max(1, core_count)
+    if threads is None:
+        threads = max(1, min(4, core_count // 2))
+    threads = max(1, min(threads, core_count))
+    if workers is None:
+        workers = max(1, core_count // threads)
+    return max(1, workers), threads
+
+
+def _env_int(name):
+    raw = os.environ.get(name, "").strip().lower()
+    if not raw or raw == "auto":
+        return None
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        return None
+
+
+class _Worker:
+    def __init__(self, index, cpus):
+        self.index = index
+        self.cpus = cpus
+        self.model = None
+        self.error = None
+        self.ready = threading.Event()
+        self.jobs = 0
+        self.busy_s = 0.0
+        self.busy_since = None
+        self.started_at = time.time()
+
+
+class WhisperCpuPool:
+    def __init__(self, model_name, compute_type="int8", workers=None, threads=None, mode=None, pin=None,
+                 log_prefix="[STT]"):
+        from faster_whisper import WhisperModel
+
+        cpus = available_cpus()
+        self.model_name = model_name
+        self.mode = (mode or os.environ.get("STT_CPU_MODE", "replicas")).strip().lower()
+        if self.mode not in {"replicas", "shared"}:
+            self.mode = "replicas"
+        self.workers, self.threads = plan_workers(
+            len(cpus),
+            workers or _env_int("STT_CPU_WORKERS"),
+            threads or _env_int("STT_CPU_THREADS"),
+        )
+        if pin is None:
+            pin = os.environ.get("STT_CPU_PIN", "1").strip() != "0"
+        # Only pin when every worker gets its own cores; pinning an
+        # oversubscribed plan would just stack workers on the same slice.
+        self.pinned = bool(
+            pin
+            and self.mode == "replicas"
+            and hasattr(os, "sched_setaffinity")
+            and self.workers * self.threads <= len(cpus)
+        )
+        self.cores = len(cpus)
+        self._jobs = queue.Queue()
+        self._workers = []
+
+        shared_model = None
+        if self.mode == "shared":
+            shared_model = WhisperModel(
+                model_name,
+                device="cpu",
+                compute_type=compute_type,
+                cpu_threads=self.threads,
+                num_workers=self.workers,
+            )
+
+        for index in range(self.workers):
+            slice_cpus = cpus[index * self.threads:(index + 1) * self.threads] if self.pinned else None
+            worker = _Worker(index, slice_cpus)
+            if shared_model is not None:
+                factory = lambda model=shared_model: model
+            else:
+                factory = lambda: WhisperModel(
+                    model_name,
+                    device="cpu",
+                    compute_type=compute_type,
+                    cpu_threads=self.threads,
+                    num_workers=1,
+                )
+            thread = threading.Thread(
+                target=self._run_worker,
+                args=(worker, factory),
+                name=f"stt-cpu-{index}",
+                daemon=True,
+            )
+            self._workers.append(worker)
+            thread.start()
+
+        for worker in self._workers:
+            worker.ready.wait()
+            if worker.error is not None:
+                raise worker.error
+        print(f"{log_prefix} faster-whisper pool ready ({self.describe()})")
+
+    def describe(self):
+        pin_note = "pinned" if self.pinned else "unpinned"
+        return f"mode={self.mode} workers={self.workers} threads/worker={self.threads} cores={self.cores} {pin_note}"
+
+    def _run_worker(self, worker, factory):
+        if worker.cpus:
+            # On Linux affinity is per-thread; CTranslate2's compute threads are
+            # created while loading the model below, so they inherit this slice.
+            os.sched_setaffinity(0, worker.cpus)
+        try:
+            worker.model = factory()
+        except Exception as err:
+            worker.error = err
+            worker.ready.set()
+            return
+        worker.ready.set()
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            fn, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.time()
+            worker.busy_since = started
+            try:
+                future.set_result(fn(worker.model))
+            except BaseException as err:
+                future.set_exception(err)
+            finally:
+                worker.busy_since = None
+                worker.busy_s += time.time() - started
+                worker.jobs += 1
+
+    def submit(self, fn):
+        """Queue fn(model) on the next free worker and return a Future."""
+        future = Future()
+        self._jobs.put((fn, future))
+        return future
+
+    def transcribe(self, audio_path, **kwargs):
+        """Transcribe on a pool worker; returns (text, info).
+
+        faster-whisper decodes lazily while its segment generator is consumed,
+        so the generator is drained inside the worker to keep decoding on the
+        worker's cores.
+        """
+        def job(model):
+            segments, info = model.transcribe(audio_path, **kwargs)
+            text = " ".join(segment.text for segment in segments).strip()
+            return text, info
+
+        return self.submit(job).result()
+
+    def stream(self, audio_path, stop=None, **kwargs):
+        """Transcribe on a pool worker, yielding events as segments decode.
+
+        Yields ("info", info), then ("segment", segment) per segment, then
+        ("end", reason). stop(segment) may return a reason to end decoding
+        early; closing the generator (e.g. client disconnect) does the same.
+        """
+        events = queue.Queue()
+        cancelled = threading.Event()
+
+        def job(model):
+            segments, info = model.transcribe(audio_path, **kwargs)
+            events.put(("info", info))
+            reason = None
+            for segment in segments:
+                events.put(("segment", segment))
+                reason = stop(segment) if stop else None
+                if reason is None and cancelled.is_set():
+                    reason = "cancelled"
+                if reason:
+                    segments.close()
+                    break
+            events.put(("end", reason))
+
+        def on_done(future):
+            err = future.exception()
+            if err is not None:
+                events.put(("error", err))
+
+        self.submit(job).add_done_callback(on_done)
+        try:
+            while True:
+                kind, value = events.get()
+                if kind == "error":
+                    raise value
+                yield kind, value
+                if kind == "end":
+                    return
+        finally:
+            cancelled.set()
+
+    def queue_depth(self):
+        return self._jobs.qsize()
+
+    def stats(self):
+        now = time.time()
+        workers = []
+        for worker in self._workers:
+            busy_s = worker.busy_s
+            if worker.busy_since is not None:
+                busy_s += now - worker.busy_since
+            uptime = max(1e-6, now - worker.started_at)
+            workers.append({
+                "index": worker.index,
+                "cpus": worker.cpus,
+                "busy": worker.busy_since is not None,
+                "jobs": worker.jobs,
+                "busy_s": round(busy_s, 3),
+                "utilization": round(busy_s / uptime, 4),
+            })
+        return {
+            "mode": self.mode,
+            "model": self.model_name,
+            "cores": self.cores,
+            "workers": self.workers,
+            "threads_per_worker": self.threads,
+            "pinned": self.pinned,
+            "queue_depth": self.queue_depth(),
+            "per_worker": workers,
+        }
+
+    def close(self):
+        for _ in self._workers:
+            self._jobs.put(None)
@@ -0,0 +1,20 @@
+const path = require('path');
+
+// With WORKER_POOL (remote/extra instances) or WORKER_POOL_LOCAL (N local
+// instances) set, the bridge spawns src/worker-router.py on the mode's usual
+// port instead of a single service. The router spreads /transcribe, /tts and
+// /llm/* across the pool by queue depth and readiness, so nothing else on the
+// Node side changes. STT requests carry a per-conversation `sessionId`
+// (X-Session-Id, see getSttSessionId in routes.js) to keep a conversation on
+// one worker.
+
+const WORKER_POOL_ENABLED = Boolean(String(process.env.WORKER_POOL || '').trim())
+  || (Number.parseInt(process.env.WORKER_POOL_LOCAL || '0', 10) || 0) > 0;
+const WORKER_ROUTER_SCRIPT = path.join(__dirname, 'worker-router.py');
+const SESSION_HEADER = 'X-Session-Id';
+
+module.exports = {
+  WORKER_POOL_ENABLED,
+  WORKER_ROUTER_SCRIPT,
+  SESSION_HEADER,
+};
@@ -0,0 +1,322 @@
+"""Router in front of a pool of processing-service instances.
+
+Listens on the port the bridge already talks to (3001 for legacy,
+REALTIME_PROCESSING_PORT for realtime). Each /transcribe, /tts and /llm/*
+request is forwarded to one worker picked by worker_pool.WorkerPool. The
+pick uses queue depth and readiness from each worker's /health. Responses
+stream straight back, so NDJSON and batch frames arrive as the worker writes
+them.
+
+Configuration (env):
+  WORKER_ROUTER_MODE      legacy | realtime (default from PROCESSING_MODE)
+  WORKER_POOL             comma-separated workers, e.g. localhost:3101,gpu-box:3002
+  WORKER_POOL_LOCAL       spawn N local instances of the mode's service
+  WORKER_POOL_BASE_PORT   first port for local instances (default: router port + 100)
+  WORKER_POOL_CHANNEL_BASE_PORT  first audio channel port for local instances
+                          (default: right after the local HTTP ports), so
+                          channel ports never land on another worker's HTTP port
+  WORKER_POOL_HEALTH_MS   /health poll interval (default 1000)
+  WORKER_POOL_AFFINITY_TTL_S  idle time before a session's pin expires (default 30)
+
+For a quick multi-instance test on one machine:
+  WORKER_POOL_LOCAL=3 venv/bin/python -u src/worker-router.py
+
+Routing rules:
+  - Requests with X-Session-Id stick to one worker; the bridge sends one id
+    per conversation with /transcribe and /transcribe/stream.
+  - A worker that answers 429/503 (admission) or can't be reached is retried
+    once on another worker, since the request body is already buffered.
+  - Writes that change per-worker state (/faces/enroll, /faces/remove,
+    /faces/reload, /host/stt) and /tts/speculate go to every ready worker.
+
+Admin: GET /pool, POST /pool/drain, /pool/resume, /pool/add, /pool/remove
+({"worker": "localhost:3101"}). SIGTERM drains everything, waits for
+in-flight requests, then stops local workers.
+"""
+
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from flask import Flask, Response, jsonify, request
+
+from worker_pool import NoWorkerAvailable, WorkerPool, parse_worker_urls
+
+MODE = (os.environ.get("WORKER_ROUTER_MODE") or os.environ.get("PROCESSING_MODE") or "legacy").strip().lower()
+if MODE == "realtime":
+    PORT = int(os.environ.get("REALTIME_PROCESSING_PORT", "3002"))
+    WORKER_SCRIPT = "realtime-processing-service.py"
+    WORKER_PORT_ENV = "REALTIME_PROCESSING_PORT"
+else:
+    PORT = int(os.environ.get("TRANSCRIPTION_SERVICE_PORT", "3001"))
+    WORKER_SCRIPT = "transcription-service.py"
+    WORKER_PORT_ENV = "TRANSCRIPTION_SERVICE_PORT"
+
+LOCAL_WORKERS = int(os.environ.get("WORKER_POOL_LOCAL", "0") or 0)
+BASE_PORT = int(os.environ.get("WORKER_POOL_BASE_PORT", "0") or 0) or PORT + 100
+CHANNEL_BASE_PORT = int(os.environ.get("WORKER_POOL_CHANNEL_BASE_PORT", "0") or 0) or BASE_PORT + LOCAL_WORKERS
+PROXY_TIMEOUT_S = float(os.environ.get("WORKER_POOL_PROXY_TIMEOUT_S", "120") or 120)
+DRAIN_TIMEOUT_S = float(os.environ.get("WORKER_POOL_DRAIN_TIMEOUT_S", "30") or 30)
+SESSION_HEADER = "X-Session-Id"
+
+ROUTE_CLASSES = {
+    "/transcribe": "stt",
+    "/transcribe/stream": "stt",
+    "/tts": "tts",
+    "/tts/batch": "tts",
+    "/llm/generate": "llm",
+    "/llm/stream": "llm",
+}
+BROADCAST_PATHS = {"/tts/speculate", "/host/stt", "/faces/enroll", "/faces/remove", "/faces/reload"}
+HOP_BY_HOP = {"connection", "keep-alive", "transfer-encoding", "te", "trailer", "upgrade", "proxy-authorization", "proxy-authenticate", "host", "content-length"}
+RETRY_STATUSES = {429, 503}
+MAX_ATTEMPTS = 2
+
+app = Flask(__name__)
+local_processes = []
+
+
+def spawn_local_workers(count):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), WORKER_SCRIPT)
+    urls = []
+    for i in range(count):
+        port = BASE_PORT + i
+        env = {**os.environ, WORKER_PORT_ENV: str(port), "AUDIO_CHANNEL_PORT": str(CHANNEL_BASE_PORT + i)}
+        print(f"[Router] Spawning local {WORKER_SCRIPT} on {port}")
+        local_processes.append(subprocess.Popen([sys.executable, "-u", script], env=env))
+        urls.append(f"http://localhost:{port}")
+    return urls
+
+
+pool = WorkerPool(parse_worker_urls(os.environ.get("WORKER_POOL", "")) + spawn_local_workers(LOCAL_WORKERS))
+accepting = threading.Event()
+accepting.set()
+
+
+def forward_headers():
+    return {key: value for key, value in request.headers.items() if key.lower() not in HOP_BY_HOP}
+
+
+def open_upstream(worker, method, path, body, headers):
+    conn = http.client.HTTPConnection(worker.host, worker.port, timeout=PROXY_TIMEOUT_S)
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        return conn, conn.getresponse()
+    except Exception:
+        conn.close()
+        raise
+
+
+def relay(worker, route, conn, upstream):
+    """Stream the worker's response back; the worker counts as busy until it ends."""
+    released = []
+
+    def release():
+        if not released:
+            released.append(True)
+            pool.release(worker, route)
+            conn.close()
+
+    def generate():
+        try:
+            while True:
+                chunk = upstream.read1(65536)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            release()
+
+    response = Response(generate(), status=upstream.status)
+    for key, value in upstream.getheaders():
+        if key.lower() not in HOP_BY_HOP:
+            response.headers[key] = value
+    response.headers["X-Worker"] = worker.name
+    response.call_on_close(release)
+    return response
+
+
+def unavailable(reason):
+    response = jsonify({"error": f"No processing worker available ({reason})", "reason": "no_worker"})
+    response.status_code = 503
+    response.headers["Retry-After"] = "1"
+    return response
+
+
+def route_request(path, route):
+    if not accepting.is_set():
+        return unavailable("router draining")
+    body = request.get_data()
+    headers = forward_headers()
+    session_id = request.headers.get(SESSION_HEADER, "").strip() or None
+    target = request.full_path if request.query_string else path
+
+    tried = []
+    rejection = None
+    while len(tried) < MAX_ATTEMPTS:
+        try:
+            worker = pool.acquire(route, session_id=session_id, exclude=tried)
+        except NoWorkerAvailable:
+            break
+        tried.append(worker.url)
+        try:
+            conn, upstream = open_upstream(worker, request.method, target, body, headers)
+        except (OSError, http.client.HTTPException) as err:
+            pool.release(worker, route)
+            pool.mark_failed(worker, err)
+            continue
+        if upstream.status in RETRY_STATUSES and len(tried) < MAX_ATTEMPTS:
+            rejection = (upstream.status, upstream.getheaders(), upstream.read())
+            conn.close()
+            pool.release(worker, route)
+            print(f"[Router] {path} got {upstream.status} from {worker.name}; trying another worker")
+            continue
+        return relay(worker, route, conn, upstream)
+
+    if rejection is not None:
+        # Every worker tried is shedding: pass the admission rejection through.
+        status, upstream_headers, payload = rejection
+        response = Response(payload, status=status)
+        for key, value in upstream_headers:
+            if key.lower() not in HOP_BY_HOP:
+                response.headers[key] = value
+        return response
+    return unavailable(readiness_summary(route))
+
+
+def readiness_summary(label):
+    stats = pool.stats()
+    return f"{label}: {stats['ready']} of {len(stats['workers'])} workers ready"
+
+
+def broadcast(path):
+    body = request.get_data()
+    headers = forward_headers()
+    results = {}
+    status = 502
+    for worker in pool.ready_workers():
+        try:
+            conn, upstream = open_upstream(worker, request.method, path, body, headers)
+            payload = upstream.read()
+            conn.close()
+        except (OSError, http.client.HTTPException) as err:
+            pool.mark_failed(worker, err)
+            results[worker.name] = {"error": str(err)}
+            continue
+        status = min(status, upstream.status)
+        results[worker.name] = {"status": upstream.status, "body": payload.decode("utf-8", "replace")[:500]}
+    if not results:
+        return unavailable(readiness_summary(path))
+    return jsonify({"ok": status < 400, "workers": results}), status
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    stats = pool.stats()
+    ready = [w for w in pool.ready_workers() if not w.draining]
+    first = ready[0].health if ready else {}
+    body = {
+        "status": "ok" if ready and accepting.is_set() else "degraded",
+        "mode": MODE,
+        "port": PORT,
+        "router": stats,
+    }
+    # Echo the workers' model settings so the bridge's checks keep working.
+    for key in ("model", "stt_model", "stt_backend", "tts_backend", "llm_provider"):
+        if key in (first or {}):
+            body[key] = first[key]
+    return jsonify(body)
+
+
+@app.route("/pool", methods=["GET"])
+def pool_status():
+    return jsonify(pool.stats())
+
+
+def _named_worker():
+    name = str((request.json or {}).get("worker") or "").strip()
+    return name, pool.get(name)
+
+
+@app.route("/pool/drain", methods=["POST"])
+def pool_drain():
+    name, worker = _named_worker()
+    if worker is None:
+        return jsonify({"error": f"Unknown worker {name!r}"}), 404
+    pool.drain(worker)
+    return jsonify(pool.stats())
+
+
+@app.route("/pool/resume", methods=["POST"])
+def pool_resume():
+    name, worker = _named_worker()
+    if worker is None:
+        return jsonify({"error": f"Unknown worker {name!r}"}), 404
+    pool.drain(worker, draining=False)
+    return jsonify(pool.stats())
+
+
+@app.route("/pool/add", methods=["POST"])
+def pool_add():
+    urls = parse_worker_urls((request.json or {}).get("worker"))
+    if not urls:
+        return jsonify({"error": "Missing worker"}), 400
+    worker = pool.add(urls[0])
+    return jsonify({"ok": True, "worker": worker.name, "ready": worker.ready})
+
+
+@app.route("/pool/remove", methods=["POST"])
+def pool_remove():
+    name, worker = _named_worker()
+    if worker is None:
+        return jsonify({"error": f"Unknown worker {name!r}"}), 404
+    if sum(worker.inflight.values()):
+        return jsonify({"error": "Worker has requests in flight; drain it first"}), 409
+    pool.remove(worker.url)
+    return jsonify(pool.stats())
+
+
+@app.route("/<path:subpath>", methods=["GET", "POST"])
+def proxy(subpath):
+    path = f"/{subpath}"
+    if path in BROADCAST_PATHS:
+        return broadcast(path)
+    return route_request(path, ROUTE_CLASSES.get(path, "other"))
+
+
+def shutdown(*_):
+    if not accepting.is_set():
+        return
+    accepting.clear()
+    print("[Router] Draining before shutdown...")
+
+    def finish():
+        deadline = time.time() + DRAIN_TIMEOUT_S
+        while time.time() < deadline and any(sum(w.inflight.values()) for w in pool.workers()):
+            time.sleep(0.1)
+        pool.close()
+        for proc in local_processes:
+            proc.terminate()
+        for proc in local_processes:
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        os._exit(0)
+
+    threading.Thread(target=finish, daemon=True).start()
+
+
+if __name__ == "__main__":
+    if not pool.workers():
+        print("[Router] No workers: set WORKER_POOL and/or WORKER_POOL_LOCAL")
+        sys.exit(1)
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    pool.start()
+    print(f"Starting {MODE} worker router on port {PORT} ({len(pool.workers())} workers)")
+    app.run(port=PORT, threaded=True)
@@ -0,0 +1,271 @@
+"""Health-based routing across several processing-service instances.
+
+WorkerPool tracks a set of instances (transcription-service.py,
+realtime-processing-service.py or model-host.py, on this machine or others)
+and picks one per request. worker-router.py puts it behind the usual
+3001/3002 port, so the bridge doesn't change.
+
+A background thread polls each worker's /health. A worker is eligible once
+/health answers 200 with status "ok" and it is not draining. Among eligible
+workers the pick is the lowest load for the request's admission route
+("stt", "tts", "llm"):
+
+  (max(router in-flight, remote active) + remote queue depth) / max_concurrent
+
+Remote figures come from the worker's "admission" section. Router in-flight
+counts cover the gap between polls. Ties go to the lower avg_service_ms, then
+round robin.
+
+Session affinity: a request carrying a session id (X-Session-Id) is pinned
+to the worker that served the session last, while that worker stays
+eligible. The pin expires after WORKER_POOL_AFFINITY_TTL_S of inactivity.
+
+Draining: drain(worker) stops new requests and new sessions from reaching
+it. Requests already in flight, and sessions pinned before the drain, still
+finish there. The worker reports "drained" once nothing is in flight and
+no pinned session is live. A worker whose own /health stops reporting "ok"
+drops out the same way.
+"""
+
+import collections
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+ROUTE_CLASSES = ("stt", "tts", "llm")
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def parse_worker_urls(value):
+    """'localhost:3101, http://10.0.0.5:3002' -> ['http://localhost:3101', 'http://10.0.0.5:3002']"""
+    urls = []
+    for raw in str(value or "").split(","):
+        raw = raw.strip().rstrip("/")
+        if not raw:
+            continue
+        if "://" not in raw:
+            raw = f"http://{raw}"
+        urls.append(raw)
+    return urls
+
+
+class NoWorkerAvailable(Exception):
+    pass
+
+
+class Worker:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 80
+        self.ready = False
+        self.draining = False
+        self.health = None
+        self.last_error = None
+        self.checked_at = 0.0
+        self.failures = 0
+        self.inflight = collections.Counter()
+        self.served = collections.Counter()
+
+    @property
+    def name(self):
+        return f"{self.host}:{self.port}"
+
+    def gate(self, route):
+        admission = (self.health or {}).get("admission") or {}
+        return admission.get(route) or {}
+
+    def load(self, route):
+        gate = self.gate(route)
+        active = max(self.inflight[route], int(gate.get("active") or 0))
+        queued = int(gate.get("queue_depth") or 0)
+        return (active + queued) / max(1, int(gate.get("max_concurrent") or 1))
+
+    def stats(self, sessions):
+        return {
+            "url": self.url,
+            "ready": self.ready,
+            "draining": self.draining,
+            "drained": self.draining and not sum(self.inflight.values()) and not sessions,
+            "inflight": dict(+self.inflight),
+            "served": dict(self.served),
+            "sessions": sessions,
+            "load": {route: round(self.load(route), 3) for route in ROUTE_CLASSES},
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "checked_ago_ms": int((time.time() - self.checked_at) * 1000) if self.checked_at else None,
+        }
+
+
+class WorkerPool:
+    def __init__(self, urls, poll_interval_s=None, affinity_ttl_s=None, health_timeout_s=1.0, log_prefix="[Router]"):
+        self.poll_interval_s = poll_interval_s if poll_interval_s is not None else _env_float("WORKER_POOL_HEALTH_MS", 1000) / 1000.0
+        self.affinity_ttl_s = affinity_ttl_s if affinity_ttl_s is not None else _env_float("WORKER_POOL_AFFINITY_TTL_S", 30)
+        self.health_timeout_s = health_timeout_s
+        self.log_prefix = log_prefix
+        self._lock = threading.Lock()
+        self._workers = collections.OrderedDict((url, Worker(url)) for url in parse_worker_urls(",".join(urls)))
+        self._sessions = {}  # session id -> (worker url, last seen)
+        self._round_robin = itertools.count()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Membership ---
+
+    def workers(self):
+        with self._lock:
+            return list(self._workers.values())
+
+    def get(self, name):
+        """Look a worker up by URL or host:port."""
+        url = parse_worker_urls(name)[0] if name else None
+        with self._lock:
+            return self._workers.get(url)
+
+    def add(self, url):
+        url = parse_worker_urls(url)[0]
+        with self._lock:
+            if url not in self._workers:
+                self._workers[url] = Worker(url)
+            worker = self._workers[url]
+        self.check(worker)
+        return worker
+
+    def remove(self, url):
+        with self._lock:
+            worker = self._workers.pop(url, None)
+            for session_id, (pinned, _) in list(self._sessions.items()):
+                if pinned == url:
+                    del self._sessions[session_id]
+        return worker is not None
+
+    def drain(self, worker, draining=True):
+        with self._lock:
+            worker.draining = draining
+        print(f"{self.log_prefix} {'Draining' if draining else 'Resumed'} {worker.name}")
+
+    # --- Health ---
+
+    def check(self, worker):
+        try:
+            with urllib.request.urlopen(f"{worker.url}/health", timeout=self.health_timeout_s) as res:
+                health = json.loads(res.read().decode("utf-8"))
+            ready = str(health.get("status") or "") == "ok"
+            error = None if ready else f"status {health.get('status')!r}"
+        except (urllib.error.URLError, OSError, ValueError) as err:
+            health, ready, error = None, False, str(getattr(err, "reason", err))
+
+        with self._lock:
+            was_ready = worker.ready
+            worker.checked_at = time.time()
+            worker.ready = ready
+            worker.last_error = error
+            if health is not None:
+                worker.health = health
+            if not ready:
+                worker.failures += 1
+        if was_ready != ready:
+            print(f"{self.log_prefix} {worker.name} {'ready' if ready else f'not ready ({error})'}")
+        return ready
+
+    def mark_failed(self, worker, error):
+        """A proxied request could not reach the worker; stop routing to it until /health recovers."""
+        with self._lock:
+            worker.ready = False
+            worker.failures += 1
+            worker.last_error = str(error)
+        print(f"{self.log_prefix} {worker.name} unreachable: {error}")
+
+    def _poll(self):
+        while not self._stop.is_set():
+            for worker in self.workers():
+                self.check(worker)
+            self._stop.wait(self.poll_interval_s)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, name="worker-pool-health", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+
+    # --- Routing ---
+
+    def _eligible_locked(self, exclude):
+        return [w for w in self._workers.values() if w.ready and not w.draining and w.url not in exclude]
+
+    def acquire(self, route, session_id=None, exclude=()):
+        """Pick a worker for one request of `route` and count it as in flight.
+
+        Pair with release(). Raises NoWorkerAvailable when every worker is
+        down, draining or excluded.
+        """
+        now = time.time()
+        with self._lock:
+            worker = None
+            if session_id:
+                pinned = self._sessions.get(session_id)
+                if pinned and now - pinned[1] <= self.affinity_ttl_s:
+                    candidate = self._workers.get(pinned[0])
+                    # Pinned sessions may finish on a draining worker.
+                    if candidate is not None and candidate.ready and candidate.url not in exclude:
+                        worker = candidate
+            if worker is None:
+                eligible = self._eligible_locked(exclude)
+                if not eligible:
+                    raise NoWorkerAvailable(f"no ready worker for {route}")
+                turn = next(self._round_robin)
+                worker = min(
+                    eligible,
+                    key=lambda w: (
+                        round(w.load(route), 3),
+                        float(w.gate(route).get("avg_service_ms") or 0.0),
+                        (list(self._workers).index(w.url) - turn) % len(self._workers),
+                    ),
+                )
+            if session_id:
+                self._sessions[session_id] = (worker.url, now)
+            worker.inflight[route] += 1
+            return worker
+
+    def release(self, worker, route):
+        with self._lock:
+            worker.inflight[route] -= 1
+            worker.served[route] += 1
+
+    def ready_workers(self):
+        with self._lock:
+            return [w for w in self._workers.values() if w.ready]
+
+    def _live_sessions_locked(self):
+        now = time.time()
+        for session_id, (_, seen) in list(self._sessions.items()):
+            if now - seen > self.affinity_ttl_s:
+                del self._sessions[session_id]
+        return collections.Counter(url for url, _ in self._sessions.values())
+
+    def stats(self):
+        with self._lock:
+            sessions = self._live_sessions_locked()
+            workers = [w.stats(sessions[w.url]) for w in self._workers.values()]
+        return {
+            "workers": workers,
+            "ready": sum(1 for w in workers if w["ready"] and not w["draining"]),
+            "sessions": sum(sessions.values()),
+            "affinity_ttl_s": self.affinity_ttl_s,
+            "poll_interval_ms": int(self.poll_interval_s * 1000),
+        }
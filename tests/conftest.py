@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The services run as `python src/<script>.py`, which puts src/ on sys.path.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
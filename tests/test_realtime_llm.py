@@ -0,0 +1,30 @@
+import pytest
+
+from realtime_llm import strip_stream
+
+
+def deltas(*parts):
+    for part in parts:
+        yield "delta", part
+    yield "done", ({"candidatesTokenCount": 3}, "llama3.1:8b")
+
+
+@pytest.mark.parametrize("parts", [
+    ("  ", " Hello", " world", "  ", "\n"),
+    ("\n{", '"beats": ', "[]}", " \n"),
+    ("one", "  two", " "),
+    (" ", "\n"),
+])
+def test_strip_stream_joins_to_stripped_text(parts):
+    out = list(strip_stream(deltas(*parts)))
+    assert "".join(value for kind, value in out if kind == "delta") == "".join(parts).strip()
+    assert all(value for kind, value in out if kind == "delta")
+    assert out[-1] == ("done", ({"candidatesTokenCount": 3}, "llama3.1:8b"))
+
+
+def test_strip_stream_closes_upstream():
+    upstream = deltas("a", "b")
+    stream = strip_stream(upstream)
+    next(stream)
+    stream.close()
+    assert upstream.gi_frame is None
@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+import pytest
+
+from stt_streaming import find_wake_token, make_stop_check, parse_stream_options, parse_wake_words
+
+WAKE_WORDS = parse_wake_words("")
+
+
+def segment(text, end=1.0):
+    return SimpleNamespace(text=text, end=end)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("hey tubs", "tubs"),
+    ("tubbbs", "tubbbs"),       # repeats collapse
+    ("heytubs", "heytubs"),     # glue prefix
+    ("stubs", "stubs"),         # edit distance 1 to "tubs"
+    ("hey tops what's up", "tops"),
+    ("t u b", "tub"),           # compact, short utterances only
+    ("hello there", None),
+    ("hey terps", None),        # weak alias: the bridge decides from context
+])
+def test_find_wake_token_matches_bridge_rules(text, expected):
+    assert find_wake_token(text.replace("'", " ").split(), WAKE_WORDS) == expected
+
+
+def test_stop_check_matches_on_text_so_far():
+    stop = make_stop_check(wake_words=WAKE_WORDS)
+    assert stop(segment("hey")) is None
+    assert stop(segment("tub s")) == "wake_word"
+
+
+def test_stop_check_duration():
+    stop = make_stop_check(max_duration=5.0)
+    assert stop(segment("tubs", end=2.0)) is None
+    assert stop(segment("more", end=5.0)) == "duration"
+
+
+def test_parse_stream_options_uses_sent_aliases():
+    max_duration, wake_words = parse_stream_options({"max_duration": "3", "stop_on_wake": "true", "wake_words": "Tubs,Tops"})
+    assert max_duration == 3.0
+    assert wake_words == {"tubs", "tops"}
+    assert parse_stream_options({"wake_words": "tubs"}) == (0.0, set())
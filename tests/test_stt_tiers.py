@@ -0,0 +1,165 @@
+from stt_tiers import FALLBACK, PRIMARY, SttTiers, TierPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubEngine:
+    def __init__(self, name):
+        self.name = name
+
+
+def make_tiers(clock, confirm=3, probe_s=10.0):
+    engines = {}
+
+    def load(name):
+        return engines.setdefault(name, StubEngine(name))
+
+    policy = TierPolicy(
+        degrade_wait_ms=1500, recover_wait_ms=300, degrade_rtf=0.6, recover_rtf=0.35,
+        probe_s=probe_s, confirm=confirm, clock=clock,
+    )
+    return SttTiers("small", "tiny", load, policy=policy), engines
+
+
+def degrade_on_wait(tiers, confirm=3):
+    for _ in range(confirm):
+        tier, _, _ = tiers.select(queue_wait_ms=2000)
+    return tier
+
+
+def test_loads_both_tiers_up_front():
+    tiers, engines = make_tiers(FakeClock())
+    tiers.ensure_loaded()
+    assert sorted(engines) == ["small", "tiny"]
+
+
+def test_without_fallback_always_primary():
+    tiers = SttTiers("small", "", lambda name: StubEngine(name), policy=TierPolicy(confirm=1, clock=FakeClock()))
+    for _ in range(5):
+        tier, model_name, engine = tiers.select(queue_wait_ms=10_000)
+        assert (tier, model_name, engine.name) == (PRIMARY, "small", "small")
+    assert tiers.stats() is None
+
+
+def test_degrades_on_sustained_queue_wait():
+    tiers, _ = make_tiers(FakeClock())
+    assert tiers.select(queue_wait_ms=2000)[0] == PRIMARY
+    assert tiers.select(queue_wait_ms=2000)[0] == PRIMARY
+    tier, model_name, engine = tiers.select(queue_wait_ms=2000)
+    assert (tier, model_name, engine.name) == (FALLBACK, "tiny", "tiny")
+    assert tiers.policy.reason.startswith("queue wait")
+
+
+def test_short_queue_resets_wait_streak():
+    tiers, _ = make_tiers(FakeClock())
+    tiers.select(queue_wait_ms=2000)
+    tiers.select(queue_wait_ms=2000)
+    tiers.select(queue_wait_ms=0)
+    assert tiers.select(queue_wait_ms=2000)[0] == PRIMARY
+
+
+def test_degrades_on_sustained_rtf():
+    tiers, _ = make_tiers(FakeClock())
+    for _ in range(3):
+        tier, _, _ = tiers.select()
+        tiers.observe(tier, audio_s=4.0, elapsed_s=3.0)  # rtf 0.75
+    assert tiers.select()[0] == FALLBACK
+    assert tiers.policy.reason.startswith("rtf")
+
+
+def test_single_slow_decode_does_not_switch():
+    tiers, _ = make_tiers(FakeClock())
+    tiers.observe(PRIMARY, audio_s=4.0, elapsed_s=3.0)  # rtf 0.75
+    assert tiers.select()[0] == PRIMARY
+    tiers.observe(PRIMARY, audio_s=4.0, elapsed_s=1.0)  # back under the threshold
+    tiers.observe(PRIMARY, audio_s=4.0, elapsed_s=3.0)
+    tiers.observe(PRIMARY, audio_s=4.0, elapsed_s=3.0)
+    assert tiers.select()[0] == PRIMARY
+
+
+def test_short_clips_are_ignored_for_rtf():
+    tiers, _ = make_tiers(FakeClock(), confirm=1)
+    tiers.observe(PRIMARY, audio_s=0.2, elapsed_s=1.0)
+    assert tiers.select()[0] == PRIMARY
+
+
+def test_probe_only_after_cooldown_and_short_queue():
+    clock = FakeClock()
+    tiers, _ = make_tiers(clock)
+    assert degrade_on_wait(tiers) == FALLBACK
+
+    clock.now = 5.0
+    assert tiers.select(queue_wait_ms=0)[0] == FALLBACK  # cooldown not over
+    clock.now = 11.0
+    assert tiers.select(queue_wait_ms=1000)[0] == FALLBACK  # queue still long
+    assert tiers.select(queue_wait_ms=0)[0] == PRIMARY  # probe
+    assert tiers.select(queue_wait_ms=0)[0] == FALLBACK  # one probe in flight at a time
+    assert tiers.policy.counters["probes"] == 1
+
+
+def test_recovers_after_consecutive_fast_probes():
+    clock = FakeClock()
+    tiers, _ = make_tiers(clock)
+    degrade_on_wait(tiers)
+    clock.now = 11.0
+    for i in range(3):
+        tier, _, _ = tiers.select(queue_wait_ms=0)
+        assert tier == PRIMARY
+        tiers.observe(tier, audio_s=4.0, elapsed_s=1.0)  # rtf 0.25
+        assert tiers.policy.tier == (PRIMARY if i == 2 else FALLBACK)
+    assert tiers.policy.counters["recovered"] == 1
+    assert tiers.select(queue_wait_ms=0)[0] == PRIMARY
+
+
+def test_single_fast_probe_does_not_recover():
+    clock = FakeClock()
+    tiers, _ = make_tiers(clock)
+    degrade_on_wait(tiers)
+    clock.now = 11.0
+    tier, _, _ = tiers.select(queue_wait_ms=0)
+    tiers.observe(tier, audio_s=4.0, elapsed_s=1.0)  # rtf 0.25
+    assert tiers.policy.tier == FALLBACK
+
+
+def test_slow_probe_restarts_cooldown():
+    clock = FakeClock()
+    tiers, _ = make_tiers(clock)
+    degrade_on_wait(tiers)
+    clock.now = 11.0
+    tier, _, _ = tiers.select(queue_wait_ms=0)
+    tiers.observe(tier, audio_s=4.0, elapsed_s=1.0)  # fast
+    tier, _, _ = tiers.select(queue_wait_ms=0)
+    tiers.observe(tier, audio_s=4.0, elapsed_s=2.0)  # rtf 0.5: over recover_rtf
+    assert tiers.policy.tier == FALLBACK
+
+    clock.now = 15.0
+    assert tiers.select(queue_wait_ms=0)[0] == FALLBACK
+    clock.now = 21.0
+    assert tiers.select(queue_wait_ms=0)[0] == PRIMARY
+
+
+def test_lost_probe_frees_slot_after_probe_interval():
+    clock = FakeClock()
+    tiers, _ = make_tiers(clock)
+    degrade_on_wait(tiers)
+    clock.now = 11.0
+    assert tiers.select(queue_wait_ms=0)[0] == PRIMARY  # never observed
+    clock.now = 15.0
+    assert tiers.select(queue_wait_ms=0)[0] == FALLBACK
+    clock.now = 21.0
+    assert tiers.select(queue_wait_ms=0)[0] == PRIMARY
+
+
+def test_primary_swap_keeps_fallback():
+    tiers, _ = make_tiers(FakeClock())
+    tiers.primary = "distil-small.en"
+    assert tiers.in_use("tiny")
+    assert not tiers.in_use("small")
+    tiers.primary = "tiny"
+    assert not tiers.enabled
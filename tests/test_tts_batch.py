@@ -0,0 +1,101 @@
+import json
+import struct
+import threading
+
+from tts_batch import parse_batch_items, render_batch
+
+
+def read_headers(frames):
+    headers = []
+    for frame in frames:
+        (length,) = struct.unpack(">I", frame[:4])
+        headers.append(json.loads(frame[4:4 + length]))
+    return headers
+
+
+def test_frames_in_request_order_with_offsets():
+    items = parse_batch_items({"items": ["one", "two", "one"]}, "af_heart")
+    frames = list(render_batch(items, lambda text, voice, speed: text.encode() * 10))
+    headers = read_headers(frames)
+    assert [h.get("index") for h in headers] == [0, 1, 2, None]
+    assert headers[-1] == {"done": True, "count": 3, "elapsedMs": headers[-1]["elapsedMs"]}
+    body = b"".join(frames)
+    first = headers[0]
+    assert body[first["offset"]:first["offset"] + first["bytes"]] == b"one" * 10
+
+
+def test_duplicates_rendered_once():
+    calls = []
+
+    def synthesize(text, voice, speed):
+        calls.append(text)
+        return b"wav"
+
+    items = parse_batch_items({"items": ["hi", "hi", {"text": "hi", "speed": 1.5}]}, "af_heart")
+    list(render_batch(items, synthesize))
+    assert calls == ["hi", "hi"]
+
+
+class CountingLock:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.acquired = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.acquired += 1
+
+    def __exit__(self, *exc):
+        self.lock.release()
+
+
+def test_lock_taken_per_item():
+    lock = CountingLock()
+
+    def synthesize(text, voice, speed):
+        assert lock.lock.locked()
+        return b"wav"
+
+    items = parse_batch_items({"items": ["a", "b", "c"]}, "af_heart")
+    list(render_batch(items, synthesize, lock=lock))
+    assert lock.acquired == 3
+    assert not lock.lock.locked()
+
+
+def test_prepare_runs_outside_the_lock():
+    lock = CountingLock()
+    prepared = []
+
+    def prepare(text, voice, speed):
+        assert not lock.lock.locked()
+        prepared.append(text)
+        return f"phonemes:{text}"
+
+    def synthesize(text, voice, speed, prepared):
+        assert prepared == f"phonemes:{text}"
+        return b"wav"
+
+    items = parse_batch_items({"items": ["a", "b", "a"]}, "af_heart")
+    list(render_batch(items, synthesize, lock=lock, prepare=prepare))
+    assert prepared == ["a", "b"]
+
+
+def test_closing_the_stream_stops_rendering():
+    started = threading.Event()
+    proceed = threading.Event()
+    calls = []
+
+    def synthesize(text, voice, speed):
+        calls.append(text)
+        started.set()
+        proceed.wait(1)
+        return b"wav"
+
+    items = parse_batch_items({"items": [f"phrase {i}" for i in range(10)]}, "af_heart")
+    stream = render_batch(items, synthesize)
+    next(stream)
+    stream.close()  # what the server does when the client disconnects
+    proceed.set()
+    started.clear()
+    assert not started.wait(0.2)
+    assert len(calls) <= 2
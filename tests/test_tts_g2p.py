@@ -0,0 +1,36 @@
+from tts_g2p import TEXT_FALLBACK, KokoroFrontend, pack_phonemes
+
+
+class TextModel:
+    def __init__(self):
+        self.texts = []
+
+    def generate(self, text, voice, speed, lang_code):
+        self.texts.append(text)
+        return iter([])
+
+
+def test_pack_phonemes_fills_chunks_up_to_the_limit():
+    assert pack_phonemes(["aa", "bb", "cc"], limit=5) == ["aa bb", "cc"]
+    assert pack_phonemes(["aa", "", "bb"], limit=10) == ["aa bb"]
+
+
+def test_pack_phonemes_rejects_an_oversized_sentence():
+    assert pack_phonemes(["aa", "b" * 6], limit=5) is None
+
+
+def test_disabled_cache_renders_the_original_text():
+    frontend = KokoroFrontend("repo", enabled=False)
+    model = TextModel()
+    assert frontend.phonemize(model, "HELLO  there") is TEXT_FALLBACK
+    list(frontend.generate(model, "HELLO  there", "af_heart"))
+    assert model.texts == ["HELLO  there"]
+    assert frontend.stats()["text_renders"] == 1
+
+
+def test_text_fallback_marker_skips_g2p():
+    frontend = KokoroFrontend("repo")
+    model = TextModel()
+    list(frontend.generate(model, "HELLO  there", "af_heart", phonemes=TEXT_FALLBACK))
+    assert model.texts == ["hello there"]
+    assert frontend.stats()["avg_g2p_ms"] is None
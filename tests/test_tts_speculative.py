@@ -0,0 +1,78 @@
+import threading
+import time
+
+from tts_speculative import SpeculativeSynth
+
+
+class Busy:
+    def __init__(self):
+        self.value = False
+
+    def __call__(self):
+        return self.value
+
+
+def make_synth(segments, segment_s=0.05, claim_wait_s=2.0):
+    """Synth whose render takes `segments` steps, checking should_stop between them."""
+    busy = Busy()
+    started = threading.Event()
+    calls = []
+
+    def synthesize(text, voice, speed, should_stop):
+        calls.append(text)
+        started.set()
+        for _ in range(segments):
+            time.sleep(segment_s)
+            if should_stop():
+                return None
+        return f"wav:{text}".encode()
+
+    synth = SpeculativeSynth(
+        synthesize, lock=threading.Lock(), is_busy=busy, idle_grace_s=0, claim_wait_s=claim_wait_s,
+    )
+    return synth, busy, started, calls
+
+
+def submit(synth, text):
+    return synth.submit([{"text": text, "voice": "af_heart", "speed": 1.0}])
+
+
+def test_claim_serves_a_pooled_render():
+    synth, _, _, calls = make_synth(segments=1)
+    submit(synth, "Hello there")
+    deadline = time.time() + 2
+    while synth.stats()["pooled"] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert synth.claim("Hello  there", "AF_HEART") == b"wav:Hello there"
+    assert calls == ["Hello there"]
+    synth.close()
+
+
+def test_claim_waits_for_the_in_flight_render():
+    synth, busy, started, calls = make_synth(segments=6)
+    submit(synth, "Hello there")
+    assert started.wait(2)
+    busy.value = True  # the /tts request is admitted
+    assert synth.claim("Hello there", "af_heart") == b"wav:Hello there"
+    assert calls == ["Hello there"]
+    counters = synth.stats()["counters"]
+    assert counters["awaited"] == 1 and counters["hits"] == 1
+    assert counters.get("preempted", 0) == 0
+    synth.close()
+
+
+def test_claim_wait_is_bounded_and_preempts_the_render():
+    synth, busy, started, _ = make_synth(segments=100, claim_wait_s=0.1)
+    submit(synth, "Hello there")
+    assert started.wait(2)
+    busy.value = True
+    t0 = time.time()
+    assert synth.claim("Hello there", "af_heart") is None
+    assert time.time() - t0 < 1
+    deadline = time.time() + 2
+    while synth.stats()["rendering"] and time.time() < deadline:
+        time.sleep(0.01)
+    counters = synth.stats()["counters"]
+    assert counters["await_timeouts"] == 1 and counters["preempted"] == 1
+    assert synth.stats()["pending"] == 0  # the caller renders it instead
+    synth.close()